@@ -45,6 +45,20 @@ class Conf:
 
         # common
         add('--database-url', env_var='DATABASE_URL', required=False, help='database connection url', default='')
+        add(
+            '--db-pool-size',
+            type=int,
+            env_var='DB_POOL_SIZE',
+            help='number of reusable database connections shared by sync workers (0 opens a new connection every time)',
+            default=32,
+        )
+        add(
+            '--db-prepared-statements',
+            type=strtobool,
+            env_var='DB_PREPARED_STATEMENTS',
+            help='prepare repeated function calls (e.g. batch processing ones) once per connection',
+            default=False,
+        )
 
         # server
         add('--http-server-port', type=int, env_var='HTTP_SERVER_PORT', default=8080)
@@ -59,6 +73,105 @@ class Conf:
         # sync
         add('--max-workers', type=int, env_var='MAX_WORKERS', help='max workers for batch requests', default=6)
         add('--max-batch', type=int, env_var='MAX_BATCH', help='max chunk size for batch requests', default=None)
+        add(
+            '--post-data-cache-max-mb',
+            type=int,
+            env_var='POST_DATA_CACHE_MAX_MB',
+            help='size of post bodies cached during a batch above which they are flushed early (0 disables the limit)',
+            default=1024,
+        )
+        add(
+            '--post-data-cache-lru-mb',
+            type=int,
+            env_var='POST_DATA_CACHE_LRU_MB',
+            help='size of recently flushed post bodies kept in memory for applying edit patches (0 disables it)',
+            default=64,
+        )
+        add(
+            '--post-merge-workers',
+            type=int,
+            env_var='POST_MERGE_WORKERS',
+            help='number of processes applying diff patches of edited post bodies (0 applies them on the sync thread)',
+            default=0,
+        )
+        add(
+            '--vote-partitions',
+            type=int,
+            env_var='VOTE_PARTITIONS',
+            help='number of connections applying votes of a massive sync batch concurrently, split by post id',
+            default=1,
+        )
+        add(
+            '--post-body-merge-engine',
+            env_var='POST_BODY_MERGE_ENGINE',
+            choices=['python', 'sql'],
+            help='where diff patches of edited post bodies are applied: python (PostDataCache) or sql (in the database, plpython3u)',
+            default='python',
+        )
+        add(
+            '--massive-batch-target-seconds',
+            type=float,
+            env_var='MASSIVE_BATCH_TARGET_SECONDS',
+            help='adapt number of blocks of massive sync batches to take about that many seconds (0 disables it)',
+            default=0,
+        )
+        add(
+            '--finalize-work-mem-mb',
+            type=int,
+            env_var='FINALIZE_WORK_MEM_MB',
+            help='work_mem in MB split among running tasks of massive sync finalization (0 uses 1/8 of the memory)',
+            default=0,
+        )
+        add(
+            '--finalize-workers',
+            type=int,
+            env_var='FINALIZE_WORKERS',
+            help='number of connections recalculating post rshares and children counts by post id ranges at finalization',
+            default=4,
+        )
+        add(
+            '--finalize-chunk-size',
+            type=int,
+            env_var='FINALIZE_CHUNK_SIZE',
+            help='number of post ids in a checkpointed range of finalization',
+            default=1000000,
+        )
+        add(
+            '--index-build-workers',
+            type=int,
+            env_var='INDEX_BUILD_WORKERS',
+            help='parallel workers of each index build of hive_votes and hive_posts when indexes are restored after massive sync (0 keeps the server setting)',
+            default=4,
+        )
+        add(
+            '--account-ids-file',
+            type=str,
+            env_var='ACCOUNT_IDS_FILE',
+            help='file persisting the account name->id map between restarts (memory-mapped on start)',
+            default=None,
+        )
+        add(
+            '--live-notify-wakeup',
+            type=strtobool,
+            env_var='LIVE_NOTIFY_WAKEUP',
+            help='in live sync, wait for a notification of a new irreversible block instead of polling for it '
+            '(installs a trigger on a HAF table while enabled)',
+            default=False,
+        )
+        add(
+            '--live-notify-timeout',
+            type=float,
+            env_var='LIVE_NOTIFY_TIMEOUT',
+            help='seconds after which live sync waiting for a notification polls for new blocks anyway',
+            default=3.0,
+        )
+        add(
+            '--massive-pipelined-staging',
+            type=strtobool,
+            env_var='MASSIVE_PIPELINED_STAGING',
+            help='during massive sync, load operations of the next block range in background while the current one is applied',
+            default=False,
+        )
 
         # --sync-to-s3 seems to be unnecessary
         add(
@@ -230,7 +343,13 @@ class Conf:
             url = self.get('database_url')
             enable_autoexplain = self.get('log_explain_queries')
             assert url, '--database-url (or DATABASE_URL env) not specified'
-            self._db = Db(url, "root", enable_autoexplain)
+            self._db = Db(
+                url,
+                "root",
+                enable_autoexplain,
+                pool_size=self.get('db_pool_size'),
+                prepare_statements=self.get('db_prepared_statements'),
+            )
             log.info("The database instance is created...")
 
         return self._db
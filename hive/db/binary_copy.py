@@ -0,0 +1,80 @@
+"""Streaming encoder for PostgreSQL binary `COPY ... FROM STDIN` input."""
+
+import struct
+
+_HEADER = b'PGCOPY\n\xff\r\n\x00' + struct.pack('!ii', 0, 0)
+_TRAILER = struct.pack('!h', -1)
+_NULL = struct.pack('!i', -1)
+
+_INT4_LEN = struct.pack('!i', 4)
+_BOOL_TRUE = struct.pack('!i', 1) + b'\x01'
+_BOOL_FALSE = struct.pack('!i', 1) + b'\x00'
+
+
+def _encode_int4(value):
+    return _INT4_LEN + struct.pack('!i', value)
+
+
+def _encode_bool(value):
+    return _BOOL_TRUE if value else _BOOL_FALSE
+
+
+def _encode_text(value):
+    data = value.encode('utf-8')
+    return struct.pack('!i', len(data)) + data
+
+
+ENCODERS = {
+    'int4': _encode_int4,
+    'bool': _encode_bool,
+    'text': _encode_text,
+}
+
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+
+def binary_copy_chunks(rows, column_types, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Encode rows lazily as binary COPY data, yielding chunks of about `chunk_size` bytes.
+
+    `column_types` names the encoder of every column (see ENCODERS), None values become NULL.
+    Only one chunk is held in memory at a time, regardless of the number of rows.
+    """
+    encoders = [ENCODERS[column_type] for column_type in column_types]
+    field_count = struct.pack('!h', len(encoders))
+
+    buffer = bytearray(_HEADER)
+    for row in rows:
+        assert len(row) == len(encoders), f'expected {len(encoders)} columns, got {len(row)}'
+        buffer += field_count
+        for encode, value in zip(encoders, row):
+            buffer += _NULL if value is None else encode(value)
+        if len(buffer) >= chunk_size:
+            yield bytes(buffer)
+            buffer.clear()
+
+    buffer += _TRAILER
+    yield bytes(buffer)
+
+
+class ChunkStream:
+    """Read-only file-like object over an iterable of bytes chunks, as expected by `cursor.copy_expert`."""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._chunk = b''
+        self._pos = 0
+
+    def read(self, size=-1):
+        if self._pos >= len(self._chunk):
+            self._chunk = next(self._chunks, b'')
+            self._pos = 0
+
+        if size is None or size < 0:
+            data = self._chunk[self._pos :] + b''.join(self._chunks)
+            self._chunk = b''
+            self._pos = 0
+            return data
+
+        data = self._chunk[self._pos : self._pos + size]
+        self._pos += len(data)
+        return data
@@ -0,0 +1,81 @@
+"""Waiting for HAF to make new blocks available, instead of polling for them."""
+
+import logging
+import select
+import time
+
+import psycopg2
+
+from hive.conf import SCHEMA_NAME
+
+log = logging.getLogger(__name__)
+
+CHANNEL = f'{SCHEMA_NAME}_block'
+APPLICATION_NAME = 'hivemind_block_listener'
+
+
+class BlockListener:
+    """LISTENs on the channel notified by live_block_notify.sql when HAF advances its irreversible block.
+
+    Uses its own autocommit connection, opened by `open` and kept for the rest of live sync, as notifications
+    are only delivered to a session which isn't inside a transaction.
+    """
+
+    def __init__(self, url, timeout):
+        self._url = url
+        self._timeout = timeout
+        self._conn = None
+        self._listening = False
+
+    @property
+    def is_open(self):
+        return self._listening
+
+    def open(self):
+        self._conn = self._connect()
+        self._listening = True
+        log.info(f"Live sync waits for notifications on channel '{CHANNEL}', polling every {self._timeout}s")
+
+    def _connect(self):
+        conn = psycopg2.connect(self._url, application_name=APPLICATION_NAME)
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute(f'LISTEN {CHANNEL}')
+        return conn
+
+    def wait(self):
+        """Block until a notification arrives or the timeout passes, returning True when notified.
+
+        Notifications received since the previous call return immediately, so a block committed while
+        the previous one was processed is not missed. When the connection was lost (server restart,
+        idle timeout), it is opened again, and for as long as that fails the timeout is slept through,
+        which makes live sync poll for blocks as without notifications.
+        """
+        try:
+            if self._conn is None:
+                self._conn = self._connect()
+                log.info(f"Reconnected to listen on channel '{CHANNEL}'")
+            self._conn.poll()
+            if not self._conn.notifies:
+                select.select([self._conn], [], [], self._timeout)
+                self._conn.poll()
+        except (psycopg2.Error, OSError) as ex:
+            log.warning(f"Connection listening on channel '{CHANNEL}' failed, polling for blocks: {ex}")
+            self._disconnect()
+            time.sleep(self._timeout)
+            return False
+        notified = bool(self._conn.notifies)
+        self._conn.notifies.clear()
+        return notified
+
+    def close(self):
+        self._disconnect()
+        self._listening = False
+
+    def _disconnect(self):
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except psycopg2.Error:
+                pass
+            self._conn = None
@@ -0,0 +1,120 @@
+"""Server-side functions applied to a big table in id ranges, on several connections, resumable after a crash."""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from time import perf_counter
+
+from hive.conf import SCHEMA_NAME
+from hive.indexer.auto_db_disposer import AutoDbDisposer
+from hive.utils.misc import id_ranges
+from hive.utils.phase_scheduler import current_phase
+
+log = logging.getLogger(__name__)
+
+
+class ChunkedTask:
+    """Executes `sql` taking `:first_id` and `:last_id` parameters for consecutive id ranges on `workers` connections.
+
+    Ids are whatever `sql` ranges over, e.g. post ids or block numbers.
+
+    Every range is committed together with its checkpoint in `_finalize_checkpoints`, so a task interrupted
+    by a crash resumes with the ranges it did not process yet, as long as it runs again for the same `run_block`.
+    Checkpoints are removed once the whole task is done. Progress is reported to the running PhaseScheduler phase.
+    """
+
+    def __init__(self, db, name, sql, chunk_size, workers, run_block, work_mem=None):
+        assert chunk_size > 0 and workers > 0
+        self._db = db
+        self.name = name
+        self._sql = sql
+        self._chunk_size = chunk_size
+        self._workers = workers
+        self._run_block = run_block
+        self._work_mem = work_mem
+        self._lock = Lock()
+
+    def _checkpoints_sql(self, condition):
+        return f"{SCHEMA_NAME}._finalize_checkpoints WHERE task = :task AND run_block {condition} :run_block"
+
+    def pending_ranges(self, db, first_id, last_id):
+        """Ranges of [first_id, last_id] without a checkpoint of this run, dropping checkpoints of other runs."""
+        db.query_no_return(f"DELETE FROM {self._checkpoints_sql('<>')}", task=self.name, run_block=self._run_block)
+        done = {
+            (row[0], row[1])
+            for row in db.query_all(
+                f"SELECT first_id, last_id FROM {self._checkpoints_sql('=')}", task=self.name, run_block=self._run_block
+            )
+        }
+        return [chunk for chunk in id_ranges(first_id, last_id, self._chunk_size) if chunk not in done]
+
+    def run(self, first_id, last_id):
+        """Process all ranges of [first_id, last_id] not processed yet by an interrupted run."""
+        time_start = perf_counter()
+        total = len(range(first_id, last_id + 1, self._chunk_size))
+        with AutoDbDisposer(self._db, self.name) as db_mgr:
+            pending = self.pending_ranges(db_mgr.db, first_id, last_id)
+        if len(pending) < total:
+            log.info("[MASSIVE] %s resumes with %d of %d ranges left", self.name, len(pending), total)
+
+        phase = current_phase()
+        state = {'next': 0, 'done': total - len(pending), 'failed': False}
+
+        def take_range():
+            with self._lock:
+                if state['failed'] or state['next'] == len(pending):
+                    return None
+                state['next'] += 1
+                return pending[state['next'] - 1]
+
+        def work(worker):
+            with AutoDbDisposer(self._db, f'{self.name}_{worker}') as db_mgr:
+                while (chunk := take_range()) is not None:
+                    try:
+                        self._run_range(db_mgr.db, *chunk)
+                    except Exception:
+                        with self._lock:
+                            state['failed'] = True
+                        raise
+                    with self._lock:
+                        state['done'] += 1
+                        if phase is not None:
+                            phase.report_progress(state['done'], total)
+
+        with ThreadPoolExecutor(max_workers=self._workers) as pool:
+            for future in [pool.submit(work, worker) for worker in range(min(self._workers, len(pending)))]:
+                future.result()
+
+        with AutoDbDisposer(self._db, self.name) as db_mgr:
+            db_mgr.db.query_no_return(
+                f"DELETE FROM {SCHEMA_NAME}._finalize_checkpoints WHERE task = :task", task=self.name
+            )
+        log.info(
+            "[MASSIVE] %s processed ids %d-%d in %d ranges on %d connections in %.4fs",
+            self.name,
+            first_id,
+            last_id,
+            len(pending),
+            self._workers,
+            perf_counter() - time_start,
+        )
+
+    def _run_range(self, db, first_id, last_id):
+        db.query_no_return("START TRANSACTION")
+        try:
+            if self._work_mem:
+                db.query_no_return("SET LOCAL work_mem = :work_mem", work_mem=self._work_mem)
+            db.query_no_return(self._sql, first_id=first_id, last_id=last_id)
+            db.query_no_return(
+                f"INSERT INTO {SCHEMA_NAME}._finalize_checkpoints (task, run_block, first_id, last_id) "
+                "VALUES (:task, :run_block, :first_id, :last_id) "
+                "ON CONFLICT (task, first_id) DO UPDATE SET run_block = EXCLUDED.run_block, last_id = EXCLUDED.last_id",
+                task=self.name,
+                run_block=self._run_block,
+                first_id=first_id,
+                last_id=last_id,
+            )
+            db.query_no_return("COMMIT")
+        except Exception:
+            db.query_no_return("ROLLBACK")
+            raise
@@ -0,0 +1,123 @@
+"""Pool of reusable database connections shared by cloned Db adapters."""
+
+import logging
+from threading import Lock
+
+import psycopg2
+import psycopg2.extensions
+from psycopg2.pool import PoolError, ThreadedConnectionPool
+
+from hive.utils.stats import BroadcastObject
+from hive.utils.stats import PrometheusClient as PC
+
+log = logging.getLogger(__name__)
+
+# application name of connections idling in the pool (restored by DISCARD ALL)
+POOL_APPLICATION_NAME = 'hivemind_pool'
+
+
+class ConnectionPool:
+    """Thread-safe pool of autocommit connections.
+
+    A connection handed out by `getconn` is tagged with the `hivemind_<name>` application name.
+    When it is returned, its session state (work_mem, synchronous_commit, prepared statements, ...)
+    is reset, so stage switches and finalization tasks reuse open connections instead of reconnecting.
+    When all `size` connections are in use, dedicated connections are opened and closed on return.
+    """
+
+    def __init__(self, url, size):
+        self._url = url
+        self._size = size
+        self._pool = ThreadedConnectionPool(0, size, url, application_name=POOL_APPLICATION_NAME)
+        self._lock = Lock()
+        self._backend_pids = {}  # id(connection) -> backend pid, for pooled connections
+        self._overflow_connections = set()
+        self._in_use = 0
+        self._peak_in_use = 0
+        self._overflows = 0
+        self._discarded = 0
+
+    def getconn(self, name):
+        """Get a connection tagged with given name, opening a dedicated one when the pool is exhausted."""
+        application_name = f'hivemind_{name}'
+        try:
+            conn = self._pool.getconn()
+        except PoolError:
+            conn = psycopg2.connect(self._url, application_name=application_name)
+            conn.autocommit = True
+            with self._lock:
+                self._overflow_connections.add(id(conn))
+                self._overflows += 1
+                self._in_use += 1
+            log.warning(f"Connection pool of {self._size} exhausted, opened dedicated connection: '{name}'")
+            self.broadcast_stats()
+            return conn
+
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                cur.execute('SET application_name = %s', (application_name,))
+        except psycopg2.Error as ex:
+            # backend of an idle connection was terminated meanwhile
+            log.info(f"Discarding broken pooled connection: {ex}")
+            self._discard(conn)
+            return self.getconn(name)
+
+        with self._lock:
+            self._backend_pids.setdefault(id(conn), conn.get_backend_pid())
+            self._in_use += 1
+            self._peak_in_use = max(self._peak_in_use, self._in_use)
+        self.broadcast_stats()
+        return conn
+
+    def putconn(self, conn):
+        """Return connection to the pool, resetting its session state."""
+        with self._lock:
+            self._in_use -= 1
+            is_overflow = id(conn) in self._overflow_connections
+            self._overflow_connections.discard(id(conn))
+
+        if is_overflow:
+            if not conn.closed:
+                conn.close()
+            return
+
+        try:
+            with conn.cursor() as cur:
+                if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    cur.execute('ROLLBACK')
+                cur.execute('DISCARD ALL')
+        except psycopg2.Error as ex:
+            log.info(f"Discarding pooled connection which cannot be reset: {ex}")
+            self._discard(conn)
+            return
+
+        self._pool.putconn(conn)
+        self.broadcast_stats()
+
+    def _discard(self, conn):
+        with self._lock:
+            self._backend_pids.pop(id(conn), None)
+            self._discarded += 1
+        self._pool.putconn(conn, close=True)
+
+    def backend_pids(self):
+        """Backend pids of connections owned by the pool, both idle and in use."""
+        with self._lock:
+            return list(self._backend_pids.values())
+
+    def closeall(self):
+        with self._lock:
+            self._backend_pids.clear()
+        self._pool.closeall()
+
+    def broadcast_stats(self):
+        PC.broadcast(
+            [
+                BroadcastObject('db_pool_in_use', self._in_use, 'connections'),
+                BroadcastObject('db_pool_peak_in_use', self._peak_in_use, 'connections'),
+                BroadcastObject('db_pool_saturation', self._in_use / self._size, 'ratio'),
+                BroadcastObject('db_pool_overflows', self._overflows, 'connections'),
+                BroadcastObject('db_pool_discarded', self._discarded, 'connections'),
+            ]
+        )
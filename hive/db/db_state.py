@@ -13,11 +13,12 @@ import psycopg2.extensions
 import hive.db.schema as schema_module
 from hive.conf import ONE_WEEK_IN_BLOCKS, REPTRACKER_SCHEMA_NAME, SCHEMA_NAME, SCHEMA_OWNER_NAME, SWAGGER_URL
 from hive.db.adapter import Db
+from hive.db.chunked_task import ChunkedTask
 from hive.db.schema import perform_db_upgrade, setup, setup_runtime_code, teardown
 from hive.indexer.auto_db_disposer import AutoDbDisposer
 from hive.utils.communities_rank import update_communities_posts_and_rank
 from hive.utils.misc import get_memory_amount
-from hive.utils.payout_stats import PayoutStats
+from hive.utils.phase_scheduler import Phase, PhaseScheduler
 from hive.utils.stats import FinalOperationStatusManager as FOSM
 
 log = logging.getLogger(__name__)
@@ -35,11 +36,26 @@ class DbState:
     _indexes_were_enabled = False
     _fk_were_disabled = False
     _fk_were_enabled = False
+    _payout_stats_maintained = None  # unknown until set once by this process
     _original_synchronous_commit_mode = None
     _original_fsync = None
     _original_full_page_writes = None
     _rshares_recalculated = False
     _wal_safety_disable_attempted = False  # Track if we already tried to disable WAL safety
+    _finalize_work_mem_mb = 0  # work_mem budget shared by running finalization tasks, 0 for default
+    _finalize_workers = 1  # connections of chunked finalization tasks
+    _index_build_workers = 0  # parallel workers of index builds of _TABLES_WITH_PARALLEL_INDEX_BUILDS, 0 for default
+    _finalize_chunk_size = 1000000  # posts per range of chunked finalization tasks
+    _live_notify_wakeup = False  # trigger on HAF irreversible block table notifies live sync of new blocks
+
+    # Blocks per range of vote notifications flushed at finalization (about 3.5 days)
+    _VOTE_NOTIFICATION_CHUNK_BLOCKS = 100000
+    _finalization = None  # PhaseScheduler of running finalization
+
+    # Seconds between progress reports of finalization tasks
+    _FINALIZE_REPORT_INTERVAL = 60
+    # Smallest work_mem given to a finalization task, however many of them run
+    _MIN_TASK_WORK_MEM_MB = 64
 
     # Tables that have registered indexes (via register_indexes.sql)
     _TABLES_WITH_REGISTERED_INDEXES = [
@@ -57,6 +73,9 @@ class DbState:
         'hive_accounts',
     ]
 
+    # Largest tables with registered indexes, whose index builds outlast the others' when indexes are restored
+    _TABLES_WITH_PARALLEL_INDEX_BUILDS = ['hive_votes', 'hive_posts']
+
     # Tables with foreign key constraints
     _TABLES_WITH_FKS = [
         'hive_posts',
@@ -133,6 +152,14 @@ class DbState:
                 schema_module.pg_search_available = True
                 log.info("pg_search extension detected in existing database")
 
+        if enter_massive:
+            # the trigger sits on a HAF table, so it is there only while sync runs with the option enabled
+            db_setup_admin = cls.db().clone('setup_admin')
+            db_setup_admin.query_no_return(
+                f"SELECT {SCHEMA_NAME}.set_block_notify_trigger(:enabled)", enabled=cls._live_notify_wakeup
+            )
+            db_setup_admin.close()
+
         db_setup_owner.query_no_return(f"SET SEARCH_PATH TO {REPTRACKER_SCHEMA_NAME}")
         db_setup_owner.query_no_return(f"SET custom.swagger_url = '{SWAGGER_URL}'")
         setup_runtime_code(db=db_setup_owner)
@@ -178,6 +205,53 @@ class DbState:
         """Check if we're still in the process of massive sync."""
         return cls._is_massive_sync
 
+    @classmethod
+    def configure_finalization(cls, work_mem_mb, workers, chunk_size):
+        cls._finalize_work_mem_mb = work_mem_mb
+        cls._finalize_workers = workers
+        cls._finalize_chunk_size = chunk_size
+
+    @classmethod
+    def configure_index_restore(cls, workers):
+        cls._index_build_workers = workers
+
+    @classmethod
+    def configure_live_notify(cls, wakeup):
+        cls._live_notify_wakeup = wakeup
+
+    @classmethod
+    def _default_work_mem(cls, connections=1):
+        """work_mem of a query: a share of the finalization budget among running tasks, or 1/64 of the memory.
+
+        A task running its queries on several `connections` splits its share among them.
+        """
+        if cls._finalization is None:
+            return f'{int(get_memory_amount() / 64 / connections)}MB'
+
+        budget = cls._finalize_work_mem_mb or get_memory_amount() / 8
+        running = max(len(cls._finalization.running()), 1)
+        return f'{max(int(budget / running / connections), cls._MIN_TASK_WORK_MEM_MB)}MB'
+
+    @classmethod
+    def _chunked_task(cls, db, name, sql, run_block, chunk_size):
+        return ChunkedTask(
+            db,
+            name,
+            sql,
+            chunk_size=chunk_size,
+            workers=cls._finalize_workers,
+            run_block=run_block,
+            work_mem=cls._default_work_mem(cls._finalize_workers),
+        )
+
+    @classmethod
+    def _run_chunked_over_posts(cls, db, name, sql, run_block):
+        """Execute `sql` for ranges of post ids on several connections, see ChunkedTask."""
+        first_id, last_id = db.query_row(
+            f"SELECT COALESCE(MIN(id), 0), COALESCE(MAX(id), 0) FROM {SCHEMA_NAME}.hive_posts"
+        )
+        cls._chunked_task(db, name, sql, run_block, cls._finalize_chunk_size).run(first_id, last_id)
+
     @classmethod
     def _execute_query(cls, db: Db, sql: str, explain: bool = False) -> None:
         time_start = perf_counter()
@@ -193,8 +267,7 @@ class DbState:
     def _execute_query_with_modified_work_mem(
         cls, db: Db, sql: str, explain: bool = False, value: Optional[str] = None, separate_transaction: bool = True
     ) -> None:
-        divide_factor = 64
-        _value = value or f'{int(get_memory_amount() / divide_factor)}MB'
+        _value = value or cls._default_work_mem()
 
         sql_show_work_mem = 'SHOW work_mem;'
         work_mem_before = db.query_one(sql_show_work_mem)
@@ -228,11 +301,23 @@ class DbState:
         log.info("[MASSIVE] Dropped all registered indexes in %.4fs", perf_counter() - time_start)
 
     @classmethod
-    def _restore_indexes_per_table(cls, db, full_table_name):
-        """Restore indexes for a single table using HAF API. Runs in a thread."""
+    def _restore_indexes_per_table(cls, db, full_table_name, workers=0):
+        """Restore indexes for a single table using HAF API. Runs in a thread.
+
+        HAF builds the indexes of a table one after another, so with `workers` each build scans the table
+        with that many parallel workers instead. Each of them is given at least the 32MB of maintenance_work_mem
+        PostgreSQL requires to use it.
+        """
         with AutoDbDisposer(db, f'restore_idx_{full_table_name}') as db_mgr:
             log.info("[MASSIVE] Restoring indexes for %s", full_table_name)
             time_start = perf_counter()
+            if workers:
+                maintenance_work_mem = max(64 * (workers + 1), int(get_memory_amount() / 32))
+                db_mgr.db.query_no_return("SET max_parallel_maintenance_workers = :workers", workers=workers)
+                db_mgr.db.query_no_return(
+                    "SET maintenance_work_mem = :maintenance_work_mem",
+                    maintenance_work_mem=f'{maintenance_work_mem}MB',
+                )
             cls._retry_ddl(
                 lambda: db_mgr.db.query_no_return(
                     f"SELECT hive.app_restore_indexes('hivemind_app', '{full_table_name}')"
@@ -282,6 +367,9 @@ class DbState:
     def _restore_indexes_in_threads(cls):
         """Restore all registered indexes in parallel across tables.
 
+        The largest tables' index builds also use parallel workers (see --index-build-workers),
+        so they don't keep the switch to MASSIVE_WITH_INDEXES waiting long after the others.
+
         Excludes hive_post_data — the BM25 index is deferred to the fills phase
         where it runs in parallel with other finalization work.
         """
@@ -290,7 +378,8 @@ class DbState:
         methods = []
         for table in cls._TABLES_WITH_REGISTERED_INDEXES:
             full_name = f'{SCHEMA_NAME}.{table}'
-            methods.append((table, cls._restore_indexes_per_table, [cls.db(), full_name]))
+            workers = cls._index_build_workers if table in cls._TABLES_WITH_PARALLEL_INDEX_BUILDS else 0
+            methods.append((table, cls._restore_indexes_per_table, [cls.db(), full_name, workers]))
         # Include reptracker index
         methods.append(
             (
@@ -482,6 +571,29 @@ class DbState:
         cls._fk_were_disabled = False
         cls._fk_were_enabled = True
 
+    @classmethod
+    def ensure_payout_stats_are_not_maintained(cls):
+        """Stop updating payout stats with every change of hive_posts, massive sync changes too many posts."""
+        if cls._payout_stats_maintained is False:
+            return
+
+        cls.db().query_no_return(f"SELECT {SCHEMA_NAME}.set_payout_stats_maintained(FALSE)")
+        cls._payout_stats_maintained = False
+        log.info("[MASSIVE] Payout stats are not maintained")
+
+    @classmethod
+    def ensure_payout_stats_are_maintained(cls):
+        """Update payout stats with every change of hive_posts, rebuilding them first after massive sync."""
+        if cls._payout_stats_maintained:
+            return
+
+        time_start = perf_counter()
+        cls.db().query_no_return("START TRANSACTION")
+        cls.db().query_no_return(f"SELECT {SCHEMA_NAME}.set_payout_stats_maintained(TRUE)")
+        cls.db().query_no_return("COMMIT")
+        cls._payout_stats_maintained = True
+        log.info(f"Payout stats are maintained, enabled in {perf_counter() - time_start:.3f}s")
+
     @classmethod
     def _finish_hive_posts(cls, db, massive_sync_preconditions, last_imported_block, current_imported_block):
         with AutoDbDisposer(db, "finish_hive_posts") as db_mgr:
@@ -489,9 +601,12 @@ class DbState:
 
             # UPDATE: `children`
             if massive_sync_preconditions:
-                # Update count of all child posts (what was hold during massive sync)
-                cls._execute_query_with_modified_work_mem(
-                    db=db_mgr.db, sql=f"SELECT {SCHEMA_NAME}.update_all_hive_posts_children_count()"
+                # Update count of all child posts (what was hold during massive sync), by ranges of discussions
+                cls._run_chunked_over_posts(
+                    db_mgr.db,
+                    'children_count',
+                    f"SELECT {SCHEMA_NAME}.update_hive_posts_children_count_range(:first_id, :last_id)",
+                    current_imported_block,
                 )
             else:
                 # Update count of child posts processed during partial sync (what was hold during massive sync)
@@ -528,13 +643,6 @@ class DbState:
             cls._execute_query_with_modified_work_mem(db=db_mgr.db, sql=sql)
             log.info("[MASSIVE] update_feed_cache executed in %.4fs", perf_counter() - time_start)
 
-    @classmethod
-    def _finish_payout_stats_view(cls, db):
-        with AutoDbDisposer(db, "finish_payout_stats_view") as db_mgr:
-            time_start = perf_counter()
-            PayoutStats.generate(db=db_mgr.db, separate_transaction=True)
-            log.info("[MASSIVE] payout_stats_view executed in %.4fs", perf_counter() - time_start)
-
     @classmethod
     def _finish_communities_posts_and_rank(cls, db):
         with AutoDbDisposer(db, "finish_communities_posts_and_rank") as db_mgr:
@@ -566,12 +674,16 @@ class DbState:
             log.info("[MASSIVE] update_last_completed_block executed in %.4fs", perf_counter() - time_start)
 
     @classmethod
-    def _finish_posts_rshares(cls, db):
+    def _finish_posts_rshares(cls, db, current_imported_block):
         with AutoDbDisposer(db, "finish_posts_rshares") as db_mgr:
             time_start = perf_counter()
-            sql = f"SELECT {SCHEMA_NAME}.recalculate_all_posts_rshares();"
-            cls._execute_query_with_modified_work_mem(db=db_mgr.db, sql=sql)
-            log.info("[MASSIVE] recalculate_all_posts_rshares executed in %.4fs", perf_counter() - time_start)
+            cls._run_chunked_over_posts(
+                db_mgr.db,
+                'posts_rshares',
+                f"SELECT {SCHEMA_NAME}.recalculate_posts_rshares_range(:first_id, :last_id)",
+                current_imported_block,
+            )
+            log.info("[MASSIVE] recalculate_posts_rshares_range executed in %.4fs", perf_counter() - time_start)
 
     @classmethod
     def _finish_notification_cache(cls, db):
@@ -582,24 +694,36 @@ class DbState:
             log.info("[MASSIVE] clear_muted_notifications executed in %.4fs", perf_counter() - time_start)
 
     @classmethod
-    def _finish_vote_notifications(cls, db):
-        """Flush vote notifications for the entire sync range at finalization.
+    def _finish_vote_notifications(cls, db, current_imported_block):
+        """Flush vote notifications of the 90-day notification window at finalization.
 
         Vote notification scoring uses payout + pending_payout from hive_posts,
         which is only fully available after all payout virtual ops are processed.
         During massive sync batches, vote notifications are skipped because payout
         data for recent posts hasn't arrived yet (payouts come ~7 days after the post).
         At finalization, all payout data is available, so we flush all vote notifications.
+
+        Older notifications would be pruned anyway, so the flush starts at the window.
+        Block ranges are flushed on several connections and checkpointed, a finalization
+        restarted after a crash only flushes the remaining ones.
         """
         with AutoDbDisposer(db, "finish_vote_notifications") as db_mgr:
             time_start = perf_counter()
-            db_mgr.db.query("START TRANSACTION")
+            first_block = db_mgr.db.query_one(f"SELECT {SCHEMA_NAME}.block_before_irreversible('90 days')") + 1
             last_block = db_mgr.db.query_one("SELECT hive.app_get_current_block_num('hivemind_app')")
-            sql = f"SELECT {SCHEMA_NAME}.flush_vote_notifications_for_blocks(1, {last_block})"
-            result = db_mgr.db.query_one(sql)
-            db_mgr.db.query("COMMIT")
+            if last_block < first_block:
+                return
+
+            sql = f"SELECT {SCHEMA_NAME}.flush_vote_notifications_for_blocks(:first_id, :last_id)"
+            task = cls._chunked_task(
+                db_mgr.db, 'vote_notifications', sql, current_imported_block, cls._VOTE_NOTIFICATION_CHUNK_BLOCKS
+            )
+            task.run(first_block, last_block)
             log.info(
-                "[MASSIVE] flush_vote_notifications: %s notifications in %.4fs", result, perf_counter() - time_start
+                "[MASSIVE] flush_vote_notifications for blocks %d-%d executed in %.4fs",
+                first_block,
+                last_block,
+                perf_counter() - time_start,
             )
 
     @classmethod
@@ -676,55 +800,18 @@ class DbState:
 
         log.info("#############################################################################")
 
-        if massive_sync_preconditions and not cls._rshares_recalculated:
-            # Run rshares recalculation first (creates ~54M dead tuples on hive_posts).
-            # Must complete before Part 0 so update_all_hive_posts_children_count doesn't
-            # scan a bloated table 256 times in a loop. Only needs to run once per initial
-            # massive sync — small gaps on restart don't need full recalculation since live
-            # sync updates rshares incrementally per block.
-            cls._finish_posts_rshares(cls.db())
-
-            # Vacuum hive_posts to clean dead tuples before Part 0 scans it
-            cls.vacuum_tables_in_threads([f"{SCHEMA_NAME}.hive_posts"])
-            cls._rshares_recalculated = True
-
-        methods = [
-            ('hive_feed_cache', cls._finish_hive_feed_cache, [cls.db(), last_imported_block, current_imported_block]),
-            (
-                'hive_posts',
-                cls._finish_hive_posts,
-                [cls.db(), massive_sync_preconditions, last_imported_block, current_imported_block],
-            ),
-            (
-                'blocks_consistency_flag',
-                cls._finish_blocks_consistency_flag,
-                [cls.db(), last_imported_block, current_imported_block],
-            ),
-        ]
-        if massive_sync_preconditions:
-            methods += [
-                ('payout_stats_view', cls._finish_payout_stats_view, [cls.db()]),
-                ('communities_posts_and_rank', cls._finish_communities_posts_and_rank, [cls.db()]),
-                ('muted_parents', cls._finish_muted_parents, [cls.db()]),
-            ]
-        # BM25 index creation is deferred from the index phase to here, running in
-        # parallel with the fills above. Takes ~31min but is hidden inside Part 0
-        # which takes ~48min, eliminating it from the critical path.
-        methods.append(('bm25_index', cls._restore_bm25_index, [cls.db()]))
-        cls.process_tasks_in_threads("[MASSIVE] %i threads finished filling tables. Part nr 0", methods)
-
-        if massive_sync_preconditions:
-            methods = [
-                ('notification_cache', cls._finish_notification_cache, [cls.db()]),
-                ('vote_notifications', cls._finish_vote_notifications, [cls.db()]),
-            ]
-            # Notifications are dependent on many tables, therefore it's necessary to calculate it at the end
-            cls.process_tasks_in_threads("[MASSIVE] %i threads finished filling tables. Part nr 1", methods)
-
-            # Recalculate reputation-based notification scores after all notifications are
-            # flushed and muted ones cleared. Runs sequentially to avoid concurrent access
-            # to hive_notification_cache with the tasks above.
-            cls._finish_reputation_notification_scores(cls.db())
+        cls._finalization = PhaseScheduler(
+            cls._finalization_tasks(massive_sync_preconditions, last_imported_block, current_imported_block)
+        )
+        try:
+            cls._finalization.run(
+                report_interval=cls._FINALIZE_REPORT_INTERVAL,
+                report=lambda scheduler: log.info("[MASSIVE] Finalization: %s", scheduler.describe_progress()),
+            )
+            for phase in cls._finalization.critical_path():
+                log.info("[MASSIVE] Finalization critical path: %s %.3fs", phase.name, phase.duration)
+        finally:
+            cls._finalization = None
 
         real_time = FOSM.stop(start_time)
 
@@ -736,6 +823,100 @@ class DbState:
         FOSM.clear()
         log.info("=== FILLING FINAL DATA INTO TABLES ===")
 
+    @classmethod
+    def _finalization_tasks(cls, massive_sync_preconditions, last_imported_block, current_imported_block):
+        """Finalization tasks, each started as soon as the tasks producing its inputs are finished.
+
+        Tasks updating the same table never run at the same time.
+        """
+
+        def task(description, method, *args):
+            def run():
+                FOSM.final_stat(description, cls.time_collector(method, args))
+
+            return run
+
+        def finish_posts_rshares():
+            # Creates ~54M dead tuples on hive_posts, which are vacuumed before other tasks
+            # scan the table. Only needs to run once per initial massive sync — small gaps on
+            # restart don't need full recalculation since live sync updates rshares incrementally.
+            cls._finish_posts_rshares(cls.db(), current_imported_block)
+            cls.vacuum_tables_in_threads([f"{SCHEMA_NAME}.hive_posts"])
+            cls._rshares_recalculated = True
+
+        initial = massive_sync_preconditions
+        blocks = (last_imported_block, current_imported_block)
+        posts_ready = ['posts_rshares']
+
+        tasks = [
+            Phase(
+                'posts_rshares',
+                task('posts_rshares', finish_posts_rshares),
+                writes=['hive_posts'],
+                enabled=initial and not cls._rshares_recalculated,
+            ),
+            # BM25 index creation is deferred from the index phase to here, it only
+            # reads hive_post_data, so it runs in parallel with all other tasks.
+            Phase('bm25_index', task('bm25_index', cls._restore_bm25_index, cls.db())),
+            Phase(
+                'hive_feed_cache',
+                task('hive_feed_cache', cls._finish_hive_feed_cache, cls.db(), *blocks),
+                after=posts_ready,
+                writes=['hive_feed_cache'],
+            ),
+            Phase(
+                'hive_posts',
+                task('hive_posts', cls._finish_hive_posts, cls.db(), initial, *blocks),
+                after=posts_ready,
+                writes=['hive_posts'],
+            ),
+            Phase(
+                'muted_parents',
+                task('muted_parents', cls._finish_muted_parents, cls.db()),
+                after=posts_ready,
+                writes=['hive_posts'],
+                enabled=initial,
+            ),
+            Phase(
+                'communities_posts_and_rank',
+                task('communities_posts_and_rank', cls._finish_communities_posts_and_rank, cls.db()),
+                after=posts_ready,
+                writes=['hive_communities'],
+                enabled=initial,
+            ),
+            # Notifications are dependent on many tables, therefore they wait for the final posts
+            Phase(
+                'notification_cache',
+                task('notification_cache', cls._finish_notification_cache, cls.db()),
+                after=['hive_posts', 'muted_parents'],
+                enabled=initial,
+            ),
+            Phase(
+                'vote_notifications',
+                task('vote_notifications', cls._finish_vote_notifications, cls.db(), current_imported_block),
+                after=['hive_posts', 'muted_parents'],
+                enabled=initial,
+            ),
+            # Recalculate reputation-based notification scores after all notifications are
+            # flushed and muted ones cleared.
+            Phase(
+                'reputation_notification_scores',
+                task('reputation_notification_scores', cls._finish_reputation_notification_scores, cls.db()),
+                after=['notification_cache', 'vote_notifications'],
+                writes=['hive_notification_cache'],
+                enabled=initial,
+            ),
+        ]
+        # Marks the range as completed, so it goes last: finalization interrupted earlier is repeated
+        tasks.append(
+            Phase(
+                'blocks_consistency_flag',
+                task('blocks_consistency_flag', cls._finish_blocks_consistency_flag, cls.db(), *blocks),
+                after=[phase.name for phase in tasks],
+            )
+        )
+        return tasks
+
     @classmethod
     def vacuum_tables_in_threads(cls, tables):
         def vacuum_table(table, db):
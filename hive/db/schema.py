@@ -183,6 +183,8 @@ def setup(db, admin_db):
     # Execute plpython3u scripts with admin privileges
     admin_sql_scripts = [
         "postgrest/utilities/preprocess_search_query.sql",
+        "post_body_patches.sql",
+        "live_block_notify.sql",
     ]
     for script in admin_sql_scripts:
         execute_sql_script(admin_db.query_no_return, sql_scripts_dir_path / script)
@@ -201,6 +203,7 @@ def setup_runtime_code(db):
         "get_post_view_by_id.sql",
         "hive_post_operations.sql",
         "head_block_time.sql",
+        "range_partitions.sql",
         "update_feed_cache.sql",
         "payout_stats_view.sql",
         "update_communities_rank.sql",
@@ -363,6 +366,8 @@ def perform_db_upgrade(db, admin_db):
         "postgres_handle_view_changes.sql",
         "upgrade/upgrade_table_schema.sql",
         "upgrade/upgrade_runtime_migration.sql",
+        "post_body_patches.sql",
+        "live_block_notify.sql",
     ]
 
     sql_scripts_dir_path = Path(__file__).parent / 'sql_scripts'
@@ -427,6 +432,8 @@ def set_logged_table_attribute(db, logged):
       Phase 1: small dependent tables (hive_reblogs, hive_mentions) that have FKs
                to hive_accounts and hive_posts
       Phase 2: the main large tables (including hive_accounts, hive_posts)
+
+    Partitioned tables have no storage of their own, their partitions are converted instead.
     """
     from concurrent.futures import ThreadPoolExecutor, as_completed
     from time import perf_counter
@@ -448,6 +455,19 @@ def set_logged_table_attribute(db, logged):
         'hive_accounts',  # ~748 MB
     ]
 
+    def partitions_or_table(table):
+        partitions = db.query_col(
+            f"""
+            SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = '{SCHEMA_NAME}.{table}'::regclass
+            ORDER BY c.relname
+            """
+        )
+        return partitions or [table]
+
+    fk_dependent_tables = [name for table in fk_dependent_tables for name in partitions_or_table(table)]
+    main_tables = [name for table in main_tables for name in partitions_or_table(table)]
+
     mode = 'LOGGED' if logged else 'UNLOGGED'
 
     # When setting UNLOGGED: dependents first, then referenced tables
@@ -1,19 +1,66 @@
-DROP FUNCTION IF EXISTS hivemind_app.delete_hive_posts_mentions();
+-- hive_mentions is partitioned by block_num into partitions of one week of blocks (see range_partitions.sql),
+-- mentions older than 90 days are removed by dropping whole partitions.
+
+DROP FUNCTION IF EXISTS hivemind_app.mentions_partition_blocks;
+CREATE FUNCTION hivemind_app.mentions_partition_blocks()
+RETURNS INT
+LANGUAGE sql
+IMMUTABLE
+AS
+$function$
+  SELECT 201600; -- 7 days
+$function$
+;
+
+-- Creates partitions for mentions of blocks _first_block.._last_block and of the week after them.
+-- process_hive_post_mentions keeps no mentions of blocks outside of the 90 days window, so these get no partitions.
+DROP FUNCTION IF EXISTS hivemind_app.ensure_mentions_partitions;
+CREATE FUNCTION hivemind_app.ensure_mentions_partitions(_first_block INT, _last_block INT)
+RETURNS INT
+LANGUAGE sql
+VOLATILE
+AS
+$function$
+  SELECT hivemind_app.ensure_range_partitions(
+    'hive_mentions', 'block_num', hivemind_app.mentions_partition_blocks(),
+    GREATEST(_first_block, hivemind_app.block_before_irreversible('90 days') + 1),
+    _last_block + hivemind_app.mentions_partition_blocks()
+  );
+$function$
+;
 
-CREATE OR REPLACE FUNCTION hivemind_app.delete_hive_posts_mentions()
+-- Periodic maintenance of live sync: partitions ahead of the head block are created and ones older than
+-- 90 days dropped.
+DROP FUNCTION IF EXISTS hivemind_app.delete_hive_posts_mentions();
+CREATE FUNCTION hivemind_app.delete_hive_posts_mentions()
 RETURNS VOID
 LANGUAGE 'plpgsql'
 AS
 $function$
 DECLARE
-  __90_days_beyond_head_block_number INTEGER;
+  __head_block_number INTEGER := hive.app_get_current_block_num('hivemind_app');
 BEGIN
-
-  __90_days_beyond_head_block_number = hivemind_app.block_before_head('90 days'::interval);
-
-  DELETE FROM hivemind_app.hive_mentions
-  WHERE block_num < __90_days_beyond_head_block_number;
-
+  PERFORM hivemind_app.ensure_mentions_partitions(__head_block_number, __head_block_number);
+  PERFORM hivemind_app.drop_range_partitions(
+    'hive_mentions', 'block_num', hivemind_app.block_before_head('90 days'::interval) - 1
+  );
 END
 $function$
 ;
+
+-- Mentions of the window are moved from a table created before partitioning (see upgrade_table_schema.sql).
+DO
+$$
+BEGIN
+  IF to_regclass('hivemind_app.hive_mentions_unpartitioned') IS NOT NULL THEN
+    PERFORM hivemind_app.ensure_mentions_partitions(
+      hivemind_app.block_before_irreversible('90 days') + 1, hive.app_get_current_block_num('hivemind_app')
+    );
+    INSERT INTO hivemind_app.hive_mentions (post_id, account_id, block_num)
+    SELECT post_id, account_id, block_num
+    FROM hivemind_app.hive_mentions_unpartitioned
+    WHERE block_num > hivemind_app.block_before_irreversible('90 days');
+    DROP TABLE hivemind_app.hive_mentions_unpartitioned;
+  END IF;
+END
+$$;
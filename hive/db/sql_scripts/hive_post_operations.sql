@@ -811,7 +811,9 @@ BEGIN
                   SELECT DISTINCT m.post_id, m.account_id, m.block_num
                   FROM mentions AS m
                   LEFT JOIN delete_old_mentions AS dom ON dom.id = 0 -- force evaluation
-                  WHERE NOT EXISTS (
+                  -- only mentions of the 90 days window are kept, older ones would be dropped with their partitions
+                  WHERE m.block_num > hivemind_app.block_before_irreversible('90 days')
+                    AND NOT EXISTS (
                       SELECT 1 FROM
                       hivemind_app.hive_mentions AS hm
                       WHERE hm.post_id = m.post_id
@@ -0,0 +1,55 @@
+-- Wakes up live sync waiting for new blocks (--live-notify-wakeup).
+-- hivemind context is not forking, so blocks become available to it when HAF advances its irreversible
+-- block; the statement updating it notifies channel hivemind_app_block, delivered when hived commits.
+--
+-- The trigger is put on a table owned by HAF, so it runs inside hived's transactions, also ones made for other
+-- HAF apps. It's therefore installed only while the option is enabled (see DbState.initialize), and needs
+-- installing again (restarting sync with the option) after a HAF upgrade recreating the table.
+-- Triggers on HAF tables need the owner of the tables, so these functions are run with admin privileges.
+
+DROP FUNCTION IF EXISTS hivemind_app.notify_block_available() CASCADE;
+CREATE OR REPLACE FUNCTION hivemind_app.notify_block_available()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  PERFORM pg_notify('hivemind_app_block', '');
+  RETURN NULL;
+END
+$$;
+
+-- Creates or drops the trigger notifying about new irreversible blocks, only when it is not in the wanted state
+-- already, since both lock the HAF table. Returns whether the trigger is installed.
+DROP FUNCTION IF EXISTS hivemind_app.set_block_notify_trigger;
+CREATE FUNCTION hivemind_app.set_block_notify_trigger(_enabled BOOLEAN)
+RETURNS BOOLEAN
+LANGUAGE plpgsql
+VOLATILE
+AS $$
+DECLARE
+  _state_table REGCLASS := COALESCE(to_regclass('hafd.hive_state'), to_regclass('hafd.irreversible_data'));
+  _installed BOOLEAN;
+BEGIN
+  IF _state_table IS NULL THEN
+    IF _enabled THEN
+      RAISE NOTICE 'No HAF irreversible block table found, live sync can only poll for new blocks';
+    END IF;
+    RETURN FALSE;
+  END IF;
+
+  _installed := EXISTS (
+    SELECT 1 FROM pg_trigger
+    WHERE tgrelid = _state_table AND tgname = 'hivemind_app_notify_block_available'
+  );
+  IF _enabled AND NOT _installed THEN
+    EXECUTE format(
+      'CREATE TRIGGER hivemind_app_notify_block_available AFTER UPDATE ON %s '
+      'FOR EACH STATEMENT EXECUTE FUNCTION hivemind_app.notify_block_available()',
+      _state_table
+    );
+  ELSIF NOT _enabled AND _installed THEN
+    EXECUTE format('DROP TRIGGER hivemind_app_notify_block_available ON %s', _state_table);
+  END IF;
+  RETURN _enabled;
+END
+$$;
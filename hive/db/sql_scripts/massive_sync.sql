@@ -17,6 +17,18 @@ CREATE TABLE IF NOT EXISTS hivemind_app._batch_queue (
     last_block  INT NOT NULL
 );
 
+-- Finalization checkpoints: id ranges already processed by chunked finalization tasks
+-- (see hive/db/chunked_task.py), written in the transaction of the range itself.
+-- Ranges of a finalization up to another block are stale and ignored.
+-- MUST remain LOGGED (not UNLOGGED) to survive PostgreSQL crash recovery.
+CREATE TABLE IF NOT EXISTS hivemind_app._finalize_checkpoints (
+    task        TEXT NOT NULL,
+    run_block   INT NOT NULL,
+    first_id    INT NOT NULL,
+    last_id     INT NOT NULL,
+    PRIMARY KEY (task, first_id)
+);
+
 CREATE UNLOGGED TABLE IF NOT EXISTS hivemind_app._ops_staging (
     id          BIGINT NOT NULL,       -- HAF operation ID (ordering)
     block_num   INT NOT NULL,
@@ -32,6 +44,28 @@ DROP INDEX IF EXISTS hivemind_app._ops_staging_block_num_id_idx;
 CREATE INDEX _ops_staging_op_type_id_idx ON hivemind_app._ops_staging (op_type_id);
 CREATE INDEX _ops_staging_block_num_id_idx ON hivemind_app._ops_staging (block_num, id);
 
+-- Double-buffered staging: prefetch_ops_staging() loads the NEXT batch range into its
+-- own slot (keyed by the batch block range) on a separate connection while the current
+-- batch is still being applied from _ops_staging. load_ops_staging() then moves the slot
+-- rows into _ops_staging instead of scanning operations_view again.
+-- A slot is only valid once its row in _ops_staging_slots exists (both are written in
+-- the same transaction), so a half-loaded slot is never consumed.
+CREATE UNLOGGED TABLE IF NOT EXISTS hivemind_app._ops_staging_prefetch (
+    slot_first_block INT NOT NULL,
+    slot_last_block  INT NOT NULL,
+    id          BIGINT NOT NULL,
+    block_num   INT NOT NULL,
+    block_date  TIMESTAMP NOT NULL,
+    op_type_id  SMALLINT NOT NULL,
+    val         JSONB
+);
+
+CREATE UNLOGGED TABLE IF NOT EXISTS hivemind_app._ops_staging_slots (
+    first_block INT NOT NULL,
+    last_block  INT NOT NULL,
+    PRIMARY KEY (first_block, last_block)
+);
+
 -- Persistent unlogged tables for process_posts_from_staging (avoids PL/pgSQL stale OID with temp tables)
 DROP TABLE IF EXISTS hivemind_app._comment_staging;
 CREATE UNLOGGED TABLE hivemind_app._comment_staging (
@@ -86,7 +120,9 @@ CREATE UNLOGGED TABLE hivemind_app._vote_batch (
     rshares     BIGINT,
     is_effective BOOLEAN,
     num_changes INT,
-    block_num   INT
+    block_num   INT,
+    post_id     INT,
+    permlink_id INT
 );
 
 -- Persistent staging tables for reblog processing
@@ -165,15 +201,12 @@ $function$ LANGUAGE plpgsql IMMUTABLE;
 -- 2. load_ops_staging(_first_block, _last_block)
 -- ============================================================================
 
-CREATE OR REPLACE FUNCTION hivemind_app.load_ops_staging(
+-- Single scan of operations_view for a block range, shared by the direct load and
+-- the prefetch into a staging slot.
+CREATE OR REPLACE FUNCTION hivemind_app.ops_for_staging(
     _first_block INT,
     _last_block INT
-) RETURNS VOID AS $function$
-BEGIN
-    TRUNCATE hivemind_app._ops_staging;
-    TRUNCATE hivemind_app._follow_notification_events;
-
-    INSERT INTO hivemind_app._ops_staging (id, block_num, block_date, op_type_id, val)
+) RETURNS TABLE (id BIGINT, block_num INT, block_date TIMESTAMP, op_type_id SMALLINT, val JSONB) AS $function$
     WITH block_dates AS (
         -- Single scan of blocks_view; lag() gives us the previous block's date
         -- without a second join. Include _first_block - 1 so that lag() has a
@@ -200,7 +233,42 @@ BEGIN
         OR ho.custom_json_type_id IN (
             SELECT cjt.id FROM hafd.custom_json_types cjt
             WHERE cjt.custom_json_id IN ('follow', 'reblog', 'community', 'notify')
-        ));
+        ))
+$function$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION hivemind_app.load_ops_staging(
+    _first_block INT,
+    _last_block INT
+) RETURNS VOID AS $function$
+BEGIN
+    TRUNCATE hivemind_app._ops_staging;
+    TRUNCATE hivemind_app._follow_notification_events;
+
+    -- Slots left behind by ranges that were already processed (e.g. a prefetch that
+    -- finished after a crash replay loaded the same range directly) are never consumed.
+    DELETE FROM hivemind_app._ops_staging_prefetch WHERE slot_last_block < _first_block;
+    DELETE FROM hivemind_app._ops_staging_slots WHERE last_block < _first_block;
+
+    IF EXISTS (
+        SELECT 1 FROM hivemind_app._ops_staging_slots ss
+        WHERE ss.first_block = _first_block AND ss.last_block = _last_block
+    ) THEN
+        -- Range was prefetched while the previous batch was applied: move its slot.
+        WITH moved AS (
+            DELETE FROM hivemind_app._ops_staging_prefetch p
+            WHERE p.slot_first_block = _first_block AND p.slot_last_block = _last_block
+            RETURNING p.id, p.block_num, p.block_date, p.op_type_id, p.val
+        )
+        INSERT INTO hivemind_app._ops_staging (id, block_num, block_date, op_type_id, val)
+        SELECT m.id, m.block_num, m.block_date, m.op_type_id, m.val FROM moved m;
+
+        DELETE FROM hivemind_app._ops_staging_slots ss
+        WHERE ss.first_block = _first_block AND ss.last_block = _last_block;
+    ELSE
+        INSERT INTO hivemind_app._ops_staging (id, block_num, block_date, op_type_id, val)
+        SELECT o.id, o.block_num, o.block_date, o.op_type_id, o.val
+        FROM hivemind_app.ops_for_staging(_first_block, _last_block) o;
+    END IF;
 
     -- Partial ANALYZE: skip the expensive val JSONB column
     ANALYZE hivemind_app._ops_staging (op_type_id, block_num);
@@ -208,6 +276,38 @@ END
 $function$ LANGUAGE plpgsql VOLATILE;
 
 
+-- prefetch_ops_staging(_first_block, _last_block)
+-- Fills the staging slot of a batch that is already registered in _batch_queue but not
+-- yet processed. Runs on its own connection, concurrently with phases 2-6 of the
+-- previous batch, which only read _ops_staging. Idempotent: an existing slot for the
+-- same range is replaced.
+CREATE OR REPLACE FUNCTION hivemind_app.prefetch_ops_staging(
+    _first_block INT,
+    _last_block INT
+) RETURNS INT AS $function$
+DECLARE
+    _count INT := 0;
+BEGIN
+    DELETE FROM hivemind_app._ops_staging_prefetch p
+    WHERE p.slot_first_block = _first_block AND p.slot_last_block = _last_block;
+    DELETE FROM hivemind_app._ops_staging_slots ss
+    WHERE ss.first_block = _first_block AND ss.last_block = _last_block;
+
+    INSERT INTO hivemind_app._ops_staging_prefetch
+        (slot_first_block, slot_last_block, id, block_num, block_date, op_type_id, val)
+    SELECT _first_block, _last_block, o.id, o.block_num, o.block_date, o.op_type_id, o.val
+    FROM hivemind_app.ops_for_staging(_first_block, _last_block) o;
+
+    GET DIAGNOSTICS _count = ROW_COUNT;
+
+    INSERT INTO hivemind_app._ops_staging_slots (first_block, last_block)
+    VALUES (_first_block, _last_block);
+
+    RETURN _count;
+END
+$function$ LANGUAGE plpgsql VOLATILE;
+
+
 -- ============================================================================
 -- 3. process_accounts_from_staging()
 -- ============================================================================
@@ -322,12 +422,10 @@ $function$ LANGUAGE plpgsql VOLATILE;
 -- 4. process_votes_from_staging()
 -- ============================================================================
 
-CREATE OR REPLACE FUNCTION hivemind_app.process_votes_from_staging(
-    _last_safe_cashout_block INT DEFAULT 0
-) RETURNS INT AS $function$
+CREATE OR REPLACE FUNCTION hivemind_app.prepare_vote_batch_from_staging()
+RETURNS INT AS $function$
 DECLARE
     _count INT := 0;
-    _affected_post_ids INT[];
 BEGIN
     -- Process vote ops (type 0) and effective_comment_vote ops (type 72)
     -- from the staging table.
@@ -340,8 +438,9 @@ BEGIN
     --   - From type 0 (VOTE): vote_percent, last_update from the LAST occurrence
     --   - From type 72 (ECV): weight, rshares from the LAST occurrence
     --   - num_changes = count of effective_comment_vote ops
-
-    -- Step 1: Collect and deduplicate vote data
+    --
+    -- Votes are resolved to their post here, so apply_vote_batch() can split
+    -- the batch by post_id between concurrent connections.
     TRUNCATE hivemind_app._vote_batch;
     INSERT INTO hivemind_app._vote_batch
     WITH vote_ops AS (
@@ -415,52 +514,74 @@ BEGIN
         FROM last_vote v
         FULL OUTER JOIN last_ecv e
             ON v.voter = e.voter AND v.author = e.author AND v.permlink = e.permlink
+    ),
+    resolved AS (
+        SELECT
+            m.voter,
+            ha_voter.id AS voter_id,
+            m.author,
+            ha_author.id AS author_id,
+            m.permlink,
+            m.vote_percent,
+            m.last_update,
+            m.weight,
+            m.rshares,
+            m.is_effective,
+            m.num_changes,
+            m.block_num
+        FROM merged m
+        JOIN hivemind_app.hive_accounts ha_voter ON ha_voter.name = m.voter
+        JOIN hivemind_app.hive_accounts ha_author ON ha_author.name = m.author
     )
     SELECT
-        m.voter,
-        ha_voter.id AS voter_id,
-        m.author,
-        ha_author.id AS author_id,
-        m.permlink,
-        m.vote_percent,
-        m.last_update,
-        m.weight,
-        m.rshares,
-        m.is_effective,
-        m.num_changes,
-        m.block_num
-    FROM merged m
-    JOIN hivemind_app.hive_accounts ha_voter ON ha_voter.name = m.voter
-    JOIN hivemind_app.hive_accounts ha_author ON ha_author.name = m.author;
+        r.*,
+        hp.id AS post_id,
+        hpd.id AS permlink_id
+    FROM resolved r
+    JOIN hivemind_app.hive_permlink_data hpd ON hpd.permlink = r.permlink
+    JOIN hivemind_app.hive_posts hp
+        ON hp.author_id = r.author_id
+        AND hp.permlink_id = hpd.id
+        AND hp.counter_deleted = 0
+    -- Filter out votes cast before the post was recreated (delete/recreate cycle).
+    -- The old Python code removed in-memory votes on delete, preventing stale votes
+    -- from being flushed for recreated posts.
+    -- Use block_num_created (not block_num) because block_num is updated on edits,
+    -- which would incorrectly filter out votes cast between creation and edit.
+    WHERE r.block_num >= hp.block_num_created;
 
-    -- Step 2: Insert/update votes with resolved post_id
-    WITH vote_with_post AS (
-        SELECT
-            vb.*,
-            hp.id AS post_id,
-            hpd.id AS permlink_id
-        FROM hivemind_app._vote_batch vb
-        JOIN hivemind_app.hive_permlink_data hpd ON hpd.permlink = vb.permlink
-        JOIN hivemind_app.hive_posts hp
-            ON hp.author_id = vb.author_id
-            AND hp.permlink_id = hpd.id
-            AND hp.counter_deleted = 0
-        -- Filter out votes cast before the post was recreated (delete/recreate cycle).
-        -- The old Python code removed in-memory votes on delete, preventing stale votes
-        -- from being flushed for recreated posts.
-        -- Use block_num_created (not block_num) because block_num is updated on edits,
-        -- which would incorrectly filter out votes cast between creation and edit.
-        WHERE vb.block_num >= hp.block_num_created
-    ),
-    upserted AS (
+    GET DIAGNOSTICS _count = ROW_COUNT;
+    RETURN _count;
+END
+$function$ LANGUAGE plpgsql VOLATILE;
+
+
+DROP FUNCTION IF EXISTS hivemind_app.apply_vote_batch(INT, INT);
+CREATE OR REPLACE FUNCTION hivemind_app.apply_vote_batch(
+    _partition INT DEFAULT 0,
+    _partitions INT DEFAULT 1,
+    _update_rshares BOOLEAN DEFAULT FALSE
+) RETURNS INT AS $function$
+DECLARE
+    _count INT := 0;
+    _affected_post_ids INT[];
+BEGIN
+    -- Insert/update votes of the partition of _vote_batch with post_id % _partitions = _partition.
+    -- All votes of a (voter, author, permlink) key belong to the same post, so partitions
+    -- never upsert the same hive_votes row and can run concurrently on separate connections.
+    --
+    -- With _update_rshares, rshares aggregates of the voted posts are updated in the same call
+    -- (live sync and MASSIVE_WITH_INDEXES), so they don't have to be found again in hive_votes.
+    WITH upserted AS (
         INSERT INTO hivemind_app.hive_votes
             (post_id, voter_id, author_id, permlink_id, weight, rshares,
              vote_percent, last_update, num_changes, block_num, is_effective)
         SELECT
-            vwp.post_id, vwp.voter_id, vwp.author_id, vwp.permlink_id,
-            vwp.weight, vwp.rshares, vwp.vote_percent, vwp.last_update,
-            vwp.num_changes, vwp.block_num, vwp.is_effective
-        FROM vote_with_post vwp
+            vb.post_id, vb.voter_id, vb.author_id, vb.permlink_id,
+            vb.weight, vb.rshares, vb.vote_percent, vb.last_update,
+            vb.num_changes, vb.block_num, vb.is_effective
+        FROM hivemind_app._vote_batch vb
+        WHERE _partitions = 1 OR vb.post_id % _partitions = _partition
         ON CONFLICT ON CONSTRAINT hive_votes_voter_id_author_id_permlink_id_uk DO UPDATE SET
             post_id = EXCLUDED.post_id,
             weight = CASE EXCLUDED.is_effective
@@ -486,14 +607,31 @@ BEGIN
     INTO _count, _affected_post_ids
     FROM upserted;
 
+    IF _update_rshares AND _affected_post_ids IS NOT NULL THEN
+        PERFORM hivemind_app.update_posts_rshares(_affected_post_ids);
+    END IF;
+
+    RETURN _count;
+END
+$function$ LANGUAGE plpgsql VOLATILE;
+
+
+DROP FUNCTION IF EXISTS hivemind_app.process_votes_from_staging(INT);
+CREATE OR REPLACE FUNCTION hivemind_app.process_votes_from_staging(
+    _last_safe_cashout_block INT DEFAULT 0,
+    _update_rshares BOOLEAN DEFAULT FALSE
+) RETURNS INT AS $function$
+BEGIN
+    PERFORM hivemind_app.prepare_vote_batch_from_staging();
+
     -- Rshares aggregates (sc_hot, sc_trend, etc.) are NOT updated per-batch during
-    -- massive sync. The key index (hive_votes_post_id_block_num_rshares_vote_is_effective_idx)
+    -- massive sync without indexes. The key index (hive_votes_post_id_block_num_rshares_vote_is_effective_idx)
     -- is dropped for write performance, making per-batch update_posts_rshares() extremely
     -- expensive. Instead, recalculate_all_posts_rshares() runs once at finalization after
     -- indexes are recreated (see DbState._finish_posts_rshares).
 
     -- Table is truncated at start of next call, no drop needed
-    RETURN _count;
+    RETURN hivemind_app.apply_vote_batch(0, 1, _update_rshares);
 END
 $function$ LANGUAGE plpgsql VOLATILE;
 
@@ -1648,6 +1786,89 @@ END
 $function$ LANGUAGE plpgsql VOLATILE;
 
 
+-- ============================================================================
+-- 9a. process_post_data_from_staging()
+-- ============================================================================
+
+-- Server-side alternative of Python PostDataCache merging (--post-body-merge-engine=sql).
+-- Applies title/body/json of the posts returned by the last process_posts_from_staging()
+-- call to hive_post_data. Body definitions of each post are chained in operation order
+-- through apply_body_patches(), starting from the body of a post created in this batch or
+-- from the stored one. Returns number of written posts.
+DROP FUNCTION IF EXISTS hivemind_app.process_post_data_from_staging();
+CREATE OR REPLACE FUNCTION hivemind_app.process_post_data_from_staging()
+RETURNS INT AS $function$
+DECLARE
+    _post_ids INT[];
+BEGIN
+    WITH ops AS (
+        SELECT
+            pr.seq_id,
+            pr.post_id,
+            pr.is_new_post,
+            CASE WHEN pr.is_new_post THEN COALESCE(pr.op_body->>'title', '') ELSE NULLIF(pr.op_body->>'title', '') END AS title,
+            CASE WHEN pr.is_new_post THEN COALESCE(pr.op_body->>'body', '') ELSE NULLIF(pr.op_body->>'body', '') END AS body,
+            CASE WHEN pr.is_new_post THEN COALESCE(pr.op_body->>'json_metadata', '') ELSE NULLIF(pr.op_body->>'json_metadata', '') END AS json
+        FROM hivemind_app._post_results pr
+        WHERE pr.op_body IS NOT NULL
+    ),
+    posts AS (
+        SELECT
+            ops.post_id,
+            bool_or(ops.is_new_post) AS is_new_post,
+            (array_agg(ops.title ORDER BY ops.seq_id DESC) FILTER (WHERE ops.title IS NOT NULL))[1] AS title,
+            (array_agg(ops.json ORDER BY ops.seq_id DESC) FILTER (WHERE ops.json IS NOT NULL))[1] AS json,
+            (array_agg(ops.body ORDER BY ops.seq_id) FILTER (WHERE ops.is_new_post))[1] AS created_body,
+            array_agg(ops.body ORDER BY ops.seq_id) FILTER (WHERE NOT ops.is_new_post AND ops.body IS NOT NULL) AS body_defs
+        FROM ops
+        GROUP BY ops.post_id
+    ),
+    merged AS (
+        SELECT
+            p.post_id,
+            p.is_new_post,
+            p.title,
+            p.json,
+            CASE
+                WHEN p.body_defs IS NULL THEN p.created_body
+                -- only diff_match_patch patches (starting with a hunk header) depend on the previous body
+                WHEN NOT EXISTS (SELECT 1 FROM unnest(p.body_defs) d WHERE d LIKE '@@ -%') THEN p.body_defs[array_length(p.body_defs, 1)]
+                WHEN p.is_new_post THEN hivemind_app.apply_body_patches(p.created_body, p.body_defs)
+                ELSE hivemind_app.apply_body_patches(
+                    (SELECT hpd.body FROM hivemind_app.hive_post_data hpd WHERE hpd.id = p.post_id), p.body_defs)
+            END AS body
+        FROM posts p
+    ),
+    insert_post_data AS (
+        INSERT INTO hivemind_app.hive_post_data (id, title, body, json)
+        SELECT m.post_id, m.title, m.body, m.json FROM merged m
+        WHERE m.is_new_post
+        RETURNING id
+    ),
+    update_post_data AS (
+        UPDATE hivemind_app.hive_post_data AS hpd
+        SET title = COALESCE( m.title, hpd.title ),
+            body = COALESCE( m.body, hpd.body ),
+            json = COALESCE( m.json, hpd.json )
+        FROM merged m
+        WHERE hpd.id = m.post_id AND NOT m.is_new_post
+        RETURNING hpd.id
+    ),
+    combined AS (
+        SELECT id FROM insert_post_data
+        UNION ALL
+        SELECT id FROM update_post_data
+    )
+    SELECT array_agg(id) INTO _post_ids FROM combined;
+
+    -- separate statement, so the mention scan sees bodies written above
+    PERFORM hivemind_app.process_hive_post_mentions(_post_ids) WHERE _post_ids IS NOT NULL;
+
+    RETURN COALESCE(array_length(_post_ids, 1), 0);
+END
+$function$ LANGUAGE plpgsql VOLATILE;
+
+
 -- ============================================================================
 -- 9b. Validation helpers for community ops (match Python CommunityOp validation)
 -- ============================================================================
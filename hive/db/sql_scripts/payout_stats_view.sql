@@ -1,30 +1,222 @@
-DROP MATERIALIZED VIEW IF EXISTS hivemind_app.payout_stats_view;
+-- Pending payouts of unpaid posts, by community and author, read by bridge_api_get_payout_stats.
+-- Sums are kept in hive_payout_stats (by author, community_id 0 for posts outside communities) and
+-- hive_payout_stats_community, updated with the change of every statement modifying hive_posts.
+-- Sums of pending_payout alone are kept for ranks of communities (see update_communities_rank.sql).
+-- Massive sync disables the triggers and rebuilds the sums when live sync starts
+-- (see set_payout_stats_maintained).
 
-CREATE MATERIALIZED VIEW hivemind_app.payout_stats_view AS
+DO
+$$
+BEGIN
+  IF EXISTS (SELECT 1 FROM pg_matviews WHERE schemaname = 'hivemind_app' AND matviewname = 'payout_stats_view') THEN
+    DROP MATERIALIZED VIEW hivemind_app.payout_stats_view;
+  END IF;
+END
+$$;
+
+CREATE OR REPLACE VIEW hivemind_app.payout_stats_view AS
   SELECT
-      hp1.community_id,
+      NULLIF(ps.community_id, 0) AS community_id,
       ha.name AS author,
-      SUM( hp1.payout + hp1.pending_payout ) AS payout,
-      COUNT(*) AS posts,
-      NULL AS authors
-  FROM hivemind_app.hive_posts hp1
-      JOIN hivemind_app.hive_accounts ha ON ha.id = hp1.author_id
-  WHERE hp1.counter_deleted = 0 AND NOT hp1.is_paidout AND hp1.id != 0
-  GROUP BY community_id, author
+      ps.payout,
+      ps.posts::BIGINT AS posts,
+      NULL::BIGINT AS authors
+  FROM hivemind_app.hive_payout_stats ps
+      JOIN hivemind_app.hive_accounts ha ON ha.id = ps.author_id
 
   UNION ALL
 
   SELECT
-        hp2.community_id,
-        NULL AS author,
-        SUM( hp2.payout + hp2.pending_payout ) AS payout,
-        COUNT(*) AS posts,
-        COUNT(DISTINCT(author_id)) AS authors
-  FROM hivemind_app.hive_posts hp2
-  WHERE hp2.counter_deleted = 0 AND NOT hp2.is_paidout AND hp2.id != 0
-  GROUP BY community_id
-
-WITH DATA
+      NULLIF(psc.community_id, 0) AS community_id,
+      NULL AS author,
+      psc.payout,
+      psc.posts::BIGINT AS posts,
+      psc.authors::BIGINT AS authors
+  FROM hivemind_app.hive_payout_stats_community psc
+;
+
+-- Adds changes of payout sums and post counts by (community, author), dropping sums of no posts.
+DROP FUNCTION IF EXISTS hivemind_app.add_payout_stats;
+CREATE FUNCTION hivemind_app.add_payout_stats(
+    _community_ids INT[], _author_ids INT[], _payouts NUMERIC[], _pendings NUMERIC[], _posts INT[]
+)
+RETURNS VOID
+LANGUAGE plpgsql
+VOLATILE
+AS
+$function$
+BEGIN
+  WITH delta AS (
+    SELECT d.community_id, d.author_id, d.payout, d.pending, d.posts
+    FROM unnest(_community_ids, _author_ids, _payouts, _pendings, _posts) AS d(community_id, author_id, payout, pending, posts)
+  ),
+  by_author AS (
+    INSERT INTO hivemind_app.hive_payout_stats AS ps (community_id, author_id, payout, pending, posts)
+    SELECT community_id, author_id, payout, pending, posts FROM delta
+    ON CONFLICT (community_id, author_id) DO UPDATE SET
+      payout = ps.payout + EXCLUDED.payout,
+      pending = ps.pending + EXCLUDED.pending,
+      posts = ps.posts + EXCLUDED.posts
+    RETURNING ps.community_id, ps.author_id, ps.posts
+  )
+  INSERT INTO hivemind_app.hive_payout_stats_community AS psc (community_id, payout, pending, posts, authors)
+  SELECT
+      d.community_id,
+      SUM(d.payout),
+      SUM(d.pending),
+      SUM(d.posts),
+      -- authors with pending posts now, less those which had some before
+      SUM((a.posts > 0)::INT - ((a.posts - d.posts) > 0)::INT)
+  FROM by_author a
+  JOIN delta d ON d.community_id = a.community_id AND d.author_id = a.author_id
+  GROUP BY d.community_id
+  ON CONFLICT (community_id) DO UPDATE SET
+    payout = psc.payout + EXCLUDED.payout,
+    pending = psc.pending + EXCLUDED.pending,
+    posts = psc.posts + EXCLUDED.posts,
+    authors = psc.authors + EXCLUDED.authors;
+
+  DELETE FROM hivemind_app.hive_payout_stats ps
+  USING unnest(_community_ids, _author_ids) AS d(community_id, author_id)
+  WHERE ps.community_id = d.community_id AND ps.author_id = d.author_id AND ps.posts = 0;
+
+  DELETE FROM hivemind_app.hive_payout_stats_community psc
+  WHERE psc.community_id = ANY(_community_ids) AND psc.posts = 0;
+END
+$function$
+;
+
+-- Statement trigger of hive_posts: sums of unpaid posts after the statement, less sums before it.
+-- Replaced, not dropped, which would drop the triggers too.
+CREATE OR REPLACE FUNCTION hivemind_app.payout_stats_delta()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS
+$function$
+BEGIN
+  IF TG_OP = 'INSERT' THEN
+    PERFORM hivemind_app.add_payout_stats(
+      array_agg(community_id), array_agg(author_id), array_agg(payout), array_agg(pending), array_agg(posts)
+    )
+    FROM (
+      SELECT
+          COALESCE(n.community_id, 0) AS community_id, n.author_id,
+          SUM(n.payout + n.pending_payout) AS payout, SUM(n.pending_payout) AS pending, COUNT(*)::INT AS posts
+      FROM new_rows n
+      WHERE n.counter_deleted = 0 AND NOT n.is_paidout AND n.id != 0
+      GROUP BY 1, 2
+    ) d
+    HAVING COUNT(*) > 0;
+  ELSIF TG_OP = 'UPDATE' THEN
+    PERFORM hivemind_app.add_payout_stats(
+      array_agg(community_id), array_agg(author_id), array_agg(payout), array_agg(pending), array_agg(posts)
+    )
+    FROM (
+      SELECT c.community_id, c.author_id, SUM(c.payout) AS payout, SUM(c.pending) AS pending, SUM(c.posts)::INT AS posts
+      FROM (
+        SELECT
+            COALESCE(n.community_id, 0) AS community_id, n.author_id,
+            n.payout + n.pending_payout AS payout, n.pending_payout AS pending, 1 AS posts
+        FROM new_rows n
+        WHERE n.counter_deleted = 0 AND NOT n.is_paidout AND n.id != 0
+        UNION ALL
+        SELECT COALESCE(o.community_id, 0), o.author_id, -(o.payout + o.pending_payout), -o.pending_payout, -1
+        FROM old_rows o
+        WHERE o.counter_deleted = 0 AND NOT o.is_paidout AND o.id != 0
+      ) c
+      GROUP BY 1, 2
+      HAVING SUM(c.payout) != 0 OR SUM(c.pending) != 0 OR SUM(c.posts) != 0
+    ) d
+    HAVING COUNT(*) > 0;
+  ELSIF TG_OP = 'DELETE' THEN
+    PERFORM hivemind_app.add_payout_stats(
+      array_agg(community_id), array_agg(author_id), array_agg(payout), array_agg(pending), array_agg(posts)
+    )
+    FROM (
+      SELECT
+          COALESCE(o.community_id, 0) AS community_id, o.author_id,
+          -SUM(o.payout + o.pending_payout) AS payout, -SUM(o.pending_payout) AS pending, -COUNT(*)::INT AS posts
+      FROM old_rows o
+      WHERE o.counter_deleted = 0 AND NOT o.is_paidout AND o.id != 0
+      GROUP BY 1, 2
+    ) d
+    HAVING COUNT(*) > 0;
+  END IF;
+  RETURN NULL;
+END
+$function$
 ;
 
-CREATE UNIQUE INDEX IF NOT EXISTS payout_stats_view_ix1 ON hivemind_app.payout_stats_view (community_id, author );
+-- Recomputes the sums from all unpaid posts.
+DROP FUNCTION IF EXISTS hivemind_app.rebuild_payout_stats;
+CREATE FUNCTION hivemind_app.rebuild_payout_stats()
+RETURNS VOID
+LANGUAGE sql
+VOLATILE
+AS
+$function$
+  DELETE FROM hivemind_app.hive_payout_stats;
+  DELETE FROM hivemind_app.hive_payout_stats_community;
+
+  INSERT INTO hivemind_app.hive_payout_stats (community_id, author_id, payout, pending, posts)
+  SELECT COALESCE(hp.community_id, 0), hp.author_id, SUM(hp.payout + hp.pending_payout), SUM(hp.pending_payout), COUNT(*)
+  FROM hivemind_app.hive_posts hp
+  WHERE hp.counter_deleted = 0 AND NOT hp.is_paidout AND hp.id != 0
+  GROUP BY 1, 2;
+
+  INSERT INTO hivemind_app.hive_payout_stats_community (community_id, payout, pending, posts, authors)
+  SELECT ps.community_id, SUM(ps.payout), SUM(ps.pending), SUM(ps.posts), COUNT(*)
+  FROM hivemind_app.hive_payout_stats ps
+  GROUP BY ps.community_id;
+$function$
+;
+
+-- Triggers are created once, so their state set by set_payout_stats_maintained survives reinstallation of this script.
+-- The sums start from all posts when they are created, also in a database synced before they existed.
+DO
+$$
+BEGIN
+  IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'hive_posts_payout_stats_insert' AND tgrelid = 'hivemind_app.hive_posts'::regclass) THEN
+    CREATE TRIGGER hive_posts_payout_stats_insert AFTER INSERT ON hivemind_app.hive_posts
+      REFERENCING NEW TABLE AS new_rows
+      FOR EACH STATEMENT EXECUTE FUNCTION hivemind_app.payout_stats_delta();
+    CREATE TRIGGER hive_posts_payout_stats_update AFTER UPDATE ON hivemind_app.hive_posts
+      REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+      FOR EACH STATEMENT EXECUTE FUNCTION hivemind_app.payout_stats_delta();
+    CREATE TRIGGER hive_posts_payout_stats_delete AFTER DELETE ON hivemind_app.hive_posts
+      REFERENCING OLD TABLE AS old_rows
+      FOR EACH STATEMENT EXECUTE FUNCTION hivemind_app.payout_stats_delta();
+    PERFORM hivemind_app.rebuild_payout_stats();
+  END IF;
+END
+$$;
+
+-- Enables or disables updating the sums with changes of hive_posts. Sums not updated while disabled are
+-- rebuilt when enabling, so it should be done when nothing else modifies hive_posts.
+DROP FUNCTION IF EXISTS hivemind_app.set_payout_stats_maintained;
+CREATE FUNCTION hivemind_app.set_payout_stats_maintained(_maintained BOOLEAN)
+RETURNS VOID
+LANGUAGE plpgsql
+VOLATILE
+AS
+$function$
+DECLARE
+  _enabled BOOLEAN;
+BEGIN
+  SELECT bool_and(tgenabled != 'D') INTO _enabled
+  FROM pg_trigger
+  WHERE tgrelid = 'hivemind_app.hive_posts'::regclass AND tgname LIKE 'hive_posts_payout_stats_%';
+
+  IF _maintained AND NOT _enabled THEN
+    ALTER TABLE hivemind_app.hive_posts ENABLE TRIGGER hive_posts_payout_stats_insert;
+    ALTER TABLE hivemind_app.hive_posts ENABLE TRIGGER hive_posts_payout_stats_update;
+    ALTER TABLE hivemind_app.hive_posts ENABLE TRIGGER hive_posts_payout_stats_delete;
+    PERFORM hivemind_app.rebuild_payout_stats();
+  ELSIF NOT _maintained AND _enabled THEN
+    ALTER TABLE hivemind_app.hive_posts DISABLE TRIGGER hive_posts_payout_stats_insert;
+    ALTER TABLE hivemind_app.hive_posts DISABLE TRIGGER hive_posts_payout_stats_update;
+    ALTER TABLE hivemind_app.hive_posts DISABLE TRIGGER hive_posts_payout_stats_delete;
+  END IF;
+END
+$function$
+;
@@ -0,0 +1,24 @@
+-- Server-side counterpart of hive.utils.post.apply_body_patches, used by process_post_data_from_staging
+-- when post bodies are merged in the database (--post-body-merge-engine=sql).
+-- Requires the diff-match-patch Python package to be installed for the PostgreSQL server's interpreter.
+
+DROP FUNCTION IF EXISTS hivemind_app.apply_body_patches(TEXT, TEXT[]);
+CREATE OR REPLACE FUNCTION hivemind_app.apply_body_patches(_body TEXT, _body_defs TEXT[])
+RETURNS TEXT
+LANGUAGE plpython3u
+IMMUTABLE
+AS $$
+from diff_match_patch import diff_match_patch
+
+dmp = diff_match_patch()
+body = _body
+for body_def in _body_defs:
+    try:
+        patch = dmp.patch_fromText(body_def)
+        body = dmp.patch_apply(patch, body)[0] if patch else body_def
+    except Exception:
+        body = body_def
+
+# text columns cannot store NUL characters
+return body.replace('\x00', ' ') if body is not None else None
+$$;
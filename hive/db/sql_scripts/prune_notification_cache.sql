@@ -1,15 +1,80 @@
+-- hive_notification_cache is partitioned by block_num into partitions of one week of blocks (see range_partitions.sql),
+-- so notifications older than 90 days are removed by dropping whole partitions.
+
+DROP FUNCTION IF EXISTS hivemind_app.notification_cache_partition_blocks;
+CREATE FUNCTION hivemind_app.notification_cache_partition_blocks()
+RETURNS INT
+LANGUAGE sql
+IMMUTABLE
+AS
+$function$
+  SELECT 201600; -- 7 days
+$function$
+;
+
+-- Creates partitions for notifications of blocks _first_block.._last_block and of the week after them.
+-- Blocks outside of the notification window have none, their notifications go to the default partition.
+DROP FUNCTION IF EXISTS hivemind_app.ensure_notification_cache_partitions;
+CREATE FUNCTION hivemind_app.ensure_notification_cache_partitions(_first_block INT, _last_block INT)
+RETURNS INT
+LANGUAGE sql
+VOLATILE
+AS
+$function$
+  SELECT hivemind_app.ensure_range_partitions(
+    'hive_notification_cache', 'block_num', hivemind_app.notification_cache_partition_blocks(),
+    GREATEST(_first_block, hivemind_app.block_before_irreversible('90 days') + 1),
+    _last_block + hivemind_app.notification_cache_partition_blocks()
+  );
+$function$
+;
+
+-- Drops notifications older than 90 days.
 DROP FUNCTION IF EXISTS hivemind_app.prune_notification_cache;
-CREATE OR REPLACE FUNCTION hivemind_app.prune_notification_cache(in _block_num INT)
+CREATE FUNCTION hivemind_app.prune_notification_cache()
+RETURNS INT
+LANGUAGE sql
+VOLATILE
+AS
+$function$
+  SELECT hivemind_app.drop_range_partitions(
+    'hive_notification_cache', 'block_num', hivemind_app.block_before_head('90 days')
+  );
+$function$
+;
+
+-- Periodic maintenance of live sync: partitions ahead of the head block are created and old ones dropped.
+DROP FUNCTION IF EXISTS hivemind_app.maintain_notification_cache_partitions;
+CREATE FUNCTION hivemind_app.maintain_notification_cache_partitions()
 RETURNS VOID
+LANGUAGE plpgsql
+VOLATILE
 AS
 $function$
 DECLARE
-  __limit_block hivemind_app.blocks_view.num%TYPE = hivemind_app.block_before_head( '90 days' );
+  _head_block INT := hive.app_get_current_block_num('hivemind_app');
 BEGIN
-  IF _block_num % 1200 = 0 THEN -- once per hour
-    DELETE FROM hivemind_app.hive_notification_cache nc WHERE nc.block_num <= __limit_block;
-  END IF;
+  PERFORM hivemind_app.ensure_notification_cache_partitions(_head_block, _head_block);
+  PERFORM hivemind_app.prune_notification_cache();
 END
 $function$
-LANGUAGE plpgsql VOLATILE
 ;
+
+-- Notifications of the window are moved from a table created before partitioning (see upgrade_table_schema.sql).
+DO
+$$
+BEGIN
+  IF to_regclass('hivemind_app.hive_notification_cache_unpartitioned') IS NOT NULL THEN
+    PERFORM hivemind_app.ensure_notification_cache_partitions(
+      hivemind_app.block_before_irreversible('90 days') + 1, hive.app_get_current_block_num('hivemind_app')
+    );
+    INSERT INTO hivemind_app.hive_notification_cache
+      (id, block_num, type_id, dst, src, dst_post_id, post_id, created_at, score, community_title, community, payload)
+    SELECT
+      id, block_num, type_id, dst, src, dst_post_id, post_id, created_at, score, community_title, community, payload
+    FROM hivemind_app.hive_notification_cache_unpartitioned
+    WHERE block_num > hivemind_app.block_before_head('90 days');
+    DROP TABLE hivemind_app.hive_notification_cache_unpartitioned;
+  END IF;
+END
+$$;
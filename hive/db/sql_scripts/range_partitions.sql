@@ -0,0 +1,85 @@
+-- Helpers of tables range-partitioned by block number into partitions of `_width` blocks, named
+-- <table>_<first block>, with rows outside of them in the <table>_default partition.
+
+-- Creates missing partitions for blocks _first_block.._last_block. Rows of a new partition's range which already went
+-- to the default partition are moved to it. The move locks these rows, and ATTACH PARTITION takes an ACCESS EXCLUSIVE
+-- lock on the default partition while scanning it for rows of the new range, so writers and readers of the table
+-- wait for it. Live sync runs it from the maintenance worker (see hive/indexer/maintenance.py), whose lock_timeout
+-- makes it give up and retry later instead of stalling block processing. A partition is UNLOGGED like the default
+-- partition during massive sync (see set_logged_table_attribute).
+DROP FUNCTION IF EXISTS hivemind_app.ensure_range_partitions;
+CREATE FUNCTION hivemind_app.ensure_range_partitions(
+    _table TEXT, _column TEXT, _width INT, _first_block INT, _last_block INT
+)
+RETURNS INT
+LANGUAGE plpgsql
+VOLATILE
+AS
+$function$
+DECLARE
+  _start INT := (GREATEST(_first_block, 0) / _width) * _width;
+  _partition TEXT;
+  _created INT := 0;
+  _persistence TEXT;
+BEGIN
+  SELECT CASE WHEN relpersistence = 'u' THEN 'UNLOGGED' ELSE '' END INTO _persistence
+  FROM pg_class WHERE oid = format('hivemind_app.%I', _table || '_default')::regclass;
+
+  WHILE _start <= _last_block LOOP
+    _partition := format('%s_%s', _table, _start);
+    IF to_regclass(format('hivemind_app.%I', _partition)) IS NULL THEN
+      EXECUTE format(
+        'CREATE %s TABLE hivemind_app.%I (LIKE hivemind_app.%I INCLUDING DEFAULTS INCLUDING CONSTRAINTS)',
+        _persistence, _partition, _table
+      );
+      EXECUTE format(
+        'WITH moved AS (DELETE FROM hivemind_app.%I WHERE %I >= %s AND %I < %s RETURNING *) '
+        'INSERT INTO hivemind_app.%I SELECT * FROM moved',
+        _table || '_default', _column, _start, _column, _start + _width, _partition
+      );
+      EXECUTE format(
+        'ALTER TABLE hivemind_app.%I ATTACH PARTITION hivemind_app.%I FOR VALUES FROM (%s) TO (%s)',
+        _table, _partition, _start, _start + _width
+      );
+      _created := _created + 1;
+    END IF;
+    _start := _start + _width;
+  END LOOP;
+  RETURN _created;
+END
+$function$
+;
+
+-- Detaches and drops partitions holding only blocks up to _limit_block, and deletes such rows from the
+-- default partition. Dropping a partition leaves no dead rows behind, unlike deleting them. DETACH PARTITION takes
+-- an ACCESS EXCLUSIVE lock on the parent table, which blocks its readers (also the API) until the transaction ends;
+-- the maintenance worker's lock_timeout limits how long they wait for it to get the lock.
+DROP FUNCTION IF EXISTS hivemind_app.drop_range_partitions;
+CREATE FUNCTION hivemind_app.drop_range_partitions(_table TEXT, _column TEXT, _limit_block INT)
+RETURNS INT
+LANGUAGE plpgsql
+VOLATILE
+AS
+$function$
+DECLARE
+  _partition RECORD;
+  _dropped INT := 0;
+BEGIN
+  FOR _partition IN
+    SELECT c.relname AS name, (regexp_match(pg_get_expr(c.relpartbound, c.oid), 'TO \(''?(\d+)''?\)'))[1]::INT AS upper_bound
+    FROM pg_inherits i
+    JOIN pg_class c ON c.oid = i.inhrelid
+    WHERE i.inhparent = format('hivemind_app.%I', _table)::regclass
+  LOOP
+    IF _partition.upper_bound IS NOT NULL AND _partition.upper_bound <= _limit_block + 1 THEN
+      EXECUTE format('ALTER TABLE hivemind_app.%I DETACH PARTITION hivemind_app.%I', _table, _partition.name);
+      EXECUTE format('DROP TABLE hivemind_app.%I', _partition.name);
+      _dropped := _dropped + 1;
+    END IF;
+  END LOOP;
+
+  EXECUTE format('DELETE FROM hivemind_app.%I WHERE %I <= %s', _table || '_default', _column, _limit_block);
+  RETURN _dropped;
+END
+$function$
+;
@@ -1,5 +1,5 @@
 -- Foreign key constraints for Hivemind tables.
--- All FKs are DEFERRABLE and NOT VALID (skip validation on creation for speed).
+-- All FKs are DEFERRABLE and NOT VALID (skip validation on creation for speed), except those of partitioned tables.
 
 -- hive_posts FKs
 ALTER TABLE hivemind_app.hive_posts ADD CONSTRAINT hive_posts_fk1
@@ -31,8 +31,8 @@ ALTER TABLE hivemind_app.hive_reblogs ADD CONSTRAINT hive_reblogs_fk1
 ALTER TABLE hivemind_app.hive_reblogs ADD CONSTRAINT hive_reblogs_fk2
     FOREIGN KEY (post_id) REFERENCES hivemind_app.hive_posts (id) DEFERRABLE NOT VALID;
 
--- hive_mentions FKs
+-- hive_mentions FKs, validated as NOT VALID ones can't be added to a partitioned table
 ALTER TABLE hivemind_app.hive_mentions ADD CONSTRAINT hive_mentions_fk1
-    FOREIGN KEY (post_id) REFERENCES hivemind_app.hive_posts (id) DEFERRABLE NOT VALID;
+    FOREIGN KEY (post_id) REFERENCES hivemind_app.hive_posts (id) DEFERRABLE;
 ALTER TABLE hivemind_app.hive_mentions ADD CONSTRAINT hive_mentions_fk2
-    FOREIGN KEY (account_id) REFERENCES hivemind_app.hive_accounts (id) DEFERRABLE NOT VALID;
+    FOREIGN KEY (account_id) REFERENCES hivemind_app.hive_accounts (id) DEFERRABLE;
@@ -179,13 +179,33 @@ CREATE TABLE IF NOT EXISTS hivemind_app.hive_state (
     hivemind_git_rev TEXT NOT NULL DEFAULT ''
 );
 
--- hive_mentions
+-- hive_mentions, partitioned by block_num (see delete_hive_posts_mentions.sql)
 CREATE TABLE IF NOT EXISTS hivemind_app.hive_mentions (
-    id SERIAL PRIMARY KEY,
+    id SERIAL,
     post_id INTEGER NOT NULL,
     account_id INTEGER NOT NULL,
     block_num INTEGER NOT NULL,
+    PRIMARY KEY (id, block_num),
     CONSTRAINT hive_mentions_ux1 UNIQUE (post_id, account_id, block_num)
+) PARTITION BY RANGE (block_num);
+CREATE TABLE IF NOT EXISTS hivemind_app.hive_mentions_default PARTITION OF hivemind_app.hive_mentions DEFAULT;
+
+-- hive_payout_stats
+-- Sums of pending payouts of unpaid posts, maintained by triggers of hive_posts (see payout_stats_view.sql).
+CREATE TABLE IF NOT EXISTS hivemind_app.hive_payout_stats (
+    community_id INTEGER NOT NULL,
+    author_id INTEGER NOT NULL,
+    payout NUMERIC NOT NULL,
+    pending NUMERIC NOT NULL,
+    posts INTEGER NOT NULL,
+    PRIMARY KEY (community_id, author_id)
+);
+CREATE TABLE IF NOT EXISTS hivemind_app.hive_payout_stats_community (
+    community_id INTEGER PRIMARY KEY,
+    payout NUMERIC NOT NULL,
+    pending NUMERIC NOT NULL,
+    posts INTEGER NOT NULL,
+    authors INTEGER NOT NULL
 );
 
 -- hive_communities
@@ -237,9 +257,9 @@ CREATE TABLE IF NOT EXISTS hivemind_app.hive_subscriptions (
 CREATE INDEX IF NOT EXISTS hive_subscriptions_community_idx ON hivemind_app.hive_subscriptions (community_id);
 CREATE INDEX IF NOT EXISTS hive_subscriptions_block_num_idx ON hivemind_app.hive_subscriptions (block_num);
 
--- hive_notification_cache
+-- hive_notification_cache, partitioned by block_num (see prune_notification_cache.sql)
 CREATE TABLE IF NOT EXISTS hivemind_app.hive_notification_cache (
-    id BIGINT PRIMARY KEY,
+    id BIGINT NOT NULL,
     block_num INTEGER NOT NULL,
     type_id INTEGER NOT NULL,
     dst INTEGER,
@@ -250,8 +270,10 @@ CREATE TABLE IF NOT EXISTS hivemind_app.hive_notification_cache (
     score INTEGER NOT NULL,
     community_title VARCHAR(32),
     community VARCHAR(16),
-    payload VARCHAR
-);
+    payload VARCHAR,
+    PRIMARY KEY (id, block_num)
+) PARTITION BY RANGE (block_num);
+CREATE TABLE IF NOT EXISTS hivemind_app.hive_notification_cache_default PARTITION OF hivemind_app.hive_notification_cache DEFAULT;
 CREATE INDEX IF NOT EXISTS hive_notification_cache_block_num_idx ON hivemind_app.hive_notification_cache (block_num);
 CREATE UNIQUE INDEX IF NOT EXISTS hive_notification_cache_src_dst_post_id ON hivemind_app.hive_notification_cache (src, dst, type_id, post_id, block_num);
 CREATE INDEX IF NOT EXISTS hive_notification_cache_dst_score_idx ON hivemind_app.hive_notification_cache (dst, score) WHERE dst IS NOT NULL;
@@ -33,3 +33,40 @@ FROM
 WHERE hc.id = cr.id;
 $function$
 language sql;
+
+-- Same as update_communities_posts_data_and_rank, but takes the sums of unpaid posts from hive_payout_stats_community,
+-- which is maintained during live sync (see payout_stats_view.sql), so it only ranks the communities.
+-- Only communities whose data or rank changed are updated.
+DROP FUNCTION IF EXISTS hivemind_app.update_communities_rank;
+CREATE FUNCTION hivemind_app.update_communities_rank()
+RETURNS void
+AS
+$function$
+UPDATE hivemind_app.hive_communities hc SET
+  num_pending = cr.posts,
+  sum_pending = cr.payouts,
+  num_authors = cr.authors,
+  rank = cr.rank
+FROM
+(
+    SELECT
+      c.id as id,
+      ROW_NUMBER() OVER ( ORDER BY COALESCE(p.payouts, 0) DESC, COALESCE(p.authors, 0) DESC, COALESCE(p.posts, 0) DESC, c.subscribers DESC, (CASE WHEN c.title = '' THEN 1 ELSE 0 END), c.id DESC ) as rank,
+      COALESCE(p.posts, 0) as posts,
+      COALESCE(p.payouts, 0) as payouts,
+      COALESCE(p.authors, 0) as authors
+    FROM hivemind_app.hive_communities c
+    LEFT JOIN (
+              SELECT psc.community_id,
+                     psc.posts,
+                     ROUND(psc.pending) payouts,
+                     psc.authors
+                FROM hivemind_app.hive_payout_stats_community psc
+               WHERE psc.community_id != 0
+         ) p
+         ON p.community_id = c.id
+) as cr
+WHERE hc.id = cr.id
+  AND (hc.num_pending, hc.sum_pending, hc.num_authors, hc.rank) IS DISTINCT FROM (cr.posts, cr.payouts, cr.authors, cr.rank);
+$function$
+language sql;
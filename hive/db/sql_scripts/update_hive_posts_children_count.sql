@@ -109,3 +109,72 @@ BEGIN
 
 END
 $BODY$;
+
+DROP FUNCTION IF EXISTS hivemind_app.update_hive_posts_children_count_range;
+CREATE OR REPLACE FUNCTION hivemind_app.update_hive_posts_children_count_range(in _first_root_id INTEGER, in _last_root_id INTEGER)
+  RETURNS void
+  LANGUAGE 'plpgsql'
+  VOLATILE
+AS $BODY$
+declare __depth INT;
+BEGIN
+  -- update_all_hive_posts_children_count limited to discussions started by root posts with ids in
+  -- [_first_root_id, _last_root_id]. All descendants of a post belong to the discussion of its root,
+  -- so counts of separate ranges are complete and ranges can be processed on several connections.
+  -- Root posts still have root_id = 0 before update_hive_posts_root_id, their comments have it set.
+  CREATE TEMPORARY TABLE IF NOT EXISTS __range_posts
+  (
+    id INT NOT NULL,
+    parent_id INT NOT NULL,
+    depth INT NOT NULL
+  ) ON COMMIT DROP;
+
+  CREATE TEMPORARY TABLE IF NOT EXISTS __range_post_children
+  (
+    id INT NOT NULL,
+    child_count INT NOT NULL,
+    CONSTRAINT __range_post_children_pkey PRIMARY KEY (id)
+  ) ON COMMIT DROP;
+
+  TRUNCATE TABLE __range_posts;
+  TRUNCATE TABLE __range_post_children;
+
+  INSERT INTO __range_posts (id, parent_id, depth)
+    SELECT h1.id, h1.parent_id, h1.depth
+    FROM hivemind_app.hive_posts h1
+    WHERE h1.root_id BETWEEN _first_root_id AND _last_root_id
+      AND h1.counter_deleted = 0 AND h1.id != 0 AND h1.parent_id != 0
+  ;
+
+  CREATE INDEX ON __range_posts (depth);
+  ANALYZE __range_posts;
+
+  SELECT MAX(rp.depth) into __depth FROM __range_posts rp;
+
+  WHILE __depth > 0 LOOP
+    INSERT INTO __range_post_children
+    (id, child_count)
+      SELECT
+        rp.parent_id AS queried_parent,
+        SUM(COALESCE(pc.child_count, 0) + 1) AS count
+      FROM __range_posts rp
+      LEFT JOIN __range_post_children pc ON pc.id = rp.id
+      WHERE rp.depth = __depth
+      GROUP BY rp.parent_id
+
+    ON CONFLICT ON CONSTRAINT __range_post_children_pkey DO UPDATE
+      SET child_count = __range_post_children.child_count + excluded.child_count
+    ;
+
+    __depth := __depth -1;
+  END LOOP;
+
+  UPDATE hivemind_app.hive_posts uhp
+  SET children = s.child_count
+  FROM
+  __range_post_children s
+  WHERE s.id = uhp.id and s.child_count != uhp.children
+  ;
+
+END
+$BODY$;
@@ -94,3 +94,50 @@ END;
 
 $BODY$
 ;
+
+DROP FUNCTION IF EXISTS hivemind_app.recalculate_posts_rshares_range;
+CREATE OR REPLACE FUNCTION hivemind_app.recalculate_posts_rshares_range(
+    _first_post_id INTEGER,
+    _last_post_id INTEGER
+)
+RETURNS VOID
+LANGUAGE 'plpgsql'
+VOLATILE
+AS
+$BODY$
+BEGIN
+  -- recalculate_all_posts_rshares limited to posts with ids in [_first_post_id, _last_post_id],
+  -- so the whole table can be processed in chunks on several connections
+
+  UPDATE hivemind_app.hive_posts hp
+  SET
+      abs_rshares = votes_rshares.abs_rshares
+     ,vote_rshares = votes_rshares.rshares
+     ,sc_hot = CASE hp.is_paidout OR hp.parent_id > 0 WHEN True Then 0 ELSE hivemind_app.calculate_hot( votes_rshares.rshares, hp.created_at) END
+     ,sc_trend = CASE hp.is_paidout OR hp.parent_id > 0 WHEN True Then 0 ELSE hivemind_app.calculate_trending( votes_rshares.rshares, hp.created_at) END
+     ,total_votes = votes_rshares.total_votes
+     ,net_votes = votes_rshares.net_votes
+  FROM
+    (
+      SELECT
+          hv.post_id
+        , SUM( hv.rshares ) as rshares
+        , SUM( ABS( hv.rshares ) ) as abs_rshares
+        , SUM( CASE hv.is_effective WHEN True THEN 1 ELSE 0 END ) as total_votes
+        , SUM( CASE
+                WHEN hv.rshares > 0 THEN 1
+                WHEN hv.rshares = 0 THEN 0
+                ELSE -1
+              END ) as net_votes
+      FROM hivemind_app.hive_votes hv
+      WHERE hv.post_id BETWEEN _first_post_id AND _last_post_id
+      GROUP BY hv.post_id
+    ) as votes_rshares
+  WHERE hp.id = votes_rshares.post_id
+  AND hp.id BETWEEN _first_post_id AND _last_post_id
+  AND hp.counter_deleted = 0;
+
+END;
+
+$BODY$
+;
@@ -51,4 +51,90 @@ ALTER TABLE hivemind_app.hive_state ADD COLUMN IF NOT EXISTS hivemind_version TE
 -- Crash recovery: high-water mark for payout idempotency
 ALTER TABLE hivemind_app.hive_posts ADD COLUMN IF NOT EXISTS last_payout_block INTEGER NOT NULL DEFAULT 0;
 
+-- Sums of pending payouts replacing materialized payout_stats_view, maintained by triggers of hive_posts
+CREATE TABLE IF NOT EXISTS hivemind_app.hive_payout_stats (
+    community_id INTEGER NOT NULL,
+    author_id INTEGER NOT NULL,
+    payout NUMERIC NOT NULL,
+    pending NUMERIC NOT NULL,
+    posts INTEGER NOT NULL,
+    PRIMARY KEY (community_id, author_id)
+);
+CREATE TABLE IF NOT EXISTS hivemind_app.hive_payout_stats_community (
+    community_id INTEGER PRIMARY KEY,
+    payout NUMERIC NOT NULL,
+    pending NUMERIC NOT NULL,
+    posts INTEGER NOT NULL,
+    authors INTEGER NOT NULL
+);
+
+-- hive_notification_cache partitioned by block_num, rows of the notification window are moved from the old table
+-- by prune_notification_cache.sql
+DO $$
+BEGIN
+  IF (SELECT relkind FROM pg_class WHERE oid = to_regclass('hivemind_app.hive_notification_cache')) = 'r' THEN
+    ALTER TABLE hivemind_app.hive_notification_cache RENAME TO hive_notification_cache_unpartitioned;
+    ALTER TABLE hivemind_app.hive_notification_cache_unpartitioned DROP CONSTRAINT IF EXISTS hive_notification_cache_pkey;
+    DROP INDEX IF EXISTS hivemind_app.hive_notification_cache_src_dst_post_id;
+    DROP INDEX IF EXISTS hivemind_app.hive_notification_cache_dst_score_idx;
+    ALTER INDEX IF EXISTS hivemind_app.hive_notification_cache_block_num_idx RENAME TO hive_notification_cache_unpartitioned_block_num_idx;
+  END IF;
+END$$;
+
+CREATE TABLE IF NOT EXISTS hivemind_app.hive_notification_cache (
+    id BIGINT NOT NULL,
+    block_num INTEGER NOT NULL,
+    type_id INTEGER NOT NULL,
+    dst INTEGER,
+    src INTEGER,
+    dst_post_id INTEGER,
+    post_id INTEGER,
+    created_at TIMESTAMP NOT NULL,
+    score INTEGER NOT NULL,
+    community_title VARCHAR(32),
+    community VARCHAR(16),
+    payload VARCHAR,
+    PRIMARY KEY (id, block_num)
+) PARTITION BY RANGE (block_num);
+CREATE TABLE IF NOT EXISTS hivemind_app.hive_notification_cache_default PARTITION OF hivemind_app.hive_notification_cache DEFAULT;
+CREATE INDEX IF NOT EXISTS hive_notification_cache_block_num_idx ON hivemind_app.hive_notification_cache (block_num);
+CREATE UNIQUE INDEX IF NOT EXISTS hive_notification_cache_src_dst_post_id ON hivemind_app.hive_notification_cache (src, dst, type_id, post_id, block_num);
+CREATE INDEX IF NOT EXISTS hive_notification_cache_dst_score_idx ON hivemind_app.hive_notification_cache (dst, score) WHERE dst IS NOT NULL;
+
+-- hive_mentions partitioned by block_num, rows of the 90 days window are moved from the old table
+-- by delete_hive_posts_mentions.sql
+DO $$
+DECLARE
+  _had_fks BOOLEAN := FALSE;
+BEGIN
+  IF (SELECT relkind FROM pg_class WHERE oid = to_regclass('hivemind_app.hive_mentions')) = 'r' THEN
+    _had_fks := EXISTS (
+      SELECT 1 FROM pg_constraint WHERE conrelid = 'hivemind_app.hive_mentions'::regclass AND contype = 'f'
+    );
+    ALTER TABLE hivemind_app.hive_mentions RENAME TO hive_mentions_unpartitioned;
+    ALTER TABLE hivemind_app.hive_mentions_unpartitioned DROP CONSTRAINT IF EXISTS hive_mentions_fk1;
+    ALTER TABLE hivemind_app.hive_mentions_unpartitioned DROP CONSTRAINT IF EXISTS hive_mentions_fk2;
+    ALTER TABLE hivemind_app.hive_mentions_unpartitioned DROP CONSTRAINT IF EXISTS hive_mentions_ux1;
+    ALTER TABLE hivemind_app.hive_mentions_unpartitioned DROP CONSTRAINT IF EXISTS hive_mentions_pkey;
+    ALTER SEQUENCE IF EXISTS hivemind_app.hive_mentions_id_seq RENAME TO hive_mentions_unpartitioned_id_seq;
+  END IF;
+
+  CREATE TABLE IF NOT EXISTS hivemind_app.hive_mentions (
+      id SERIAL,
+      post_id INTEGER NOT NULL,
+      account_id INTEGER NOT NULL,
+      block_num INTEGER NOT NULL,
+      PRIMARY KEY (id, block_num),
+      CONSTRAINT hive_mentions_ux1 UNIQUE (post_id, account_id, block_num)
+  ) PARTITION BY RANGE (block_num);
+  CREATE TABLE IF NOT EXISTS hivemind_app.hive_mentions_default PARTITION OF hivemind_app.hive_mentions DEFAULT;
+
+  IF _had_fks THEN
+    ALTER TABLE hivemind_app.hive_mentions ADD CONSTRAINT hive_mentions_fk1
+        FOREIGN KEY (post_id) REFERENCES hivemind_app.hive_posts (id) DEFERRABLE;
+    ALTER TABLE hivemind_app.hive_mentions ADD CONSTRAINT hive_mentions_fk2
+        FOREIGN KEY (account_id) REFERENCES hivemind_app.hive_accounts (id) DEFERRABLE;
+  END IF;
+END$$;
+
 RESET ROLE;
@@ -7,6 +7,7 @@ import logging
 
 from hive.conf import SCHEMA_NAME
 from hive.indexer.db_adapter_holder import DbAdapterHolder
+from hive.utils.account_index import AccountIndex, open_account_index, write_account_index
 
 log = logging.getLogger(__name__)
 
@@ -15,46 +16,100 @@ class Accounts(DbAdapterHolder):
     """Manages account id map and `hive_accounts` table."""
 
     # name->id map
-    _ids = {}
+    _ids = AccountIndex()
+    # name->id map of accounts newer than the ones in persisted `_ids`
+    _recent_ids = {}
+
+    # persisted map is rewritten when that many accounts were created since it was written
+    REWRITE_PERSISTED_IDS_THRESHOLD = 50000
 
     # in-mem id->rank map
     _ranks = {}
 
     @classmethod
-    def load_ids(cls):
-        """Load a full (name: id) dict into memory."""
+    def load_ids(cls, persisted_path=None, last_completed_block=0):
+        """Load a full (name: id) map into memory, streaming accounts in byte order of names.
+
+        With `persisted_path`, the map is memory-mapped from that file and only accounts created after it
+        was written are read from the database (accounts are append-only). A missing, invalid or outdated
+        file is rewritten, keyed by `last_completed_block`.
+        """
         assert not cls._ids, "id map already loaded"
-        cls._ids = dict(
-            DbAdapterHolder.common_block_processing_db().query_all(f"SELECT name, id FROM {SCHEMA_NAME}.hive_accounts")
-        )
+        db = DbAdapterHolder.common_block_processing_db()
+        sql = f'SELECT name, id FROM {SCHEMA_NAME}.hive_accounts ORDER BY name COLLATE "C"'
+
+        if not persisted_path:
+            cls._ids = AccountIndex.from_sorted(db.query_stream(sql))
+            log.info(f"Loaded ids of {len(cls._ids)} accounts")
+            return
+
+        persisted = open_account_index(persisted_path)
+        if persisted is not None and cls._is_persisted_map_valid(db, persisted[1], last_completed_block):
+            ids, info = persisted
+            recent_ids = dict(
+                db.query_stream(
+                    f"SELECT name, id FROM {SCHEMA_NAME}.hive_accounts WHERE id > :max_id", max_id=info.max_id
+                )
+            )
+            if len(recent_ids) < cls.REWRITE_PERSISTED_IDS_THRESHOLD:
+                cls._ids, cls._recent_ids = ids, recent_ids
+                log.info(
+                    f"Mapped ids of {len(ids)} accounts from '{persisted_path}' (block {info.last_completed_block}),"
+                    f" {len(recent_ids)} newer accounts loaded"
+                )
+                return
+
+        write_account_index(persisted_path, db.query_stream(sql), last_completed_block)
+        cls._ids, _ = open_account_index(persisted_path)
+        cls._recent_ids = {}
+        log.info(f"Persisted ids of {len(cls._ids)} accounts to '{persisted_path}' (block {last_completed_block})")
+
+    @staticmethod
+    def _is_persisted_map_valid(db, info, last_completed_block):
+        """Persisted map can't be newer than the database and its newest account must match the database one."""
+        if info.last_completed_block > last_completed_block:
+            return False
+        if info.max_id == 0:
+            return True
+        name = db.query_one(f"SELECT name FROM {SCHEMA_NAME}.hive_accounts WHERE id = :id", id=info.max_id)
+        return name is not None and name.encode()[:64] == info.max_name.encode()
 
     @classmethod
     def clear_ids(cls):
         """Wipe id map. Only used for db migration #5."""
         cls._ids = None
+        cls._recent_ids = {}
+
+    @classmethod
+    def _lookup(cls, name):
+        _id = cls._ids.get(name)
+        if _id is None and cls._recent_ids:
+            _id = cls._recent_ids.get(name)
+        return _id
 
     @classmethod
     def get_id(cls, name):
         """Get account id by name. Throw if not found."""
         assert isinstance(name, str), "account name should be string"
-        assert name in cls._ids, f'Account \'{name}\' does not exist'
-        return cls._ids[name]
+        _id = cls._lookup(name)
+        assert _id is not None, f'Account \'{name}\' does not exist'
+        return _id
 
     @classmethod
     def get_id_noexept(cls, name):
         """Get account id by name. Return None if not found."""
         assert isinstance(name, str), "account name should be string"
-        return cls._ids.get(name, None)
+        return cls._lookup(name)
 
     @classmethod
     def exists(cls, names):
         """Check if an account name exists."""
         if isinstance(names, str):
-            return names in cls._ids
+            return cls._lookup(names) is not None
         return False
 
     @classmethod
     def check_names(cls, names):
         """Check which names from name list does not exists in the database"""
         assert isinstance(names, list), "Expecting list as argument"
-        return [name for name in names if name not in cls._ids]
+        return [name for name in names if cls._lookup(name) is None]
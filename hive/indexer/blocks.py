@@ -1,7 +1,6 @@
 """Blocks processor."""
 
 import logging
-from concurrent.futures import ThreadPoolExecutor
 from time import perf_counter, sleep
 
 import psycopg2.extensions
@@ -13,6 +12,7 @@ from hive.indexer.accounts import Accounts
 from hive.indexer.community import Community
 from hive.indexer.db_adapter_holder import DbAdapterHolder
 from hive.indexer.follow import Follow
+from hive.indexer.hive_db.haf_functions import LIMIT_FOR_PROCESSED_BLOCKS
 from hive.indexer.mentions import Mentions
 from hive.indexer.notification_cache import (
     FollowNotificationCache,
@@ -22,17 +22,21 @@ from hive.indexer.notification_cache import (
     VoteNotificationCache,
 )
 from hive.indexer.notify import Notify
+from hive.indexer.ops_staging import OpsStaging
 from hive.indexer.post_data_cache import PostDataCache
 from hive.indexer.posts import Posts
 from hive.indexer.reblog import Reblog
 from hive.indexer.votes import Votes
-from hive.utils.communities_rank import update_communities_posts_and_rank
-from hive.utils.payout_stats import PayoutStats
+from hive.utils.batch_sizer import AdaptiveBatchSize
+from hive.utils.phase_scheduler import Phase, PhaseScheduler
 from hive.utils.stats import OPStatusManager as OPSM
 from hive.utils.timer import time_it
 
 log = logging.getLogger(__name__)
 
+# upper bound of adapted massive sync batches when --max-batch is not given
+MAX_ADAPTIVE_BATCH = 10000
+
 
 class Blocks:
     """Processes blocks, dispatches work, manages the state of the database (blocks consistency, and numbers)."""
@@ -42,10 +46,28 @@ class Blocks:
     _current_block_date = None
     _last_safe_cashout_block = 0
     _notification_min_block = None  # cached 90-day notification threshold
+    _sql_body_merge = False  # post bodies merged by process_post_data_from_staging instead of PostDataCache
+    _batch_sizer = None  # AdaptiveBatchSize of massive sync batches, when enabled
 
     @classmethod
     def setup(cls, conf: Conf):
         cls._conf = conf
+        PostDataCache.configure(conf.get('post_data_cache_max_mb'), conf.get('post_data_cache_lru_mb'))
+        Posts.configure_merge_pool(conf.get('post_merge_workers'))
+        Votes.configure(conf.get('vote_partitions'))
+        cls._sql_body_merge = conf.get('post_body_merge_engine') == 'sql'
+        if conf.get('massive_batch_target_seconds'):
+            max_batch = conf.get('max_batch') or MAX_ADAPTIVE_BATCH
+            cls._batch_sizer = AdaptiveBatchSize(
+                conf.get('massive_batch_target_seconds'),
+                initial_size=min(LIMIT_FOR_PROCESSED_BLOCKS, max_batch),
+                max_size=max_batch,
+            )
+
+    @classmethod
+    def massive_batch_size(cls):
+        """Number of blocks requested for the next massive sync batch, None when not adapted."""
+        return cls._batch_sizer.size if cls._batch_sizer is not None else None
 
     @classmethod
     def set_head_date(cls):
@@ -75,6 +97,7 @@ class Blocks:
         PostNotificationCache.setup_own_db_access(shared_db_adapter, "PostNotificationCache")
         FollowNotificationCache.setup_own_db_access(shared_db_adapter, "FollowNotificationCache")
         ReblogNotificationCache.setup_own_db_access(shared_db_adapter, "ReblogNotificationCache")
+        OpsStaging.setup_own_db_access(shared_db_adapter, "OpsStaging")
 
     @staticmethod
     def close_own_db_access() -> None:
@@ -93,6 +116,7 @@ class Blocks:
         PostNotificationCache.close_own_db_access()
         FollowNotificationCache.close_own_db_access()
         ReblogNotificationCache.close_own_db_access()
+        OpsStaging.close_own_db_access()
 
     @staticmethod
     def head_num() -> int:
@@ -129,10 +153,13 @@ class Blocks:
         sql = f"SELECT {SCHEMA_NAME}.head_block_time()"
         return str(Db.instance().query_one(sql) or '')
 
+    @staticmethod
+    def irreversible_block(db) -> int:
+        """Get irreversible block of the hivemind context."""
+        return db.query_one(f"SELECT hive.app_get_irreversible_block( '{SCHEMA_NAME}' )")
+
     @classmethod
-    def set_end_of_sync_lib(cls) -> None:
-        sql = f"SELECT hive.app_get_irreversible_block( '{SCHEMA_NAME}' )"
-        lib = Db.instance().query_one(sql)
+    def set_end_of_sync_lib(cls, lib: int) -> None:
         """Set last block that guarantees cashout before end of sync based on LIB"""
         if lib < 10629455:
             # posts created before HF17 could stay unpaid forever
@@ -147,205 +174,298 @@ class Blocks:
         """Process a batch of blocks using pure SQL functions.
 
         Replaces the Python dispatch loop with SQL functions that read from
-        a staging table. Only PostDataCache body merging remains in Python.
-
-        Phases:
-          1.    Load staging table (single scan of operations_view)
-          2.    Account registration + community state changes (single transaction)
-          3.    Post/comment processing (must commit before votes/reblogs)
-          3a.   Community post-targeting ops + mute propagation (skipped before community start)
-          3.5.  Votes (rshares deferred to finalization)
-          4+3b. Parallel: SQL entity processing + Python body merging (overlapped)
-          5.    PostDataCache flush
-          6.    Parallel notification flush (skipped for blocks before 90-day window)
+        a staging table. Only PostDataCache body merging remains in Python,
+        unless the sql body merge engine is configured.
+
+        Phases are declared with their dependencies and the tables they update
+        (see `_massive_phases`); PhaseScheduler runs every phase as soon as its
+        dependencies are committed and no conflicting phase is running, each one
+        in its own transaction on its own connection.
         """
         time_start = OPSM.start()
-        phase_times = {}
         db = DbAdapterHolder.common_block_processing_db()
 
-        # Phase 1: Load staging table (single scan of operations_view)
-        t0 = perf_counter()
-        db.query_no_return("START TRANSACTION")
-        db.query_no_return(f"SELECT {SCHEMA_NAME}.load_ops_staging({first_block}, {last_block})")
-        db.query_no_return("COMMIT")
-        phase_times['load'] = perf_counter() - t0
-
-        # Phase 2: Account registration + community state changes (single transaction)
-        t0 = perf_counter()
-        db.query_no_return("START TRANSACTION")
-        db.query_no_return(f"SELECT {SCHEMA_NAME}.process_accounts_from_staging({Community.start_block})")
-        db.query_no_return(f"SELECT {SCHEMA_NAME}.process_community_from_staging({Community.start_block}, 1)")
-        db.query_no_return("COMMIT")
-        phase_times['accounts_community'] = perf_counter() - t0
-
-        # Phase 3: Post/comment processing (must commit before votes/reblogs)
-        t0 = perf_counter()
-        db.query_no_return("START TRANSACTION")
-        post_results = db.query_all(f"SELECT * FROM {SCHEMA_NAME}.process_posts_from_staging({Community.start_block})")
-        db.query_no_return("COMMIT")
-        phase_times['posts'] = perf_counter() - t0
-
-        # Phase 3a: Community post-targeting ops (mutePost, unmutePost, pinPost, etc.)
-        # Skip entirely when batch is before community support start block — no community
-        # ops or muted parents to propagate.
-        # NOTE: propagate_muted_parent_for_batch is DEFERRED to finalization. During
-        # MASSIVE_WITHOUT_INDEXES the parent_id index is dropped, making the recursive
-        # CTE do a full sequential scan (~15s per call at 40M+ rows). A single pass at
-        # finalization (with indexes) handles all accumulated mutes instantly.
-        t0 = perf_counter()
-        if last_block >= Community.start_block:
-            db.query_no_return("START TRANSACTION")
-            db.query_no_return(f"SELECT {SCHEMA_NAME}.process_community_from_staging({Community.start_block}, 2)")
-            db.query_no_return("COMMIT")
-        phase_times['community_post'] = perf_counter() - t0
-
-        # Phase 3.5: Votes (rshares deferred to finalization during initial massive sync;
-        # must run BEFORE payouts).
-        t0 = perf_counter()
-        Votes.db.query_no_return("START TRANSACTION")
-        Votes.db.query_no_return(f"SELECT {SCHEMA_NAME}.process_votes_from_staging({cls._last_safe_cashout_block})")
-        Votes.db.query_no_return("COMMIT")
-        phase_times['votes'] = perf_counter() - t0
-
-        # Phase 3.6: Incremental rshares update for MASSIVE_WITH_INDEXES mode.
-        # When indexes are enabled, we must update rshares incrementally for votes
-        # processed in this batch. During MASSIVE_WITHOUT_INDEXES (initial sync),
-        # indexes don't exist so this is skipped — the full recalculate_all_posts_rshares
-        # runs at finalization. During MASSIVE_WITH_INDEXES (catch-up after restart
-        # or post-finalization gap), indexes exist and the full recalculation won't
-        # re-run, so incremental updates are essential.
-        if DbState.are_indexes_enabled():
-            t0 = perf_counter()
-            affected_posts = db.query_col(
-                f"SELECT DISTINCT post_id FROM {SCHEMA_NAME}.hive_votes "
-                f"WHERE block_num BETWEEN {first_block} AND {last_block}"
+        if cls._notification_min_block is None:
+            cls._notification_min_block = db.query_one(f"SELECT {SCHEMA_NAME}.block_before_irreversible('90 days')")
+        if last_block > cls._notification_min_block:
+            # outside of the phases' transactions, as creating a partition locks the whole table
+            db.query_no_return(
+                f"SELECT {SCHEMA_NAME}.ensure_notification_cache_partitions({first_block}, {last_block})"
             )
-            if affected_posts:
-                db.query_no_return(
-                    f"SELECT * FROM {SCHEMA_NAME}.update_posts_rshares(:post_ids)",
-                    post_ids=affected_posts,
-                )
-            phase_times['rshares_incr'] = perf_counter() - t0
-
-        # Phase 4+3b: Overlap Python body merging with parallel SQL entity processing.
-        # PostDataCache._data is only accessed by the main thread; Phase 4 tasks use
-        # separate DB connections and don't touch hive_post_data, so no conflict.
-        #
-        # IMPORTANT: process_follows_for_blocks, process_account_updates_from_staging,
-        # and process_lastread_from_staging all UPDATE hive_accounts. Running them on
-        # separate connections causes deadlocks when two transactions lock overlapping
-        # account rows in different orders. We run account_updates and lastread on the
-        # main thread (after parallel completes) to serialize hive_accounts access.
-        # Both are trivially fast (<1ms).
-        t0 = perf_counter()
-        phase4_tasks = [
-            (Reblog.db, f"SELECT {SCHEMA_NAME}.process_reblogs_from_staging()"),
-            (Follow.db, f"SELECT * FROM {SCHEMA_NAME}.process_follows_for_blocks({first_block}, {last_block})"),
-            (Posts.db, f"SELECT {SCHEMA_NAME}.process_payouts_from_staging({cls._last_safe_cashout_block})"),
-        ]
+            db.query_no_return(f"SELECT {SCHEMA_NAME}.ensure_mentions_partitions({first_block}, {last_block})")
 
-        # Launch Phase 4 SQL tasks in background threads with deadlock retry.
-        # PostgreSQL detects deadlocks and aborts one transaction with error 40P01
-        # (psycopg2.extensions.TransactionRollbackError). We retry the entire
-        # parallel set because the rolled-back transaction's temp tables / state
-        # are gone and other transactions may have committed partial results that
-        # the retried batch will skip via idempotency guards.
-        MAX_DEADLOCK_RETRIES = 3
+        scheduler = PhaseScheduler(cls._massive_phases(db, first_block, last_block))
+        scheduler.run()
 
-        # Phase 3b: Process post results on main thread (overlapped with first attempt)
-        cache_merged = False
-
-        for attempt in range(1, MAX_DEADLOCK_RETRIES + 1):
-            pool = ThreadPoolExecutor(max_workers=len(phase4_tasks))
-            futures = []
+        phase_times = scheduler.phase_times()
+        total = scheduler.elapsed
+        batch_decision = ''
+        if cls._batch_sizer is not None:
+            next_batch, reason = cls._batch_sizer.update(last_block - first_block + 1, phase_times, total)
+            batch_decision = f' next_batch={next_batch} ({reason})'
+        log.info(
+            "[PHASE-SUMMARY] blocks=%d-%d total=%.3fs %s%s",
+            first_block,
+            last_block,
+            total,
+            ' '.join(f'{k}={v:.3f}' for k, v in phase_times.items()),
+            batch_decision,
+        )
+        log.info(
+            "[PHASE-CRITICAL-PATH] blocks=%d-%d %s",
+            first_block,
+            last_block,
+            ' > '.join(f'{phase.name}({phase.duration:.3f})' for phase in scheduler.critical_path()),
+        )
 
-            def run_one_task(db_conn, sql):
-                db_conn.query_no_return("START TRANSACTION")
-                try:
-                    db_conn.query_all_raw(sql)
-                    db_conn.query_no_return("COMMIT")
-                except Exception:
-                    try:
-                        db_conn.query_no_return("ROLLBACK")
-                    except Exception:
-                        pass
-                    raise
+        OPSM.stop(time_start)
 
-            for db_conn, sql in phase4_tasks:
-                futures.append(pool.submit(run_one_task, db_conn, sql))
+    @classmethod
+    def _massive_phases(cls, db, first_block: int, last_block: int):
+        """Phases of a massive sync batch.
+
+          load                Staging table (single scan of operations_view, or the batch's
+                              prefetched slot when pipelined staging loaded it in the background)
+          accounts_community  Account registration + community state changes
+          posts               Post/comment processing (must commit before votes/reblogs)
+          community_post      Community post-targeting ops (skipped before community start)
+          votes               Votes (must run BEFORE payouts), split by post_id into
+                              --vote-partitions concurrent phases; rshares of voted posts
+                              are updated by the same call only with indexes
+          payouts, reblogs, follows, account_updates
+                              SQL entity processing
+          cache_merge         Python body merging, overlapped with the SQL entity processing
+          flush               PostDataCache flush (or process_post_data_from_staging with sql body merging)
+          notify_*            Notifications (skipped for blocks before 90-day window)
+
+        process_follows_for_blocks, process_account_updates_from_staging and
+        process_lastread_from_staging all UPDATE hive_accounts, and posts, community_post,
+        votes (with indexes) and payouts all UPDATE hive_posts. Declaring those writes serializes
+        each group, since transactions locking overlapping rows in different orders deadlock.
+        """
+        post_results = []
 
-            if not cache_merged:
-                t0_cache = perf_counter()
-                cls._process_post_results_for_cache(post_results)
-                phase_times['cache_merge'] = perf_counter() - t0_cache
-                cache_merged = True
+        def process_posts():
+            post_results[:] = cls._process_posts_from_staging(db)
 
-            try:
-                for f in futures:
-                    f.result()
-                pool.shutdown(wait=False)
-                break
-            except psycopg2.extensions.TransactionRollbackError:
-                pool.shutdown(wait=False)
-                if attempt == MAX_DEADLOCK_RETRIES:
-                    log.error("Phase 4 deadlock persisted after %d attempts", MAX_DEADLOCK_RETRIES)
-                    raise
-                log.warning(
-                    "Phase 4 deadlock detected (attempt %d/%d), retrying after brief pause",
-                    attempt,
-                    MAX_DEADLOCK_RETRIES,
-                )
-                sleep(0.1 * attempt)
+        def sql_phase(name, db_conn, *sqls):
+            def run():
+                for sql in sqls:
+                    db_conn.query_all_raw(sql)  # Consume any results
 
-        # Phase 4b: Account metadata + lastread (must run AFTER follows to avoid
-        # deadlocks on hive_accounts — all three UPDATE the same table).
-        db.query_no_return("START TRANSACTION")
-        db.query_no_return(f"SELECT {SCHEMA_NAME}.process_account_updates_from_staging()")
-        db.query_no_return(f"SELECT {SCHEMA_NAME}.process_lastread_from_staging()")
-        db.query_no_return("COMMIT")
-        phase_times['parallel'] = perf_counter() - t0
+            return lambda: cls._run_sql_phase(name, db_conn, run)
 
-        # Phase 5: PostDataCache flush (on its own connection; flush() manages its own tx)
-        t0 = perf_counter()
-        PostDataCache.flush()
-        phase_times['flush'] = perf_counter() - t0
+        if cls._sql_body_merge:
+            flush_post_data = sql_phase(
+                'flush', PostDataCache.db, f"SELECT {SCHEMA_NAME}.process_post_data_from_staging()"
+            )
+        else:
+            flush_post_data = PostDataCache.flush  # manages its own transaction
 
-        # Phase 6: Parallel notification flush
         # Vote notifications are deferred to finalization (_finish_vote_notifications)
         # because scoring uses payout data that isn't available during massive sync.
-        # Post/follow/reblog notifications are skipped for blocks older than the 90-day
-        # notification window (they would never appear in user notification feeds).
-        t0 = perf_counter()
-        if cls._notification_min_block is None:
-            cls._notification_min_block = db.query_one(f"SELECT {SCHEMA_NAME}.block_before_irreversible('90 days')")
-        if last_block > cls._notification_min_block:
-            phase6_tasks = [
-                (
+        notify = last_block > cls._notification_min_block
+        blocks = f'{first_block}, {last_block}'
+        safe_cashout_block = cls._last_safe_cashout_block
+
+        vote_phases = cls._vote_phases(sql_phase, after=['posts', 'community_post'])
+        vote_names = [phase.name for phase in vote_phases]
+
+        return [
+            Phase(
+                'load',
+                sql_phase('load', db, f"SELECT {SCHEMA_NAME}.load_ops_staging({blocks})"),
+                db=db,
+            ),
+            Phase(
+                'accounts_community',
+                sql_phase(
+                    'accounts_community',
+                    db,
+                    f"SELECT {SCHEMA_NAME}.process_accounts_from_staging({Community.start_block})",
+                    f"SELECT {SCHEMA_NAME}.process_community_from_staging({Community.start_block}, 1)",
+                ),
+                after=['load'],
+                writes=['hive_accounts', 'hive_communities'],
+                db=db,
+            ),
+            Phase(
+                'posts',
+                lambda: cls._run_sql_phase('posts', db, process_posts),
+                after=['accounts_community'],
+                writes=['hive_posts', 'hive_feed_cache', 'hive_reblogs'],
+                db=db,
+            ),
+            # NOTE: propagate_muted_parent_for_batch is DEFERRED to finalization. During
+            # MASSIVE_WITHOUT_INDEXES the parent_id index is dropped, making the recursive
+            # CTE do a full sequential scan (~15s per call at 40M+ rows). A single pass at
+            # finalization (with indexes) handles all accumulated mutes instantly.
+            Phase(
+                'community_post',
+                sql_phase(
+                    'community_post',
+                    db,
+                    f"SELECT {SCHEMA_NAME}.process_community_from_staging({Community.start_block}, 2)",
+                ),
+                after=['posts'],
+                writes=['hive_posts', 'hive_communities'],
+                db=db,
+                enabled=last_block >= Community.start_block,
+            ),
+            *vote_phases,
+            Phase(
+                'payouts',
+                sql_phase(
+                    'payouts', Posts.db, f"SELECT {SCHEMA_NAME}.process_payouts_from_staging({safe_cashout_block})"
+                ),
+                after=vote_names,
+                writes=['hive_posts'],
+                db=Posts.db,
+            ),
+            Phase(
+                'reblogs',
+                sql_phase('reblogs', Reblog.db, f"SELECT {SCHEMA_NAME}.process_reblogs_from_staging()"),
+                after=['posts'],
+                writes=['hive_reblogs', 'hive_feed_cache'],
+                db=Reblog.db,
+            ),
+            Phase(
+                'follows',
+                sql_phase('follows', Follow.db, f"SELECT * FROM {SCHEMA_NAME}.process_follows_for_blocks({blocks})"),
+                after=['accounts_community'],
+                writes=['hive_accounts', 'hive_follows'],
+                db=Follow.db,
+            ),
+            Phase(
+                'account_updates',
+                sql_phase(
+                    'account_updates',
+                    Accounts.db,
+                    f"SELECT {SCHEMA_NAME}.process_account_updates_from_staging()",
+                    f"SELECT {SCHEMA_NAME}.process_lastread_from_staging()",
+                ),
+                after=['accounts_community'],
+                writes=['hive_accounts'],
+                db=Accounts.db,
+            ),
+            # PostDataCache._data is only accessed by cache_merge and flush, which never overlap
+            Phase(
+                'cache_merge',
+                lambda: cls._process_post_results_for_cache(post_results),
+                after=['posts'],
+                db=PostDataCache.db,
+                enabled=not cls._sql_body_merge,
+            ),
+            Phase(
+                'flush',
+                flush_post_data,
+                after=['posts', 'cache_merge'],
+                writes=['hive_post_data', 'hive_mentions'],
+                db=PostDataCache.db,
+            ),
+            Phase(
+                'notify_posts',
+                sql_phase(
+                    'notify_posts',
                     PostNotificationCache.db,
-                    f"SELECT {SCHEMA_NAME}.flush_post_notifications_for_blocks({first_block}, {last_block})",
+                    f"SELECT {SCHEMA_NAME}.flush_post_notifications_for_blocks({blocks})",
                 ),
-                (
+                after=['posts', 'community_post', 'flush'],
+                db=PostNotificationCache.db,
+                enabled=notify,
+            ),
+            Phase(
+                'notify_follows',
+                sql_phase(
+                    'notify_follows',
                     FollowNotificationCache.db,
-                    f"SELECT {SCHEMA_NAME}.flush_follow_notifications_for_blocks({first_block}, {last_block})",
+                    f"SELECT {SCHEMA_NAME}.flush_follow_notifications_for_blocks({blocks})",
                 ),
-                (
+                after=['follows'],
+                db=FollowNotificationCache.db,
+                enabled=notify,
+            ),
+            Phase(
+                'notify_reblogs',
+                sql_phase(
+                    'notify_reblogs',
                     ReblogNotificationCache.db,
-                    f"SELECT {SCHEMA_NAME}.flush_reblog_notifications_for_blocks({first_block}, {last_block})",
+                    f"SELECT {SCHEMA_NAME}.flush_reblog_notifications_for_blocks({blocks})",
                 ),
+                after=['reblogs'],
+                db=ReblogNotificationCache.db,
+                enabled=notify,
+            ),
+        ]
+
+    @classmethod
+    def _vote_phases(cls, sql_phase, after):
+        """Vote processing, split by post_id into Votes.partitions phases applied concurrently.
+
+        When indexes are enabled, rshares of the voted posts are updated incrementally by the vote
+        processing call itself. During MASSIVE_WITHOUT_INDEXES (initial sync) this is skipped — the
+        full recalculate_all_posts_rshares runs at finalization. During MASSIVE_WITH_INDEXES (catch-up
+        after restart or post-finalization gap), the full recalculation won't re-run, so incremental
+        updates are essential.
+
+        Partitions upsert disjoint hive_votes rows and update disjoint hive_posts rows, so they don't
+        declare those tables as conflicting writes; other writers of hive_posts are ordered by dependencies.
+        """
+        update_rshares = 'TRUE' if DbState.are_indexes_enabled() else 'FALSE'
+        if Votes.partitions == 1:
+            sql = f"SELECT {SCHEMA_NAME}.process_votes_from_staging({cls._last_safe_cashout_block}, {update_rshares})"
+            return [
+                Phase(
+                    'votes',
+                    sql_phase('votes', Votes.db, sql),
+                    after=after,
+                    writes=['hive_votes', 'hive_posts'],
+                    db=Votes.db,
+                )
             ]
-            cls._run_parallel_sql(phase6_tasks)
-        phase_times['notify'] = perf_counter() - t0
 
-        total = sum(phase_times.values())
-        log.info(
-            "[PHASE-SUMMARY] blocks=%d-%d total=%.3fs %s",
-            first_block,
-            last_block,
-            total,
-            ' '.join(f'{k}={v:.3f}' for k, v in phase_times.items()),
-        )
+        phases = [
+            Phase(
+                'vote_batch',
+                sql_phase('vote_batch', Votes.db, f"SELECT {SCHEMA_NAME}.prepare_vote_batch_from_staging()"),
+                after=after,
+                db=Votes.db,
+            )
+        ]
+        for partition in range(Votes.partitions):
+            name = 'votes' if partition == 0 else f'votes_{partition}'
+            db_conn = Votes.partition_db(partition)
+            sql = f"SELECT {SCHEMA_NAME}.apply_vote_batch({partition}, {Votes.partitions}, {update_rshares})"
+            phases.append(Phase(name, sql_phase(name, db_conn, sql), after=['vote_batch'], db=db_conn))
+        return phases
 
-        OPSM.stop(time_start)
+    @staticmethod
+    def _run_sql_phase(name, db_conn, run, max_retries=3):
+        """Call `run` in a transaction on `db_conn`, retrying it on deadlock (PostgreSQL error 40P01).
+
+        PostgreSQL detects deadlocks and aborts one transaction with
+        psycopg2.extensions.TransactionRollbackError; the phase is rolled back
+        as a whole and its SQL functions skip already committed work of other
+        phases via idempotency guards.
+        """
+        for attempt in range(1, max_retries + 1):
+            db_conn.query_no_return("START TRANSACTION")
+            try:
+                run()
+                db_conn.query_no_return("COMMIT")
+                return
+            except Exception as ex:
+                try:
+                    db_conn.query_no_return("ROLLBACK")
+                except Exception:
+                    pass
+                if not isinstance(ex, psycopg2.extensions.TransactionRollbackError):
+                    raise
+                if attempt == max_retries:
+                    log.error("Phase %s deadlock persisted after %d attempts", name, max_retries)
+                    raise
+                log.warning("Phase %s deadlock detected (attempt %d/%d), retrying", name, attempt, max_retries)
+                sleep(0.1 * attempt)
 
     @classmethod
     def process_live_block_sql(cls, first_block: int, last_block: int) -> None:
@@ -357,8 +477,9 @@ class Blocks:
         returns the same range on restart.
 
         After SQL processing, live-sync-specific post-processing is performed
-        (children count, root_id, feed cache, periodic actions) — all within the
-        same transaction boundary.
+        (children count, root_id, feed cache) — all within the
+        same transaction boundary. Periodic maintenance runs outside of it,
+        in MaintenanceWorker.
         """
         time_start = OPSM.start()
         db = DbAdapterHolder.common_block_processing_db()
@@ -374,24 +495,14 @@ class Blocks:
         db.query_no_return(f"SELECT {SCHEMA_NAME}.process_community_from_staging({Community.start_block}, 1)")
 
         # Phase 3: Post/comment processing
-        post_results = db.query_all(f"SELECT * FROM {SCHEMA_NAME}.process_posts_from_staging({Community.start_block})")
+        post_results = cls._process_posts_from_staging(db)
 
         # Phase 3b: PostDataCache body merging (Python)
         cls._process_post_results_for_cache(post_results)
 
         # Phase 4: Entity processing (sequential on shared connection)
-        db.query_no_return(f"SELECT {SCHEMA_NAME}.process_votes_from_staging({cls._last_safe_cashout_block})")
-
         # Live sync: update post rshares immediately (API needs current values)
-        affected_posts = db.query_col(
-            f"SELECT DISTINCT post_id FROM {SCHEMA_NAME}.hive_votes "
-            f"WHERE block_num BETWEEN {first_block} AND {last_block}"
-        )
-        if affected_posts:
-            db.query_no_return(
-                f"SELECT * FROM {SCHEMA_NAME}.update_posts_rshares(:post_ids)",
-                post_ids=affected_posts,
-            )
+        db.query_no_return(f"SELECT {SCHEMA_NAME}.process_votes_from_staging({cls._last_safe_cashout_block}, TRUE)")
 
         db.query_no_return(f"SELECT {SCHEMA_NAME}.process_reblogs_from_staging()")
         db.query_no_return(f"SELECT * FROM {SCHEMA_NAME}.process_follows_for_blocks({first_block}, {last_block})")
@@ -402,7 +513,10 @@ class Blocks:
 
         # Phase 5: PostDataCache flush (uses beginTx/commitTx which are no-ops in live mode,
         # so it executes within this wrapping transaction)
-        PostDataCache.flush()
+        if cls._sql_body_merge:
+            db.query_no_return(f"SELECT {SCHEMA_NAME}.process_post_data_from_staging()")
+        else:
+            PostDataCache.flush()
 
         # Phase 6: Notifications (sequential)
         db.query_no_return(f"SELECT {SCHEMA_NAME}.flush_vote_notifications_for_blocks({first_block}, {last_block})")
@@ -413,8 +527,6 @@ class Blocks:
         # Live sync post-processing (within transaction boundary)
         log.info("[PROCESS LIVE SQL] Tables updating in live synchronization")
         cls.on_live_blocks_processed(first_block, last_block)
-        cls._periodic_actions_by_num(last_block)
-
         # Commit the entire block atomically
         db.query_no_return("COMMIT")
 
@@ -425,6 +537,16 @@ class Blocks:
             OPSM.stop(time_start),
         )
 
+    @classmethod
+    def _process_posts_from_staging(cls, db):
+        """Run process_posts_from_staging(), returning its results only when they are merged in Python."""
+        sql = f"SELECT * FROM {SCHEMA_NAME}.process_posts_from_staging({Community.start_block})"
+        if cls._sql_body_merge:
+            # results stay in _post_results for process_post_data_from_staging()
+            db.query_no_return(f"SELECT count(*) FROM ({sql}) AS posts")
+            return []
+        return db.query_all(sql)
+
     @classmethod
     def _process_post_results_for_cache(cls, post_results):
         """Process SQL post results for PostDataCache body merging.
@@ -433,12 +555,41 @@ class Blocks:
         is_new_post flag, and the original op body (JSONB). For new posts, the
         full title/body/json is stored. For edits, diff patches are applied to
         the existing body.
+
+        Runs in two passes: the first one parses the patches of all edits and
+        fetches missing original bodies with a single query, the second one
+        applies them in operation order. With a merge pool configured, patches
+        of the whole batch are applied in worker processes between the passes.
         """
-        for row in post_results:
-            r = row._mapping
-            post_id = r['post_id']
-            is_new = r['is_new_post']
-            op_body = r['op_body']
+        patches = [None] * len(post_results)
+        patched_post_ids = set()
+        created_post_ids = set()
+        for i, row in enumerate(post_results):
+            op_body = row['op_body']
+            if op_body is None:
+                continue
+
+            if row['is_new_post']:
+                created_post_ids.add(row['post_id'])
+                continue
+
+            body = op_body.get('body')
+            if body:
+                patches[i] = Posts.parse_body_patch(body)
+                if patches[i]:
+                    patched_post_ids.add(row['post_id'])
+
+        # bodies of posts created in this batch come from the cache
+        PostDataCache.prefetch_post_bodies(patched_post_ids - created_post_ids)
+
+        merged_bodies = {}
+        if patched_post_ids and Posts.merge_pool_enabled():
+            merged_bodies = cls._merge_patched_bodies(post_results, patches, patched_post_ids)
+
+        for i, row in enumerate(post_results):
+            post_id = row['post_id']
+            is_new = row['is_new_post']
+            op_body = row['op_body']
 
             if op_body is None:
                 continue
@@ -454,70 +605,51 @@ class Blocks:
                 )
             else:
                 body = op_body.get('body')
-                new_body = Posts._merge_post_body(id=post_id, new_body_def=body) if body else None
+                if i in merged_bodies:
+                    new_body = merged_bodies[i]
+                else:
+                    new_body = Posts._merge_post_body(id=post_id, new_body_def=body, patch=patches[i]) if body else None
                 new_title = op_body.get('title') if op_body.get('title') else None
                 new_json = op_body.get('json_metadata') if op_body.get('json_metadata') else None
                 post_data = dict(title=new_title, body=new_body, json=new_json, is_root='false')
 
             PostDataCache.add_data(post_id, post_data, is_new)
 
-    @staticmethod
-    def _run_parallel_sql(tasks, max_retries=3):
-        """Run multiple SQL functions in parallel on separate DB connections.
+    @classmethod
+    def _merge_patched_bodies(cls, post_results, patches, patched_post_ids):
+        """Apply body definitions of patched posts in the merge pool, returning new body per result row index.
 
-        Each task is a (db_connection, sql_string) tuple. Each function runs
-        in its own transaction on its own connection. Retries the whole set on
-        deadlock (PostgreSQL error 40P01).
+        Definitions of the same post are chained in operation order, starting from the body of a post created
+        in this batch or from its stored body.
         """
+        chains = {}  # post_id -> (base body or None, [body definitions], [row indexes])
+        for i, row in enumerate(post_results):
+            post_id = row['post_id']
+            op_body = row['op_body']
+            if op_body is None or post_id not in patched_post_ids:
+                continue
 
-        def run_one(db_conn, sql):
-            db_conn.query_no_return("START TRANSACTION")
-            try:
-                db_conn.query_all_raw(sql)  # Consume any results
-                db_conn.query_no_return("COMMIT")
-            except Exception:
-                try:
-                    db_conn.query_no_return("ROLLBACK")
-                except Exception:
-                    pass
-                raise
+            if row['is_new_post']:
+                chains[post_id] = (op_body.get('body', '') or '', [], [])
+                continue
 
-        if len(tasks) <= 1:
-            for db_conn, sql in tasks:
-                run_one(db_conn, sql)
-            return
+            body = op_body.get('body')
+            if not body:
+                continue
 
-        for attempt in range(1, max_retries + 1):
-            try:
-                with ThreadPoolExecutor(max_workers=len(tasks)) as pool:
-                    futures = [pool.submit(run_one, db_conn, sql) for db_conn, sql in tasks]
-                    for f in futures:
-                        f.result()
-                return
-            except psycopg2.extensions.TransactionRollbackError:
-                if attempt == max_retries:
-                    log.error("Parallel SQL deadlock persisted after %d attempts", max_retries)
-                    raise
-                log.warning(
-                    "Parallel SQL deadlock detected (attempt %d/%d), retrying",
-                    attempt,
-                    max_retries,
-                )
-                sleep(0.1 * attempt)
+            if post_id not in chains:
+                base = PostDataCache.get_post_body(post_id) if patches[i] else None
+                chains[post_id] = (base, [], [])
+            chains[post_id][1].append(body)
+            chains[post_id][2].append(i)
 
-    @classmethod
-    def _periodic_actions_by_num(cls, block_num: int) -> None:
-        """Periodic actions for live sync (hourly stats, community rank updates)."""
-        if block_num % 1200 == 0:  # 1hour
-            log.info(f"head block {block_num}")
-            log.info("[SINGLE] hourly stats")
-            log.info("[SINGLE] filling payout_stats_view executed")
-            PayoutStats.generate(db=DbAdapterHolder.common_block_processing_db())
-            Mentions.refresh()
-        elif block_num % 200 == 0:  # 10min
-            log.info("[SINGLE] 10min")
-            log.info("[SINGLE] updating communities posts and rank")
-            update_communities_posts_and_rank(db=DbAdapterHolder.common_block_processing_db())
+        chains = [chain for chain in chains.values() if chain[1]]
+        results = Posts.merge_post_bodies([(base, body_defs) for base, body_defs, _ in chains])
+
+        merged_bodies = {}
+        for (_, _, indexes), bodies in zip(chains, results):
+            merged_bodies.update(zip(indexes, bodies))
+        return merged_bodies
 
     @staticmethod
     @time_it
@@ -532,7 +664,6 @@ class Blocks:
             f"SELECT {SCHEMA_NAME}.update_hive_posts_root_id({first_block},{last_block})",
             f"SELECT {SCHEMA_NAME}.update_feed_cache({first_block}, {last_block})",
             f"SELECT {SCHEMA_NAME}.update_last_completed_block({last_block})",
-            f"SELECT {SCHEMA_NAME}.prune_notification_cache({last_block})",
         ]
 
         for query in queries:
@@ -8,15 +8,23 @@ log = logging.getLogger(__name__)
 # Custom JSON types that Hivemind processes
 HIVEMIND_CUSTOM_JSON_TYPES = ['follow', 'reblog', 'community', 'notify']
 
+# Default number of blocks of a massive sync batch
+LIMIT_FOR_PROCESSED_BLOCKS = 1000
+
+# Massive sync stages by the number of blocks to the irreversible block above which HAF selects them
+MASSIVE_STAGES_MIN_DISTANCE = {
+    'MASSIVE_WITHOUT_INDEXES': ONE_WEEK_IN_BLOCKS,
+    'MASSIVE_WITH_INDEXES': 101,
+}
+
 
 def prepare_app_context(db: Db) -> None:
     log.info(f"Looking for '{SCHEMA_NAME}' and '{REPTRACKER_SCHEMA_NAME}' contexts.")
     ctx_present = db.query_one(f"SELECT hive.app_context_exists('{SCHEMA_NAME}') as ctx_present;")
     if not ctx_present:
-        LIMIT_FOR_PROCESSED_BLOCKS = 1000
         synchronization_stages = f"""ARRAY[
-              hive.stage( 'MASSIVE_WITHOUT_INDEXES', {ONE_WEEK_IN_BLOCKS}, {LIMIT_FOR_PROCESSED_BLOCKS}, '20 seconds' )
-            , hive.stage( 'MASSIVE_WITH_INDEXES', 101, {LIMIT_FOR_PROCESSED_BLOCKS}, '20 seconds' )
+              hive.stage( 'MASSIVE_WITHOUT_INDEXES', {MASSIVE_STAGES_MIN_DISTANCE['MASSIVE_WITHOUT_INDEXES']}, {LIMIT_FOR_PROCESSED_BLOCKS}, '20 seconds' )
+            , hive.stage( 'MASSIVE_WITH_INDEXES', {MASSIVE_STAGES_MIN_DISTANCE['MASSIVE_WITH_INDEXES']}, {LIMIT_FOR_PROCESSED_BLOCKS}, '20 seconds' )
             , hive.live_stage()
         ]::hive.application_stages"""
         log.info(f"No application context present. Attempting to create a '{SCHEMA_NAME}' context...")
@@ -0,0 +1,130 @@
+"""Periodic maintenance of live sync, executed in background outside of block processing."""
+
+import logging
+import threading
+from time import perf_counter
+
+import psycopg2.errors
+import psycopg2.extensions
+
+from hive.indexer.mentions import Mentions
+from hive.indexer.notification_cache import NotificationCache
+from hive.utils.communities_rank import update_communities_rank
+
+log = logging.getLogger(__name__)
+
+
+class MaintenanceJob:
+    """Work due every `interval` blocks, `run(db)` is executed in its own transaction."""
+
+    __slots__ = ('name', 'interval', 'run')
+
+    def __init__(self, name, interval, run):
+        assert interval > 0
+        self.name = name
+        self.interval = interval
+        self.run = run
+
+    def is_due(self, first_block, last_block):
+        """Whether a multiple of the interval is among blocks [first_block, last_block]."""
+        return last_block // self.interval > (first_block - 1) // self.interval
+
+    def __repr__(self):
+        return f'MaintenanceJob({self.name})'
+
+
+LIVE_JOBS = (
+    MaintenanceJob('mentions', 1200, Mentions.refresh),  # 1 hour
+    MaintenanceJob('notification_cache', 1200, NotificationCache.maintain_partitions),  # 1 hour
+    MaintenanceJob('communities_rank', 20, update_communities_rank),  # 1 minute
+)
+
+
+class MaintenanceWorker:
+    """Executes jobs which became due during live sync on its own connection and thread.
+
+    Blocks only schedule the jobs, so deleting old mentions and notifications and updating ranks neither delays them
+    nor holds locks in their transaction. A job scheduled again before it ran is executed once. Jobs touching rows
+    updated by blocks wait for them at most `lock_timeout`, and a job which fails is logged and retried when it's due
+    next time.
+    """
+
+    MAX_RETRIES = 3
+
+    def __init__(self, db, jobs=LIVE_JOBS, lock_timeout='1s'):
+        self._shared_db = db
+        self._jobs = list(jobs)
+        self._lock_timeout = lock_timeout
+        self._db = None
+        self._thread = None
+        self._pending = []
+        self._stopping = False
+        self._condition = threading.Condition()
+
+    @property
+    def is_running(self):
+        return self._thread is not None
+
+    def start(self):
+        self._db = self._shared_db.clone('maintenance')
+        self._stopping = False
+        self._thread = threading.Thread(target=self._work, name='maintenance', daemon=True)
+        self._thread.start()
+
+    def blocks_processed(self, first_block, last_block):
+        """Schedule jobs due within the processed blocks."""
+        due = [job for job in self._jobs if job.is_due(first_block, last_block)]
+        if not due:
+            return
+        with self._condition:
+            for job in due:
+                if job not in self._pending:
+                    log.info(f"[SINGLE] block {last_block}: scheduled {job.name}")
+                    self._pending.append(job)
+            self._condition.notify()
+
+    def stop(self):
+        """Finish the running job, skip pending ones and close the connection."""
+        if self._thread is None:
+            return
+        with self._condition:
+            self._stopping = True
+            self._pending.clear()
+            self._condition.notify()
+        self._thread.join()
+        self._thread = None
+        self._db.close()
+        self._db = None
+
+    def _next_job(self):
+        with self._condition:
+            while not self._pending and not self._stopping:
+                self._condition.wait()
+            return None if self._stopping else self._pending.pop(0)
+
+    def _work(self):
+        while (job := self._next_job()) is not None:
+            time_start = perf_counter()
+            try:
+                self._run_job(job)
+            except Exception:  # pylint: disable=broad-except
+                log.exception(f"Maintenance job {job.name} failed")
+            else:
+                log.info(f"[SINGLE] maintenance job {job.name} executed in {perf_counter() - time_start:.4f}s")
+
+    def _run_job(self, job):
+        for attempt in range(1, self.MAX_RETRIES + 1):
+            self._db.query_no_return("START TRANSACTION")
+            try:
+                self._db.query_no_return("SET LOCAL lock_timeout = :timeout", timeout=self._lock_timeout)
+                job.run(self._db)
+                self._db.query_no_return("COMMIT")
+                return
+            except (psycopg2.extensions.TransactionRollbackError, psycopg2.errors.LockNotAvailable) as ex:
+                self._db.query_no_return("ROLLBACK")
+                if attempt == self.MAX_RETRIES:
+                    raise
+                log.warning(f"Maintenance job {job.name} conflicted with block processing, retrying: {ex}")
+            except Exception:
+                self._db.query_no_return("ROLLBACK")
+                raise
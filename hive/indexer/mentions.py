@@ -10,9 +10,9 @@ log = logging.getLogger(__name__)
 
 class Mentions(DbAdapterHolder):
     @classmethod
-    def refresh(cls):
-        """Deleting too old mentions"""
+    def refresh(cls, db=None):
+        """Dropping partitions of too old mentions and creating ones ahead of the head block"""
 
         log.warning("Deleting too old mentions")
 
-        cls.db.query_no_return(f"SELECT {SCHEMA_NAME}.delete_hive_posts_mentions();")
+        (db or cls.db).query_no_return(f"SELECT {SCHEMA_NAME}.delete_hive_posts_mentions();")
@@ -1,11 +1,17 @@
 """Notification cache — flush methods now handled by SQL functions."""
 
+from hive.conf import SCHEMA_NAME
 from hive.indexer.db_adapter_holder import DbAdapterHolder
 
 
 class NotificationCache(DbAdapterHolder):
     """Holds DB connection for parallel SQL notification/community processing."""
 
+    @staticmethod
+    def maintain_partitions(db):
+        """Create partitions ahead of the head block and drop ones older than the notification window."""
+        db.query_no_return(f"SELECT {SCHEMA_NAME}.maintain_notification_cache_partitions()")
+
 
 class VoteNotificationCache(NotificationCache):
     """Holds DB connection for parallel SQL vote notification flushing."""
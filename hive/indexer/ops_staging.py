@@ -0,0 +1,27 @@
+"""Operations staging — loading of _ops_staging is handled by SQL (load_ops_staging/prefetch_ops_staging)."""
+
+import logging
+
+from hive.conf import SCHEMA_NAME
+from hive.indexer.db_adapter_holder import DbAdapterHolder
+
+log = logging.getLogger(__name__)
+
+
+class OpsStaging(DbAdapterHolder):
+    """Holds DB connection for prefetching the next batch range into its _ops_staging slot."""
+
+    @classmethod
+    def prefetch(cls, first_block: int, last_block: int) -> int:
+        """Load operations of a queued batch into its staging slot (own transaction)."""
+        cls.db.query_no_return("START TRANSACTION")
+        try:
+            count = cls.db.query_one(f"SELECT {SCHEMA_NAME}.prefetch_ops_staging({first_block}, {last_block})")
+            cls.db.query_no_return("COMMIT")
+        except Exception:
+            try:
+                cls.db.query_no_return("ROLLBACK")
+            except Exception:
+                pass
+            raise
+        return count
@@ -1,10 +1,28 @@
 import logging
+import sys
+from collections import OrderedDict
 
 from hive.conf import SCHEMA_NAME
+from hive.db.binary_copy import DEFAULT_CHUNK_SIZE, ChunkStream, binary_copy_chunks
 from hive.indexer.db_adapter_holder import DbAdapterHolder
+from hive.utils.stats import BroadcastObject
+from hive.utils.stats import PrometheusClient as PC
 
 log = logging.getLogger(__name__)
 
+# Per-connection staging table for flush(); in live sync it lives on the shared connection
+_FLUSH_TABLE = 'pg_temp._post_data_flush'
+_FLUSH_COLUMN_TYPES = ('int4', 'bool', 'text', 'text', 'text')
+_CREATE_FLUSH_TABLE_SQL = """
+    CREATE TEMP TABLE IF NOT EXISTS _post_data_flush (
+        id INT NOT NULL,
+        is_new_post BOOLEAN NOT NULL,
+        title TEXT,
+        body TEXT,
+        json TEXT
+    )
+"""
+
 
 def _sanitize_nul(val):
     """Replace NUL chars with spaces — PostgreSQL text columns cannot store \\x00."""
@@ -13,10 +31,38 @@ def _sanitize_nul(val):
     return val.replace('\x00', ' ') if '\x00' in val else val
 
 
+def _data_size(post_data):
+    """Memory taken by the text fields of a cache entry."""
+    return sum(sys.getsizeof(post_data[k]) for k in ('title', 'body', 'json') if post_data.get(k) is not None)
+
+
 class PostDataCache(DbAdapterHolder):
     """Provides cache for DB operations on post data table in order to speed up massive sync"""
 
     _data = {}
+    _data_bytes = 0
+    _max_bytes = None  # cache is flushed early (spilled) when it grows above this size
+
+    # bodies of recently flushed posts, so diff edits of posts from recent batches skip the DB
+    _flushed_bodies = OrderedDict()
+    _flushed_bodies_bytes = 0
+    _flushed_bodies_max_bytes = 0
+
+    # pre-batch bodies of posts edited by diff patches, fetched in one query (see prefetch_post_bodies)
+    _prefetched_bodies = {}
+
+    _hits = 0
+    _lru_hits = 0
+    _prefetch_hits = 0
+    _misses = 0
+    _spills = 0
+
+    @classmethod
+    def configure(cls, max_mb, lru_max_mb):
+        """Set memory limits of the cache and of the flushed bodies LRU (in MB, 0 means no spill/no LRU)."""
+        cls._max_bytes = max_mb * 1024 * 1024 if max_mb else None
+        cls._flushed_bodies_max_bytes = lru_max_mb * 1024 * 1024
+        cls._evict_flushed_bodies()
 
     @classmethod
     def is_cached(cls, pid):
@@ -29,79 +75,157 @@ class PostDataCache(DbAdapterHolder):
         if not cls.is_cached(pid):
             cls._data[pid] = post_data
             cls._data[pid]['is_new_post'] = is_new_post
+            cls._data_bytes += _data_size(post_data)
         else:
             assert not is_new_post
+            cached = cls._data[pid]
+            cls._data_bytes -= _data_size(cached)
             for k, data in post_data.items():
                 if data is not None:
-                    cls._data[pid][k] = data
+                    cached[k] = data
+            cls._data_bytes += _data_size(cached)
+
+        if cls._max_bytes is not None and cls._data_bytes > cls._max_bytes:
+            cls._spill()
+
+    @classmethod
+    def _spill(cls):
+        """Partial flush of a batch whose cached data outgrew the memory limit."""
+        log.info(
+            "PostDataCache exceeded %d bytes (%d posts, %d bytes), flushing early",
+            cls._max_bytes,
+            len(cls._data),
+            cls._data_bytes,
+        )
+        cls._spills += 1
+        cls.flush()
 
     @classmethod
     def get_post_body(cls, pid):
-        """Returns body of given post from collected cache or from underlying DB storage."""
-        try:
-            post_data = cls._data[pid]
-        except KeyError:
-            sql = f"""
-                  SELECT hpd.body FROM {SCHEMA_NAME}.hive_post_data hpd WHERE hpd.id = :post_id;
-                  """
-            row = cls.db.query_row(sql, post_id=pid)
-            post_data = dict(row._mapping)
+        """Returns body of given post from collected cache, recently flushed bodies or underlying DB storage."""
+        post_data = cls._data.get(pid)
+        if post_data is not None and post_data['body'] is not None:
+            cls._hits += 1
+            return post_data['body']
+
+        body = cls._flushed_bodies.get(pid)
+        if body is not None:
+            cls._lru_hits += 1
+            cls._flushed_bodies.move_to_end(pid)
+            return body
+
+        body = cls._prefetched_bodies.get(pid)
+        if body is not None:
+            cls._prefetch_hits += 1
+            return body
+
+        cls._misses += 1
+
+        sql = f"""
+              SELECT hpd.body FROM {SCHEMA_NAME}.hive_post_data hpd WHERE hpd.id = :post_id;
+              """
+        row = cls.db.query_row(sql, post_id=pid)
+        post_data = dict(row._mapping)
         return post_data['body']
 
+    @classmethod
+    def prefetch_post_bodies(cls, pids):
+        """Fetch bodies of given posts, which are neither cached nor recently flushed, with a single query."""
+        missing = [
+            pid
+            for pid in pids
+            if pid not in cls._flushed_bodies and (pid not in cls._data or cls._data[pid]['body'] is None)
+        ]
+        cls._prefetched_bodies = {}
+        if not missing:
+            return 0
+
+        sql = f"SELECT hpd.id, hpd.body FROM {SCHEMA_NAME}.hive_post_data hpd WHERE hpd.id = ANY(:post_ids)"
+        cls._prefetched_bodies = dict(cls.db.query_all(sql, post_ids=missing))
+        return len(cls._prefetched_bodies)
+
+    @classmethod
+    def _remember_flushed_bodies(cls):
+        if not cls._flushed_bodies_max_bytes:
+            return
+
+        for pid, data in cls._data.items():
+            body = data['body']
+            if body is None:
+                continue  # body unchanged by this flush; a remembered one is still current
+            previous = cls._flushed_bodies.pop(pid, None)
+            if previous is not None:
+                cls._flushed_bodies_bytes -= sys.getsizeof(previous)
+            cls._flushed_bodies[pid] = body
+            cls._flushed_bodies_bytes += sys.getsizeof(body)
+
+        cls._evict_flushed_bodies()
+
+    @classmethod
+    def _evict_flushed_bodies(cls):
+        while cls._flushed_bodies and cls._flushed_bodies_bytes > cls._flushed_bodies_max_bytes:
+            _, body = cls._flushed_bodies.popitem(last=False)
+            cls._flushed_bodies_bytes -= sys.getsizeof(body)
+
+    @classmethod
+    def broadcast_stats(cls):
+        PC.broadcast(
+            [
+                BroadcastObject('post_data_cache_hits', cls._hits, 'hits'),
+                BroadcastObject('post_data_cache_lru_hits', cls._lru_hits, 'hits'),
+                BroadcastObject('post_data_cache_prefetch_hits', cls._prefetch_hits, 'hits'),
+                BroadcastObject('post_data_cache_misses', cls._misses, 'misses'),
+                BroadcastObject('post_data_cache_spills', cls._spills, 'spills'),
+                BroadcastObject('post_data_cache_lru_size', cls._flushed_bodies_bytes, 'b'),
+            ]
+        )
+
     @classmethod
     def flush(cls, print_query=False):
-        """Flush data from cache to db"""
+        """Flush data from cache to db.
+
+        Cached rows are streamed with binary COPY into a temporary table and merged
+        into hive_post_data server-side, so neither the SQL text nor its parameters
+        grow with the number of cached posts.
+        """
         if not cls._data:
             return 0
 
-        insert_items = []
-        update_items = []
-        for k, data in cls._data.items():
-            item = (
-                k,
-                data['is_root'],
+        cls.beginTx()
+
+        cls.db.query_no_return(_CREATE_FLUSH_TABLE_SQL)
+        cls.db.query_no_return(f"TRUNCATE {_FLUSH_TABLE}")
+
+        rows = (
+            (
+                pid,
+                data['is_new_post'],
                 _sanitize_nul(data['title']),
                 _sanitize_nul(data['body']),
                 _sanitize_nul(data['json']),
             )
-            if data['is_new_post']:
-                insert_items.append(item)
-            else:
-                update_items.append(item)
-
-        cls.beginTx()
-
-        insert_ph = (
-            ','.join(['(%s, %s, %s, %s, %s)'] * len(insert_items))
-            if insert_items
-            else '(NULL::int,NULL::bool,NULL::text,NULL::text,NULL::text)'
+            for pid, data in cls._data.items()
         )
-        update_ph = (
-            ','.join(['(%s, %s, %s, %s, %s)'] * len(update_items))
-            if update_items
-            else '(NULL::int,NULL::bool,NULL::text,NULL::text,NULL::text)'
+        cls.db.copy_from(
+            f"COPY {_FLUSH_TABLE} (id, is_new_post, title, body, json) FROM STDIN WITH (FORMAT binary)",
+            ChunkStream(binary_copy_chunks(rows, _FLUSH_COLUMN_TYPES)),
+            DEFAULT_CHUNK_SIZE,
         )
 
         sql = f"""
-            WITH insert_values(id, is_root, title, body, json) AS (
-                SELECT * FROM (VALUES {insert_ph}) AS v(id, is_root, title, body, json)
-                WHERE v.id IS NOT NULL
-            ),
-            update_values(id, is_root, title, body, json) AS (
-                SELECT * FROM (VALUES {update_ph}) AS v(id, is_root, title, body, json)
-            ),
-            insert_post_data AS (
-                INSERT INTO {SCHEMA_NAME}.hive_post_data
-                SELECT id, title, body, json FROM insert_values
+            WITH insert_post_data AS (
+                INSERT INTO {SCHEMA_NAME}.hive_post_data (id, title, body, json)
+                SELECT f.id, f.title, f.body, f.json FROM {_FLUSH_TABLE} f
+                WHERE f.is_new_post
                 RETURNING id
             ),
             update_post_data AS (
                 UPDATE {SCHEMA_NAME}.hive_post_data AS hpd
-                SET title = COALESCE( i.title, hpd.title ),
-                    body = COALESCE( i.body, hpd.body ),
-                    json = COALESCE( i.json, hpd.json )
-                FROM update_values i
-                WHERE hpd.id = i.id AND i.id IS NOT NULL
+                SET title = COALESCE( f.title, hpd.title ),
+                    body = COALESCE( f.body, hpd.body ),
+                    json = COALESCE( f.json, hpd.json )
+                FROM {_FLUSH_TABLE} f
+                WHERE hpd.id = f.id AND NOT f.is_new_post
                 RETURNING hpd.id
             ),
             combined AS (
@@ -109,26 +233,26 @@ class PostDataCache(DbAdapterHolder):
                 UNION ALL
                 SELECT id FROM update_post_data
             )
-            SELECT {SCHEMA_NAME}.process_hive_post_mentions(array_agg(id))
-            FROM combined
+            SELECT count(*) FROM (
+                SELECT {SCHEMA_NAME}.process_hive_post_mentions(array_agg(id))
+                FROM combined
+            ) AS mentions
         """
 
-        params = []
-        for item in insert_items:
-            params.extend(item)
-        for item in update_items:
-            params.extend(item)
-
         if print_query:
             log.info(f"Executing query:\n{sql}")
 
-        if params:
-            cls.db.query_all_raw(sql, tuple(params))
-        else:
-            cls.db.query_all_raw(sql)
+        cls.db.query_no_return_raw(sql)
 
         cls.commitTx()
 
+        cls._remember_flushed_bodies()
+        # prefetched bodies of flushed posts are outdated now
+        for pid in cls._data:
+            cls._prefetched_bodies.pop(pid, None)
+
         n = len(cls._data)
         cls._data.clear()
+        cls._data_bytes = 0
+        cls.broadcast_stats()
         return n
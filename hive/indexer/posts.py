@@ -4,11 +4,14 @@ Only _merge_post_body remains in Python for diff-patch body merging.
 """
 
 import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 
 from diff_match_patch import diff_match_patch
 
 from hive.indexer.db_adapter_holder import DbAdapterHolder
 from hive.indexer.post_data_cache import PostDataCache
+from hive.utils.post import apply_body_patches
 
 log = logging.getLogger(__name__)
 
@@ -16,14 +19,59 @@ log = logging.getLogger(__name__)
 class Posts(DbAdapterHolder):
     """Handles post operations. Only body merging (diff patches) remains in Python."""
 
+    _merge_workers = 0
+    _merge_pool = None
+
+    @classmethod
+    def configure_merge_pool(cls, workers):
+        """Set number of worker processes applying body patches of a batch (0 merges on the calling thread)."""
+        cls._merge_workers = max(workers or 0, 0)
+
+    @classmethod
+    def merge_pool_enabled(cls):
+        return cls._merge_workers > 0
+
+    @classmethod
+    def close_merge_pool(cls):
+        if cls._merge_pool is not None:
+            cls._merge_pool.shutdown()
+            cls._merge_pool = None
+
+    @classmethod
+    def merge_post_bodies(cls, chains):
+        """Apply body definitions of many posts in parallel worker processes.
+
+        `chains` is a list of `(base_body, body_defs)` pairs, each holding consecutive body definitions of one
+        post. Returns lists of resulting bodies (see `apply_body_patches`) in the order of `chains`.
+        """
+        if cls._merge_pool is None:
+            # spawned workers, since forking while sync threads hold open connections is not safe
+            cls._merge_pool = ProcessPoolExecutor(
+                max_workers=cls._merge_workers, mp_context=multiprocessing.get_context('spawn')
+            )
+            log.info(f"Started {cls._merge_workers} post body merging processes")
+
+        bases, body_defs = zip(*chains) if chains else ((), ())
+        chunksize = max(len(chains) // (cls._merge_workers * 4), 1)
+        return list(cls._merge_pool.map(apply_body_patches, bases, body_defs, chunksize=chunksize))
+
+    @staticmethod
+    def parse_body_patch(new_body_def):
+        """Returns patches encoded in new body definition (empty for a plain body), None if it can't be parsed."""
+        try:
+            return diff_match_patch().patch_fromText(new_body_def)
+        except Exception:
+            return None
+
     @classmethod
-    def _merge_post_body(cls, id, new_body_def):
+    def _merge_post_body(cls, id, new_body_def, patch=None):
         new_body = ''
         old_body = ''
 
         try:
             dmp = diff_match_patch()
-            patch = dmp.patch_fromText(new_body_def)
+            if patch is None:
+                patch = dmp.patch_fromText(new_body_def)
             if patch is not None and len(patch):
                 old_body = PostDataCache.get_post_body(id)
                 new_body, _ = dmp.patch_apply(patch, old_body)
@@ -9,11 +9,17 @@ from time import perf_counter as perf
 
 from hive.conf import SCHEMA_NAME, Conf
 from hive.db.adapter import Db
+from hive.db.block_listener import APPLICATION_NAME as BLOCK_LISTENER_APPLICATION_NAME
+from hive.db.block_listener import BlockListener
 from hive.db.db_state import DbState
 from hive.indexer.accounts import Accounts
 from hive.indexer.blocks import Blocks
 from hive.indexer.community import Community
 from hive.indexer.db_adapter_holder import DbLiveContextHolder
+from hive.indexer.hive_db.haf_functions import LIMIT_FOR_PROCESSED_BLOCKS, MASSIVE_STAGES_MIN_DISTANCE
+from hive.indexer.maintenance import MaintenanceWorker
+from hive.indexer.ops_staging import OpsStaging
+from hive.indexer.posts import Posts
 from hive.signals import (
     can_continue_thread,
     restore_default_signal_handlers,
@@ -49,7 +55,20 @@ class SyncHiveDb:
         self.time_start = None
 
         self._massive_consume_blocks_futures = None
+        self._massive_consume_blocks_range = None
+        self._massive_consume_blocks_stage = None
         self._massive_consume_blocks_thread_pool = ThreadPoolExecutor(max_workers=1)
+
+        # double-buffered _ops_staging: next range is loaded while the current one is applied
+        self._pipelined_staging = conf.get('massive_pipelined_staging')
+        self._ops_prefetch_future = None
+        self._ops_prefetch_thread_pool = ThreadPoolExecutor(max_workers=1)
+
+        # live sync waits for notifications of new blocks instead of polling for them
+        self._block_listener = None
+        if conf.get('live_notify_wakeup'):
+            self._block_listener = BlockListener(conf.get('database_url'), conf.get('live_notify_timeout'))
+        self._maintenance = MaintenanceWorker(self._db)
         self.rate = {}
 
     def __enter__(self):
@@ -59,6 +78,13 @@ class SyncHiveDb:
         set_custom_signal_handlers()
 
         Community.start_block = self._conf.get("community_start_block")
+        DbState.configure_finalization(
+            self._conf.get('finalize_work_mem_mb'),
+            self._conf.get('finalize_workers'),
+            self._conf.get('finalize_chunk_size'),
+        )
+        DbState.configure_index_restore(self._conf.get('index_build_workers'))
+        DbState.configure_live_notify(self._conf.get('live_notify_wakeup'))
         DbState.initialize(self._enter_sync, self._upgrade_schema)
 
         Blocks.setup(conf=self._conf)
@@ -68,7 +94,8 @@ class SyncHiveDb:
         self._check_log_explain_queries()
 
         if self._enter_sync:
-            Accounts.load_ids()  # prefetch id->name and id->rank memory maps
+            # prefetch id->name and id->rank memory maps
+            Accounts.load_ids(self._conf.get('account_ids_file'), Blocks.last_completed())
 
         return self
 
@@ -76,13 +103,19 @@ class SyncHiveDb:
         if self._enter_sync:
             log.info("Exiting HAF mode synchronization")
 
-            PayoutStats.generate(self._db, separate_transaction=True)
+            self._maintenance.stop()
+            if DbState.is_massive_sync():
+                # not updated by massive sync, so they are rebuilt
+                PayoutStats.generate(self._db, separate_transaction=True)
 
             last_imported_block = Blocks.last_imported()
             log.info(f'LAST IMPORTED BLOCK IS: {last_imported_block}')
             log.info(f'LAST COMPLETED BLOCK IS: {Blocks.last_completed()}')
 
             Blocks.close_own_db_access()
+            Posts.close_merge_pool()
+            if self._block_listener:
+                self._block_listener.close()
 
         if self._databases:
             self._databases.close()
@@ -130,18 +163,22 @@ class SyncHiveDb:
         SyncHiveDb.time_start = OPSM.start()
 
         while True:
-            # Wait for previous massive consumption BEFORE modifying context state.
-            # This prevents race condition where flush threads access context while
-            # app_next_iteration is modifying it.
-            try:
-                self._wait_for_massive_consume()
-            except Exception:
-                # Exception from massive sync thread (deadlock, FK violation, etc).
-                # Clear the future so _break_requested's _wait_for_massive_consume()
-                # won't re-raise, allowing _on_stop_synchronization() to run with
-                # sigint_during_massive=True (skipping FK/index restore).
-                log.warning("Exception from massive sync thread — deferring to shutdown handler")
-                self._massive_consume_blocks_futures = None
+            # In pipelined staging mode the batch submitted in the previous iteration keeps
+            # running while the next range is requested, so that the operations of the next
+            # range can be loaded into their own staging slot in the meantime. Only when the
+            # next range is known to be of the same massive stage: app_next_iteration commits
+            # the advanced context, which can't be undone for a stage switch.
+            pipelined = (
+                self._pipelined_staging
+                and self._massive_consume_blocks_futures is not None
+                and self._next_range_stays_massive()
+            )
+
+            if not pipelined:
+                # Wait for previous massive consumption BEFORE modifying context state.
+                # This prevents race condition where flush threads access context while
+                # app_next_iteration is modifying it.
+                self._wait_for_massive_consume_deferring_errors()
 
             last_imported_block = Blocks.last_imported()
 
@@ -155,12 +192,28 @@ class SyncHiveDb:
 
             application_stage = self._db.query_one(f"SELECT hive.get_current_stage_name('{SCHEMA_NAME}')")
 
+            # app_next_iteration only advanced the context past the running batch, whose
+            # remaining phases read _ops_staging and already visible blocks.
+            prefetch_next = (
+                pipelined
+                and self._lbound is not None
+                and application_stage == self._massive_consume_blocks_stage
+                and can_continue_thread()
+            )
+            if pipelined and not prefetch_next:
+                # no range, or not the expected one: the running batch is finished first
+                self._wait_for_massive_consume_deferring_errors()
+
             if self._break_requested(last_imported_block, active_connections_before):
                 return
 
             if self._lbound is None:
                 if application_stage == 'wait_for_haf':
                     report_enter_to_stage(application_stage)
+                elif application_stage == 'live' and self._block_listener and self._block_listener.is_open:
+                    # don't stay idle in transaction while waiting
+                    self._db.query_no_return("COMMIT")
+                    self._block_listener.wait()
                 continue
 
             # app_next_iteration updated the HAF context and recreated the
@@ -183,6 +236,18 @@ class SyncHiveDb:
                     f"VALUES ({self._lbound}, {self._ubound})"
                 )
             self._db.query_no_return("COMMIT")
+
+            if prefetch_next:
+                # Both batches are now queued in _batch_queue, so a crash at any point
+                # replays them in order. Load the next range on its own connection while
+                # the running batch is applied, then let it finish before submitting.
+                self._ops_prefetch_future = self._ops_prefetch_thread_pool.submit(
+                    OpsStaging.prefetch, self._lbound, self._ubound
+                )
+                self._wait_for_massive_consume_deferring_errors()
+                if not can_continue_thread():
+                    continue
+
             if application_stage == "MASSIVE_WITHOUT_INDEXES":
                 DbState.set_massive_sync(True)
                 report_enter_to_stage(application_stage)
@@ -191,8 +256,9 @@ class SyncHiveDb:
                 DbState.disable_wal_safety_for_massive_sync()
                 DbState.ensure_fk_are_disabled()
                 DbState.ensure_indexes_are_disabled()
+                DbState.ensure_payout_stats_are_not_maintained()
 
-                self._process_massive_blocks(self._lbound, self._ubound, active_connections_before)
+                self._process_massive_blocks(self._lbound, self._ubound, application_stage, active_connections_before)
             elif application_stage == "MASSIVE_WITH_INDEXES":
                 DbState.set_massive_sync(True)
                 if report_enter_to_stage(application_stage):
@@ -201,11 +267,12 @@ class SyncHiveDb:
                 DbState.ensure_off_synchronous_commit()
 
                 DbState.ensure_fk_are_disabled()
+                DbState.ensure_payout_stats_are_not_maintained()
                 if not DbState.are_indexes_enabled():
                     self._wait_for_massive_consume()
                     DbState.ensure_indexes_are_enabled()
 
-                self._process_massive_blocks(self._lbound, self._ubound, active_connections_before)
+                self._process_massive_blocks(self._lbound, self._ubound, application_stage, active_connections_before)
             elif application_stage == "live":
                 self._wait_for_massive_consume()  # wait for flushing massive data in thread
                 DbState.set_massive_sync(False)
@@ -220,6 +287,7 @@ class SyncHiveDb:
                     self.print_summary()
 
                 DbState.ensure_fk_are_enabled()
+                DbState.ensure_payout_stats_are_maintained()
 
                 log.info("[SINGLE] *** SINGLE block processing***")
 
@@ -235,23 +303,29 @@ class SyncHiveDb:
         If an entry exists, the prior process crashed mid-batch and we must
         replay it. The idempotent SQL (vote num_changes, author_rewards guards)
         ensures replayed data does not double-count.
+
+        With pipelined staging two batches can be queued (the one being applied
+        and the next one being prefetched); they are replayed in block order.
         """
-        leftover = self._db.query_all(f"SELECT first_block, last_block FROM {SCHEMA_NAME}._batch_queue LIMIT 1")
+        leftover = self._db.query_all(
+            f"SELECT first_block, last_block FROM {SCHEMA_NAME}._batch_queue ORDER BY first_block"
+        )
         if not leftover:
             return
 
-        first_block, last_block = leftover[0][0], leftover[0][1]
-        log.info(f"Crash recovery: replaying unfinished batch {first_block}..{last_block}")
-
         DbLiveContextHolder.set_live_context(False)
         Blocks.setup_own_db_access(shared_db_adapter=self._db)
-        Blocks.set_end_of_sync_lib()
-        Blocks.process_multi_sql(first_block, last_block)
 
-        self._db.query_no_return("START TRANSACTION")
-        self._db.query_no_return(f"DELETE FROM {SCHEMA_NAME}._batch_queue")
-        self._db.query_no_return("COMMIT")
-        log.info(f"Crash recovery: batch {first_block}..{last_block} replayed successfully")
+        for first_block, last_block in leftover:
+            log.info(f"Crash recovery: replaying unfinished batch {first_block}..{last_block}")
+
+            Blocks.set_end_of_sync_lib(Blocks.irreversible_block(self._db))
+            Blocks.process_multi_sql(first_block, last_block)
+
+            self._db.query_no_return("START TRANSACTION")
+            self._db.query_no_return(self._batch_queue_delete_sql(first_block, last_block))
+            self._db.query_no_return("COMMIT")
+            log.info(f"Crash recovery: batch {first_block}..{last_block} replayed successfully")
 
     def _check_unlogged_data_consistency(self):
         """Detect and recover from UNLOGGED table data loss after a PostgreSQL crash.
@@ -309,12 +383,17 @@ class SyncHiveDb:
             'hive_posts',
             'hive_communities',
             'hive_accounts',
+            'hive_payout_stats',
+            'hive_payout_stats_community',
             'hive_permlink_data',
             'hive_category_data',
             'hive_tag_data',
             # Staging/internal tables
             '_batch_queue',
+            '_finalize_checkpoints',
             '_ops_staging',
+            '_ops_staging_prefetch',
+            '_ops_staging_slots',
             '_comment_staging',
             '_post_results',
             '_vote_batch',
@@ -349,18 +428,49 @@ class SyncHiveDb:
             "seed data re-inserted. Sync will restart from the beginning."
         )
 
+    @staticmethod
+    def _batch_queue_delete_sql(first_block, last_block):
+        return f"DELETE FROM {SCHEMA_NAME}._batch_queue WHERE first_block = {first_block} AND last_block = {last_block}"
+
     def _wait_for_massive_consume(self):
         if self._massive_consume_blocks_futures is None:
             return
 
         self._massive_consume_blocks_futures.result()
         self._massive_consume_blocks_futures = None
+        first_block, last_block = self._massive_consume_blocks_range
+        self._massive_consume_blocks_range = None
+        self._massive_consume_blocks_stage = None
 
-        # Batch completed successfully — remove crash recovery marker
+        # Batch completed successfully — remove its crash recovery marker. With pipelined
+        # staging the marker of the next batch is already queued and must stay.
         self._db.query_no_return("START TRANSACTION")
-        self._db.query_no_return(f"DELETE FROM {SCHEMA_NAME}._batch_queue")
+        self._db.query_no_return(self._batch_queue_delete_sql(first_block, last_block))
         self._db.query_no_return("COMMIT")
 
+    def _wait_for_massive_consume_deferring_errors(self):
+        try:
+            self._wait_for_massive_consume()
+        except Exception:
+            # Exception from massive sync thread (deadlock, FK violation, etc).
+            # Clear the future so _break_requested's _wait_for_massive_consume()
+            # won't re-raise, allowing _on_stop_synchronization() to run with
+            # sigint_during_massive=True (skipping FK/index restore).
+            log.warning("Exception from massive sync thread — deferring to shutdown handler")
+            self._massive_consume_blocks_futures = None
+            self._massive_consume_blocks_range = None
+            self._massive_consume_blocks_stage = None
+
+    def _wait_for_ops_prefetch(self):
+        if self._ops_prefetch_future is None:
+            return
+
+        try:
+            self._ops_prefetch_future.result()
+        except Exception as ex:
+            log.warning(f"Prefetch of operations into staging slot failed: {ex}")
+        self._ops_prefetch_future = None
+
     def _break_requested(self, last_imported_block, active_connections_before):
         if not can_continue_thread():
             self._db.query_no_return("ROLLBACK")
@@ -383,14 +493,37 @@ class SyncHiveDb:
 
         return False
 
+    def _batch_size(self):
+        """Number of blocks of the next massive batch requested from HAF, None for the stage's default."""
+        return Blocks.massive_batch_size() or self._max_batch or None
+
+    def _next_range_stays_massive(self) -> bool:
+        """Whether the range after the running batch belongs to the same massive stage.
+
+        HAF selects a massive stage while the current block is further from the irreversible one than
+        the stage's distance, so it holds for the next range while the distance after the running batch
+        exceeds it by more than a batch.
+        """
+        min_distance = MASSIVE_STAGES_MIN_DISTANCE.get(self._massive_consume_blocks_stage)
+        if min_distance is None:
+            return False
+
+        last_block = self._massive_consume_blocks_range[1]
+        if self._last_block_to_process and last_block >= self._last_block_to_process:
+            return False
+
+        irreversible_block = Blocks.irreversible_block(self._db)
+        batch_size = self._batch_size() or LIMIT_FOR_PROCESSED_BLOCKS
+        return irreversible_block - last_block > min_distance + batch_size
+
     def _query_for_app_next_block(self) -> tuple[int, int]:
         limit = "NULL"
         batch = "NULL"
         if self._last_block_to_process:
             limit = self._last_block_to_process
 
-        if self._max_batch:
-            batch = self._max_batch
+        if self._batch_size():
+            batch = self._batch_size()
 
         result = self._db.query_one(
             f"CALL hive.app_next_iteration( _contexts => ARRAY['{SCHEMA_NAME}' ]::hive.contexts_group, _blocks_range => (0,0), _limit => {limit}, _override_max_batch => {batch} )"
@@ -418,16 +551,21 @@ class SyncHiveDb:
             DbLiveContextHolder.set_live_context(True)
             Blocks.close_own_db_access()
             self._terminate_stale_connections()
+            # opened before the baseline, they stay open for the rest of live sync
+            if self._block_listener:
+                self._block_listener.open()
+            self._maintenance.start()
             # Wait for pg_stat_activity to reflect closed connections before
             # establishing baseline (see hivemind issue #207)
             active_connections_before = self._wait_for_stable_connections()
             Blocks.setup_own_db_access(shared_db_adapter=self._db)
 
         Blocks.process_live_block_sql(lbound, ubound)
+        self._maintenance.blocks_processed(lbound, ubound)
         active_connections_after_live = self._get_active_db_connections()
         self._assert_connections_closed(active_connections_before, active_connections_after_live)
 
-    def _process_massive_blocks(self, lbound, ubound, active_connections_before):
+    def _process_massive_blocks(self, lbound, ubound, application_stage, active_connections_before):
         if DbLiveContextHolder.is_live_context() or DbLiveContextHolder.is_live_context() is None:
             DbLiveContextHolder.set_live_context(False)
             Blocks.setup_own_db_access(shared_db_adapter=self._db)
@@ -436,11 +574,20 @@ class SyncHiveDb:
         # context advancement in the main loop, before we reach here).
 
         # SQL path: no data fetching needed, SQL functions read directly from operations_view
+        # (or from the staging slot prefetched for this range in pipelined mode)
+        self._massive_consume_blocks_range = (lbound, ubound)
+        self._massive_consume_blocks_stage = application_stage
+        # LIB is read here, self._db stays in use by this thread while the batch runs on the worker
+        lib = Blocks.irreversible_block(self._db)
         self._massive_consume_blocks_futures = self._massive_consume_blocks_thread_pool.submit(
-            self._consume_massive_blocks_sql, lbound, ubound
+            self._consume_massive_blocks_sql, lbound, ubound, lib, self._ops_prefetch_future
         )
+        self._ops_prefetch_future = None
 
     def _on_stop_synchronization(self, active_connections_before, sigint_during_massive=False):
+        # The prefetch connection is closed together with other flush connections on exit
+        self._wait_for_ops_prefetch()
+
         # Restore WAL safety settings (fsync, full_page_writes) that were disabled
         # via ALTER SYSTEM during massive sync. These persist in postgresql.auto.conf
         # and survive PostgreSQL restarts, so they must always be restored on shutdown.
@@ -530,7 +677,7 @@ class SyncHiveDb:
 
         self.rate = {}
 
-    def _consume_massive_blocks_sql(self, lbound, ubound) -> int:
+    def _consume_massive_blocks_sql(self, lbound, ubound, lib, ops_prefetch=None) -> int:
         """Consume a block range using pure SQL processing (no Python dispatch loop)."""
         from hive.utils.stats import minmax
 
@@ -539,8 +686,15 @@ class SyncHiveDb:
 
         self.rate = minmax(self.rate, 0, 1.0, 0)
 
+        if ops_prefetch is not None:
+            # load_ops_staging falls back to scanning operations_view when the slot is missing
+            try:
+                ops_prefetch.result()
+            except Exception as ex:
+                log.warning(f"Prefetch of blocks {lbound}-{ubound} failed, loading them directly: {ex}")
+
         try:
-            Blocks.set_end_of_sync_lib()
+            Blocks.set_end_of_sync_lib(lib)
             timer = Timer(num_blocks, entity='block', laps=['rps', 'wps'])
 
             time_before = perf()
@@ -578,8 +732,12 @@ class SyncHiveDb:
         return 1
 
     def _get_active_db_connections(self):
-        sql = "SELECT application_name FROM pg_stat_activity WHERE application_name LIKE 'hivemind_%';"
-        return self._db.query_col(sql)
+        # the block listener reconnects on its own when its connection is lost
+        sql = (
+            "SELECT application_name FROM pg_stat_activity "
+            "WHERE application_name LIKE 'hivemind_%%' AND application_name != :block_listener;"
+        )
+        return self._db.query_col(sql, block_listener=BLOCK_LISTENER_APPLICATION_NAME)
 
     def _terminate_stale_connections(self):
         """Terminate lingering hivemind connections from previous crashed instances.
@@ -588,12 +746,14 @@ class SyncHiveDb:
         until TCP keepalive timeout (~2h). These zombies cause the connection
         assertion to fail when compared against the post-processing snapshot.
         """
-        our_pid = self._db.query_one("SELECT pg_backend_pid();")
+        # idle connections of our own pool are kept open on purpose
+        own_pids = [self._db.query_one("SELECT pg_backend_pid();"), *self._db.pool_backend_pids()]
         terminated = self._db.query_all(
-            f"SELECT pg_terminate_backend(pid), application_name "
-            f"FROM pg_stat_activity "
-            f"WHERE application_name LIKE 'hivemind_%%' "
-            f"AND pid != {our_pid};"
+            "SELECT pg_terminate_backend(pid), application_name "
+            "FROM pg_stat_activity "
+            "WHERE application_name LIKE 'hivemind_%%' "
+            "AND pid <> ALL(:own_pids);",
+            own_pids=own_pids,
         )
         if terminated:
             log.info(f"Terminated {len(terminated)} stale hivemind connection(s): {[t[1] for t in terminated]}")
@@ -601,9 +761,10 @@ class SyncHiveDb:
             for _ in range(50):
                 time.sleep(0.1)
                 remaining = self._db.query_all(
-                    f"SELECT application_name FROM pg_stat_activity "
-                    f"WHERE application_name LIKE 'hivemind_%%' "
-                    f"AND pid != {our_pid};"
+                    "SELECT application_name FROM pg_stat_activity "
+                    "WHERE application_name LIKE 'hivemind_%%' "
+                    "AND pid <> ALL(:own_pids);",
+                    own_pids=own_pids,
                 )
                 if not remaining:
                     break
@@ -1,7 +1,37 @@
 """Votes indexing and processing — now handled by SQL (process_votes_from_staging)."""
 
-from hive.indexer.db_adapter_holder import DbAdapterHolder
+from hive.indexer.db_adapter_holder import DbAdapterHolder, DbLiveContextHolder
 
 
 class Votes(DbAdapterHolder):
-    """Holds DB connection for parallel SQL vote processing."""
+    """Holds DB connections for parallel SQL vote processing.
+
+    Massive sync splits the votes of a batch into `partitions` by post_id, `db` applies
+    the first partition and every other one gets its own connection in `partition_dbs`.
+    """
+
+    partitions = 1
+    partition_dbs = []
+
+    @classmethod
+    def configure(cls, partitions):
+        assert partitions >= 1, 'number of vote partitions has to be positive'
+        cls.partitions = partitions
+
+    @classmethod
+    def setup_own_db_access(cls, sharedDb, name):
+        super().setup_own_db_access(sharedDb, name)
+        if not DbLiveContextHolder.is_live_context():
+            cls.partition_dbs = [sharedDb.clone(f'{name}_{k}') for k in range(1, cls.partitions)]
+
+    @classmethod
+    def close_own_db_access(cls):
+        for db in cls.partition_dbs:
+            db.close()
+        cls.partition_dbs = []
+        super().close_own_db_access()
+
+    @classmethod
+    def partition_db(cls, partition):
+        """Connection applying given partition of a vote batch."""
+        return cls.db if partition == 0 else cls.partition_dbs[partition - 1]
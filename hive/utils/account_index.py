@@ -0,0 +1,156 @@
+"""Compact, read-only map of account names to ids, optionally persisted to a memory-mapped file."""
+
+import mmap
+import os
+import struct
+from array import array
+from collections import namedtuple
+
+
+class AccountIndex:
+    """Name -> id map for millions of accounts, at a fraction of the memory of a dict.
+
+    Names sorted by their UTF-8 bytes are concatenated into a single buffer, with the start of every
+    name in `offsets` and the matching account id at the same position in `ids`. Lookups bisect the
+    names, so every name costs its bytes plus 8 bytes instead of a dict entry and two Python objects.
+    """
+
+    __slots__ = ('_names', '_offsets', '_ids')
+
+    def __init__(self, names=b'', offsets=None, ids=None):
+        self._names = names
+        self._offsets = offsets if offsets is not None else array('I', [0])
+        self._ids = ids if ids is not None else array('i')
+        assert len(self._offsets) == len(self._ids) + 1
+
+    @classmethod
+    def from_sorted(cls, pairs):
+        """Build the index out of (name, id) pairs ordered by name bytes (e.g. `ORDER BY name COLLATE "C"`).
+
+        Pairs are consumed one by one, so they can come straight from a streamed query.
+        """
+        names = bytearray()
+        offsets = array('I', [0])
+        ids = array('i')
+        previous = None
+        for name, _id in pairs:
+            key = name.encode()
+            assert previous is None or previous < key, f"account names not in byte order: '{name}'"
+            previous = key
+            names += key
+            offsets.append(len(names))
+            ids.append(_id)
+        return cls(names, offsets, ids)
+
+    def _find(self, key):
+        names, offsets = self._names, self._offsets
+        lo, hi = 0, len(self._ids)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if names[offsets[mid] : offsets[mid + 1]] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(self._ids) and names[offsets[lo] : offsets[lo + 1]] == key:
+            return lo
+        return -1
+
+    def get(self, name, default=None):
+        pos = self._find(name.encode())
+        return self._ids[pos] if pos >= 0 else default
+
+    def __contains__(self, name):
+        return isinstance(name, str) and self._find(name.encode()) >= 0
+
+    def __getitem__(self, name):
+        pos = self._find(name.encode())
+        if pos < 0:
+            raise KeyError(name)
+        return self._ids[pos]
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __bool__(self):
+        return len(self._ids) > 0
+
+    def max_id(self):
+        return max(self._ids, default=0)
+
+    def items(self):
+        """(name, id) pairs in the order of the index."""
+        names, offsets = self._names, self._offsets
+        for pos, _id in enumerate(self._ids):
+            yield bytes(names[offsets[pos] : offsets[pos + 1]]).decode(), _id
+
+
+# Index file: header, names (UTF-8, sorted, concatenated), then 4-aligned offsets and ids in native byte order.
+# Offsets are positions in the whole file, so the mapped file serves directly as names buffer of the index.
+_FILE_MAGIC = b'HIVEACCS'
+_FILE_VERSION = 1
+_FILE_HEADER = struct.Struct('=8sIqiQQ64s')
+
+AccountIndexInfo = namedtuple('AccountIndexInfo', ['last_completed_block', 'max_id', 'max_name'])
+
+
+def _arrays_start(names_end):
+    return (names_end + 3) & ~3
+
+
+def write_account_index(path, pairs, last_completed_block):
+    """Stream (name, id) pairs ordered by name bytes into index file at `path`, which is replaced atomically."""
+    offsets = array('I', [_FILE_HEADER.size])
+    ids = array('i')
+    max_id, max_name = 0, b''
+    previous = None
+
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as file:
+        file.write(bytes(_FILE_HEADER.size))
+        for name, _id in pairs:
+            key = name.encode()
+            assert previous is None or previous < key, f"account names not in byte order: '{name}'"
+            previous = key
+            file.write(key)
+            offsets.append(offsets[-1] + len(key))
+            ids.append(_id)
+            if _id > max_id:
+                max_id, max_name = _id, key
+
+        names_end = offsets[-1]
+        file.write(bytes(_arrays_start(names_end) - names_end))
+        offsets.tofile(file)
+        ids.tofile(file)
+
+        file.seek(0)
+        file.write(
+            _FILE_HEADER.pack(
+                _FILE_MAGIC, _FILE_VERSION, last_completed_block, max_id, len(ids), names_end, max_name[:64]
+            )
+        )
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, path)
+
+
+def open_account_index(path):
+    """Map index file at `path`, returning (AccountIndex, AccountIndexInfo), or None when it is missing or invalid."""
+    try:
+        with open(path, 'rb') as file:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    if len(mapped) < _FILE_HEADER.size:
+        return None
+    magic, version, last_completed_block, max_id, count, names_end, max_name = _FILE_HEADER.unpack_from(mapped)
+    offsets_start = _arrays_start(names_end)
+    ids_start = offsets_start + (count + 1) * 4
+    if magic != _FILE_MAGIC or version != _FILE_VERSION or len(mapped) != ids_start + count * 4:
+        return None
+
+    view = memoryview(mapped)
+    offsets = view[offsets_start:ids_start].cast('I')
+    ids = view[ids_start:].cast('i')
+    info = AccountIndexInfo(last_completed_block, max_id, max_name.rstrip(b'\0').decode())
+    return AccountIndex(mapped, offsets, ids), info
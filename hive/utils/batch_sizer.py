@@ -0,0 +1,57 @@
+"""Adaptive size of massive sync batches."""
+
+
+class AdaptiveBatchSize:
+    """Chooses number of blocks of the next massive sync batch, so that a batch takes about `target_seconds`.
+
+    Time per block is averaged over recent batches. The size changes at most `max_step` times per batch,
+    so a dense block range shrinks batches quickly without collapsing them, and sparse early-chain
+    ranges grow them up to `max_size`.
+    """
+
+    def __init__(self, target_seconds, initial_size, min_size=10, max_size=10000, smoothing=0.5, max_step=2.0):
+        assert target_seconds > 0, 'target time of a batch has to be positive'
+        assert 0 < min_size <= max_size
+        self.target_seconds = target_seconds
+        self.min_size = min_size
+        self.max_size = max_size
+        self.smoothing = smoothing
+        self.max_step = max_step
+        self.size = self._clamp(initial_size)
+        self._seconds_per_block = None
+
+    def _clamp(self, size):
+        return min(max(int(size), self.min_size), self.max_size)
+
+    def update(self, num_blocks, phase_times, total=None):
+        """Account phase timings of a finished batch, returning (size of the next batch, reason of the decision).
+
+        `total` is the wall time of the batch, which is less than the sum of its phases when they overlapped.
+        """
+        if total is None:
+            total = sum(phase_times.values())
+        if num_blocks <= 0 or total <= 0:
+            return self.size, 'kept'
+
+        seconds_per_block = total / num_blocks
+        if self._seconds_per_block is None:
+            self._seconds_per_block = seconds_per_block
+        else:
+            self._seconds_per_block = (
+                self.smoothing * seconds_per_block + (1 - self.smoothing) * self._seconds_per_block
+            )
+
+        ideal = self.target_seconds / self._seconds_per_block
+        stepped = min(max(ideal, self.size / self.max_step), self.size * self.max_step)
+        size = self._clamp(stepped)
+
+        if size < self.size:
+            slowest = max(phase_times, key=phase_times.get)
+            reason = f'shrink ({slowest}={phase_times[slowest]:.3f}s)'
+        elif size > self.size:
+            reason = 'grow'
+        else:
+            reason = 'kept'
+
+        self.size = size
+        return size, reason
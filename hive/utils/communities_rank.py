@@ -4,3 +4,9 @@ from hive.conf import SCHEMA_NAME
 def update_communities_posts_and_rank(db):
     sql = f"SELECT {SCHEMA_NAME}.update_communities_posts_data_and_rank()"
     db.query_no_return(sql)
+
+
+def update_communities_rank(db):
+    """Rank communities by sums of unpaid posts maintained in live sync, without scanning the posts."""
+    sql = f"SELECT {SCHEMA_NAME}.update_communities_rank()"
+    db.query_no_return(sql)
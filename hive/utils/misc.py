@@ -54,6 +54,12 @@ def chunks(lst, n):
             yield lst[i : i + n]
 
 
+def id_ranges(first_id, last_id, size):
+    """Yield consecutive (first, last) inclusive ranges of at most `size` ids covering [first_id, last_id]."""
+    for start in range(first_id, last_id + 1, size):
+        yield start, min(start + size - 1, last_id)
+
+
 def get_memory_amount() -> float:
     """Returns memory amount in MB"""
     return round(psutil.virtual_memory().total / 1024.0 / 1024.0, 2)
@@ -10,14 +10,14 @@ log = logging.getLogger(__name__)
 class PayoutStats:
     @classmethod
     def generate(cls, db, separate_transaction: bool = False):
-        """Re-generate payout_stats_view."""
+        """Rebuild sums of payout_stats_view from all unpaid posts."""
 
-        log.warning(f"Rebuilding payout_stats_view{' in separate transaction' if separate_transaction else ''}")
+        log.warning(f"Rebuilding payout stats{' in separate transaction' if separate_transaction else ''}")
 
         if separate_transaction:
             db.query_no_return("START TRANSACTION")
 
-        db.query_no_return(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {SCHEMA_NAME}.payout_stats_view;")
+        db.query_no_return(f"SELECT {SCHEMA_NAME}.rebuild_payout_stats();")
 
         if separate_transaction:
             db.query_no_return("COMMIT")
@@ -0,0 +1,196 @@
+"""Dependency driven, concurrent execution of batch processing phases."""
+
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from time import perf_counter
+
+_current = threading.local()
+
+
+def current_phase():
+    """Phase run by the calling thread, None outside of PhaseScheduler."""
+    return getattr(_current, 'phase', None)
+
+
+class Phase:
+    """Named unit of work of a batch.
+
+    `after` names phases which have to finish first. `writes` names tables whose rows the phase updates;
+    phases writing the same table never run at the same time, so they can't deadlock on row locks taken
+    in different orders. The same holds for phases sharing the `db` connection. A disabled phase is
+    treated as finished immediately.
+
+    A long phase may report its `progress` as (done, total) units of work, which gives an estimate of
+    its remaining time.
+    """
+
+    __slots__ = ('name', 'run', 'after', 'writes', 'db', 'enabled', 'started', 'finished', 'progress')
+
+    def __init__(self, name, run, after=(), writes=(), db=None, enabled=True):
+        self.name = name
+        self.run = run
+        self.after = tuple(after)
+        self.writes = frozenset(writes)
+        self.db = db
+        self.enabled = enabled
+        self.started = None
+        self.finished = None
+        self.progress = None
+
+    @property
+    def duration(self):
+        return self.finished - self.started if self.finished is not None else 0.0
+
+    def report_progress(self, done, total):
+        self.progress = (done, total)
+
+    def eta(self, now):
+        """Estimated seconds until the phase finishes, None until it reported some progress."""
+        if self.progress is None or self.started is None or not self.progress[0]:
+            return None
+        done, total = self.progress
+        return (now - self.started) * (total - done) / done
+
+    def _run_in_thread(self):
+        _current.phase = self
+        try:
+            return self.run()
+        finally:
+            _current.phase = None
+
+    def conflicts_with(self, other):
+        if self.db is not None and self.db is other.db:
+            return True
+        return not self.writes.isdisjoint(other.writes)
+
+    def __repr__(self):
+        return f'Phase({self.name})'
+
+
+class PhaseScheduler:
+    """Runs phases as soon as their dependencies finished and none of the running phases conflicts with them.
+
+    Ready phases start in declaration order. When a phase fails, phases which are already running are awaited,
+    no new ones start and the error is raised.
+    """
+
+    def __init__(self, phases):
+        self.phases = list(phases)
+        names = [phase.name for phase in self.phases]
+        assert len(names) == len(set(names)), f'duplicated phase names: {names}'
+        for phase in self.phases:
+            unknown = set(phase.after) - set(names)
+            assert not unknown, f'phase {phase.name} depends on unknown phases: {sorted(unknown)}'
+        self.started = None
+        self.finished = None
+        self._running = {}
+        self._lock = threading.Lock()
+
+    def running(self):
+        """Phases being executed at the moment, safe to call from the phases themselves."""
+        with self._lock:
+            return list(self._running.values())
+
+    def run(self, report_interval=None, report=None):
+        """Execute all phases, returning {phase name: value returned by its `run`}.
+
+        With `report_interval`, `report(scheduler)` is called every that many seconds while phases are running.
+        """
+        results = {}
+        done = set()
+        pending = []
+        self.started = perf_counter()
+        for phase in self.phases:
+            if phase.enabled:
+                pending.append(phase)
+            else:
+                phase.started = phase.finished = self.started
+                done.add(phase.name)
+
+        running = self._running
+        error = None
+        last_report = self.started
+        with ThreadPoolExecutor(max_workers=max(len(pending), 1), thread_name_prefix='phase') as pool:
+            while pending or running:
+                if error is None:
+                    for phase in list(pending):
+                        if not all(dep in done for dep in phase.after):
+                            continue
+                        if any(phase.conflicts_with(other) for other in running.values()):
+                            continue
+                        pending.remove(phase)
+                        phase.started = perf_counter()
+                        with self._lock:
+                            running[pool.submit(phase._run_in_thread)] = phase  # pylint: disable=protected-access
+
+                if not running:
+                    if error is None:
+                        raise RuntimeError(f'phases can never start: {pending}')
+                    break
+
+                finished, _ = wait(running, timeout=report_interval, return_when=FIRST_COMPLETED)
+                if report is not None and report_interval and perf_counter() - last_report >= report_interval:
+                    last_report = perf_counter()
+                    report(self)
+                for future in finished:
+                    with self._lock:
+                        phase = running.pop(future)
+                    phase.finished = perf_counter()
+                    try:
+                        results[phase.name] = future.result()
+                    except Exception as ex:  # pylint: disable=broad-except
+                        if error is None:
+                            error = ex
+                    done.add(phase.name)
+
+        self.finished = perf_counter()
+        if error is not None:
+            raise error
+        return results
+
+    @property
+    def elapsed(self):
+        return self.finished - self.started if self.finished is not None else 0.0
+
+    def describe_progress(self):
+        """Summary of finished phases, and of elapsed time, progress and estimated remaining time of running ones."""
+        now = perf_counter()
+        enabled = [phase for phase in self.phases if phase.enabled]
+        finished = sum(1 for phase in enabled if phase.finished is not None)
+        parts = [f'{finished}/{len(enabled)} finished']
+        for phase in self.running():
+            part = f'{phase.name} running {now - phase.started:.0f}s'
+            if phase.progress is not None:
+                done, total = phase.progress
+                part += f' ({done}/{total}'
+                eta = phase.eta(now)
+                part += f', eta {eta:.0f}s)' if eta is not None else ')'
+            parts.append(part)
+        return ', '.join(parts)
+
+    def phase_times(self):
+        """Duration of every enabled phase, in declaration order."""
+        return {phase.name: phase.duration for phase in self.phases if phase.enabled and phase.finished is not None}
+
+    def critical_path(self):
+        """Chain of phases which determined the time of the whole run, from the first one to the last one.
+
+        Going back from the phase which finished last, the predecessor of a phase is the phase it waited for:
+        the latest finished one among its dependencies and the conflicting phases finished before it started.
+        """
+        ran = [phase for phase in self.phases if phase.enabled and phase.finished is not None]
+        if not ran:
+            return []
+        by_name = {phase.name: phase for phase in ran}
+
+        path = [max(ran, key=lambda phase: phase.finished)]
+        while True:
+            current = path[-1]
+            blockers = [by_name[name] for name in current.after if name in by_name]
+            blockers += [phase for phase in ran if phase is not current and phase.conflicts_with(current)]
+            blockers = [phase for phase in blockers if phase.finished <= current.started and phase not in path]
+            if not blockers:
+                break
+            path.append(max(blockers, key=lambda phase: phase.finished))
+        path.reverse()
+        return path
@@ -1,8 +1,13 @@
 """Methods for normalizing steemd post metadata."""
 # pylint: disable=line-too-long,too-many-lines
 
+import logging
 import re
 
+from diff_match_patch import diff_match_patch
+
+log = logging.getLogger(__name__)
+
 
 def mentions(body):
     """Given a post body, return proper @-mentioned account names."""
@@ -15,3 +20,28 @@ def mentions(body):
         '(?:^|[^a-zA-Z0-9_!#$%&*@\\/])' '(?:@)' '([a-zA-Z0-9][a-zA-Z0-9\\-.]{1,14}[a-zA-Z0-9])' '(?![a-z])', body
     )
     return {grp.lower() for grp in matches}
+
+
+def apply_body_patches(body, body_defs):
+    """Apply consecutive body definitions of one post to `body`, returning the body after each of them.
+
+    A definition is either a diff_match_patch patch of the previous body or a complete new body.
+    """
+    dmp = diff_match_patch()
+    bodies = []
+    for body_def in body_defs:
+        try:
+            patch = dmp.patch_fromText(body_def)
+            if patch:
+                body, _ = dmp.patch_apply(patch, body)
+            else:
+                body = body_def
+        except ValueError:
+            body = body_def
+        except Exception as ex:
+            log.info(f"Merging a body caused an unknown exception {ex}")
+            log.info(f"New body definition: {body_def}")
+            log.info(f"Old body definition: {body}")
+            body = body_def
+        bodies.append(body)
+    return bodies
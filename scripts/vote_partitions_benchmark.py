@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Measures throughput of massive sync vote processing split by post_id into a growing number of partitions
+(see `--vote-partitions`).
+
+Votes of the block range are staged and resolved once, then for every number of partitions N each of N
+connections applies its `post_id % N` share of the batch concurrently. Applied votes are rolled back, so the
+database is left unchanged, but staging tables are overwritten: don't run it while hivemind sync is running.
+
+Votes of an already synced range take the update path of the upsert, just like a replayed batch.
+
+Example:
+./vote_partitions_benchmark.py postgresql://hivemind@localhost/haf_block_log 60000000 60001000 --partitions 1 2 4 8
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+
+import psycopg2
+
+SCHEMA_NAME = 'hivemind_app'
+
+
+def apply_partitions(connections, partitions):
+    """Apply all partitions of the staged batch concurrently, returning (number of votes, seconds)."""
+
+    def apply(partition):
+        with connections[partition].cursor() as cur:
+            cur.execute(f"SELECT {SCHEMA_NAME}.apply_vote_batch(%s, %s)", (partition, partitions))
+            return cur.fetchone()[0]
+
+    start = perf_counter()
+    with ThreadPoolExecutor(max_workers=partitions) as pool:
+        count = sum(pool.map(apply, range(partitions)))
+    seconds = perf_counter() - start
+
+    for conn in connections[:partitions]:
+        conn.rollback()
+    return count, seconds
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("database_url", type=str, help="Url of the HAF database with hivemind installed")
+    parser.add_argument("from_block", type=int, help="First block of the measured batch")
+    parser.add_argument("to_block", type=int, help="Last block of the measured batch")
+    parser.add_argument("--partitions", type=int, nargs='+', default=[1, 2, 4, 8], help="Numbers of partitions")
+    parser.add_argument("--repeat", type=int, default=3, help="Measurements per number of partitions, best is shown")
+
+    args = parser.parse_args()
+
+    connections = [
+        psycopg2.connect(args.database_url, application_name=f'hivemind_vote_benchmark_{k}')
+        for k in range(max(args.partitions))
+    ]
+
+    with connections[0].cursor() as cur:
+        cur.execute(f"SELECT {SCHEMA_NAME}.load_ops_staging(%s, %s)", (args.from_block, args.to_block))
+        cur.execute(f"SELECT {SCHEMA_NAME}.prepare_vote_batch_from_staging()")
+        staged = cur.fetchone()[0]
+    connections[0].commit()
+    print(f"Blocks {args.from_block}-{args.to_block}: {staged} votes staged")
+
+    baseline = None
+    print(f"{'partitions':>10} {'seconds':>10} {'votes/s':>12} {'speedup':>8}")
+    for partitions in args.partitions:
+        count, seconds = min(
+            (apply_partitions(connections, partitions) for _ in range(args.repeat)), key=lambda result: result[1]
+        )
+        baseline = baseline or seconds
+        print(f"{partitions:>10} {seconds:>10.3f} {count / seconds:>12.0f} {baseline / seconds:>8.2f}")
+
+    for conn in connections:
+        conn.close()
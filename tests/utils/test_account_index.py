@@ -0,0 +1,89 @@
+"""Tests for hive.utils.account_index.AccountIndex."""
+
+import pytest
+
+from hive.utils.account_index import AccountIndex, open_account_index, write_account_index
+
+ACCOUNTS = [('alice', 3), ('bob', 1), ('bob.x', 7), ('bobby', 2), ('zażółć', 9)]
+
+
+def _sorted_accounts():
+    return sorted(ACCOUNTS, key=lambda pair: pair[0].encode())
+
+
+def _index():
+    return AccountIndex.from_sorted(_sorted_accounts())
+
+
+def test_lookup():
+    index = _index()
+    for name, _id in ACCOUNTS:
+        assert index.get(name) == _id
+        assert index[name] == _id
+        assert name in index
+    assert len(index) == len(ACCOUNTS)
+    assert index.max_id() == 9
+
+
+def test_missing_names():
+    index = _index()
+    for name in ('', 'a', 'alicea', 'bo', 'bobb', 'zzz', 'bob '):
+        assert index.get(name) is None
+        assert index.get(name, -1) == -1
+        assert name not in index
+        with pytest.raises(KeyError):
+            index[name]  # pylint: disable=pointless-statement
+    assert None not in index
+
+
+def test_empty():
+    index = AccountIndex()
+    assert not index
+    assert index.get('alice') is None
+    assert 'alice' not in index
+    assert index.max_id() == 0
+
+
+def test_unsorted_input():
+    with pytest.raises(AssertionError):
+        AccountIndex.from_sorted([('bob', 1), ('alice', 2)])
+
+
+def test_items():
+    assert list(_index().items()) == _sorted_accounts()
+
+
+def test_persisted_index(tmp_path):
+    path = tmp_path / 'account_ids'
+    write_account_index(path, iter(_sorted_accounts()), 1234)
+
+    index, info = open_account_index(path)
+    assert info.last_completed_block == 1234
+    assert info.max_id == 9
+    assert info.max_name == 'zażółć'
+    assert list(index.items()) == _sorted_accounts()
+    for name, _id in ACCOUNTS:
+        assert index.get(name) == _id
+    assert index.get('bobb') is None
+    assert index.max_id() == 9
+
+
+def test_persisted_empty_index(tmp_path):
+    path = tmp_path / 'account_ids'
+    write_account_index(path, [], 0)
+    index, info = open_account_index(path)
+    assert not index
+    assert index.get('alice') is None
+    assert info.max_id == 0
+
+
+def test_invalid_persisted_index(tmp_path):
+    assert open_account_index(tmp_path / 'missing') is None
+
+    path = tmp_path / 'account_ids'
+    path.write_bytes(b'garbage')
+    assert open_account_index(path) is None
+
+    write_account_index(path, _sorted_accounts(), 1)
+    path.write_bytes(path.read_bytes()[:-1])
+    assert open_account_index(path) is None
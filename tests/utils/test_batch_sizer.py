@@ -0,0 +1,35 @@
+"""Tests for hive.utils.batch_sizer.AdaptiveBatchSize."""
+
+from hive.utils.batch_sizer import AdaptiveBatchSize
+
+
+def test_shrinks_on_slow_batch():
+    sizer = AdaptiveBatchSize(target_seconds=10, initial_size=1000)
+    size, reason = sizer.update(1000, {'posts': 30.0, 'flush': 5.0})
+    # limited to halving in a single step
+    assert size == 500
+    assert reason == 'shrink (posts=30.000s)'
+
+
+def test_grows_on_sparse_blocks():
+    sizer = AdaptiveBatchSize(target_seconds=10, initial_size=1000, max_size=5000)
+    assert sizer.update(1000, {'posts': 1.0}) == (2000, 'grow')
+    assert sizer.update(2000, {'posts': 1.0}) == (4000, 'grow')
+    assert sizer.update(4000, {'posts': 1.0}) == (5000, 'grow')
+    assert sizer.update(5000, {'posts': 1.0}) == (5000, 'kept')
+
+
+def test_converges_to_target():
+    sizer = AdaptiveBatchSize(target_seconds=10, initial_size=1000)
+    for _ in range(20):
+        size, _ = sizer.update(sizer.size, {'posts': sizer.size * 0.004})
+    assert size == 2500
+
+
+def test_bounds_and_empty_batches():
+    sizer = AdaptiveBatchSize(target_seconds=1, initial_size=50000, min_size=100, max_size=10000)
+    assert sizer.size == 10000
+    assert sizer.update(0, {'posts': 1.0}) == (10000, 'kept')
+    for _ in range(20):
+        sizer.update(sizer.size, {'posts': 1000.0})
+    assert sizer.size == 100
@@ -0,0 +1,77 @@
+"""Tests for hive.db.binary_copy encoding and streaming."""
+
+import struct
+
+from hive.db.binary_copy import ChunkStream, binary_copy_chunks
+
+HEADER = b'PGCOPY\n\xff\r\n\x00' + struct.pack('!ii', 0, 0)
+TRAILER = struct.pack('!h', -1)
+
+
+def test_empty_input_has_header_and_trailer():
+    data = b''.join(binary_copy_chunks([], ('int4', 'text')))
+    assert data == HEADER + TRAILER
+
+
+def test_row_encoding():
+    data = b''.join(binary_copy_chunks([(7, True, 'ab', None)], ('int4', 'bool', 'text', 'text')))
+    expected = (
+        HEADER
+        + struct.pack('!h', 4)
+        + struct.pack('!ii', 4, 7)
+        + struct.pack('!i', 1)
+        + b'\x01'
+        + struct.pack('!i', 2)
+        + b'ab'
+        + struct.pack('!i', -1)
+        + TRAILER
+    )
+    assert data == expected
+
+
+def test_text_is_utf8_length_prefixed():
+    data = b''.join(binary_copy_chunks([('zażółć',)], ('text',)))
+    encoded = 'zażółć'.encode()
+    assert struct.pack('!i', len(encoded)) + encoded in data
+
+
+def test_chunks_are_bounded():
+    rows = [(i, 'x' * 100) for i in range(1000)]
+    chunks = list(binary_copy_chunks(rows, ('int4', 'text'), chunk_size=1024))
+    assert len(chunks) > 1
+    # every chunk except the last one is flushed as soon as it exceeds the limit by at most one row
+    assert all(len(chunk) < 1024 + 200 for chunk in chunks)
+    assert b''.join(chunks) == b''.join(binary_copy_chunks(rows, ('int4', 'text')))
+
+
+def test_rows_are_consumed_lazily():
+    consumed = []
+
+    def rows():
+        for i in range(100):
+            consumed.append(i)
+            yield (i,)
+
+    chunks = binary_copy_chunks(rows(), ('int4',), chunk_size=64)
+    next(chunks)
+    assert len(consumed) < 100
+
+
+def test_chunk_stream_reads_all_data():
+    chunks = [b'abc', b'defgh', b'i']
+    stream = ChunkStream(chunks)
+    parts = []
+    while True:
+        part = stream.read(2)
+        if not part:
+            break
+        parts.append(part)
+    assert b''.join(parts) == b'abcdefghi'
+    assert all(len(part) <= 2 for part in parts)
+
+
+def test_chunk_stream_read_all():
+    stream = ChunkStream([b'ab', b'cd'])
+    assert stream.read(1) == b'a'
+    assert stream.read() == b'bcd'
+    assert stream.read() == b''
@@ -0,0 +1,120 @@
+"""Tests for hive.db.block_listener."""
+
+import psycopg2
+import pytest
+
+from hive.db import block_listener
+from hive.db.block_listener import CHANNEL, BlockListener
+
+
+class _FakeCursor:
+    def __init__(self, conn):
+        self._conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def execute(self, sql):
+        self._conn.executed.append(sql)
+
+
+class _FakeConnection:
+    def __init__(self):
+        self.autocommit = False
+        self.notifies = []
+        self.executed = []
+        self.closed = False
+        self.lost = False
+
+    def cursor(self):
+        return _FakeCursor(self)
+
+    def poll(self):
+        if self.lost:
+            raise psycopg2.OperationalError('server closed the connection unexpectedly')
+
+    def fileno(self):
+        return 0
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    connections = []
+    selects = []
+    sleeps = []
+
+    def connect(url, application_name):
+        connections.append(_FakeConnection())
+        return connections[-1]
+
+    monkeypatch.setattr(block_listener.psycopg2, 'connect', connect)
+    monkeypatch.setattr(block_listener.select, 'select', lambda r, w, x, timeout: selects.append(timeout))
+    monkeypatch.setattr(block_listener.time, 'sleep', sleeps.append)
+    return connections, selects, sleeps
+
+
+def test_wait_returns_queued_notification_without_waiting(fake_db):
+    connections, selects, _ = fake_db
+    listener = BlockListener('postgresql://', 3.0)
+    listener.open()
+    assert connections[0].executed == [f'LISTEN {CHANNEL}'] and connections[0].autocommit
+
+    connections[0].notifies.append('block')
+    assert listener.wait()
+    assert not selects
+    assert not connections[0].notifies
+
+
+def test_wait_times_out_without_notification(fake_db):
+    _, selects, sleeps = fake_db
+    listener = BlockListener('postgresql://', 3.0)
+    listener.open()
+
+    assert not listener.wait()
+    assert selects == [3.0]
+    assert not sleeps
+
+
+def test_wait_reconnects_after_connection_is_lost(fake_db, monkeypatch):
+    connections, _, sleeps = fake_db
+    listener = BlockListener('postgresql://', 3.0)
+    listener.open()
+    connections[0].lost = True
+
+    assert not listener.wait()
+    assert sleeps == [3.0]
+    assert connections[0].closed and listener.is_open
+
+    def connect_and_notify(url, application_name):
+        connections.append(_FakeConnection())
+        connections[-1].notifies.append('block')
+        return connections[-1]
+
+    monkeypatch.setattr(block_listener.psycopg2, 'connect', connect_and_notify)
+    assert listener.wait()
+    assert connections[1].executed == [f'LISTEN {CHANNEL}']
+
+    listener.close()
+    assert connections[1].closed and not listener.is_open
+
+
+def test_wait_sleeps_through_timeout_while_reconnecting_fails(fake_db, monkeypatch):
+    connections, _, sleeps = fake_db
+    listener = BlockListener('postgresql://', 3.0)
+    listener.open()
+    connections[0].lost = True
+    assert not listener.wait()
+
+    def refuse(url, application_name):
+        raise psycopg2.OperationalError('connection refused')
+
+    monkeypatch.setattr(block_listener.psycopg2, 'connect', refuse)
+    assert not listener.wait()
+    assert sleeps == [3.0, 3.0]
+    assert listener.is_open
@@ -0,0 +1,98 @@
+# pylint: disable=missing-docstring
+"""Equivalence of the Python and the server-side (plpython3u) post body merging over mock comment operations."""
+
+import json
+import re
+from pathlib import Path
+
+import pytest
+from diff_match_patch import diff_match_patch
+
+from hive.indexer.post_data_cache import PostDataCache
+from hive.indexer.posts import Posts
+from hive.utils.post import apply_body_patches
+
+ROOT = Path(__file__).parent.parent.parent
+MOCK_COMMENTS = ROOT / 'mock_data' / 'block_data' / 'comment_op' / 'mock_block_data_comments.json'
+SQL_SCRIPT = ROOT / 'hive' / 'db' / 'sql_scripts' / 'post_body_patches.sql'
+
+
+def _load_sql_engine():
+    """Build a Python function out of the body of hivemind_app.apply_body_patches plpython3u function."""
+    source = re.search(r'AS \$\$\n(.*?)\$\$;', SQL_SCRIPT.read_text(), re.DOTALL).group(1)
+    body = ''.join(f'    {line}\n' for line in source.splitlines())
+    namespace = {}
+    exec(f'def apply_body_patches_sql(_body, _body_defs):\n{body}', namespace)  # pylint: disable=exec-used
+    return namespace['apply_body_patches_sql']
+
+
+apply_body_patches_sql = _load_sql_engine()
+
+
+def _mock_comment_bodies():
+    blocks = json.loads(MOCK_COMMENTS.read_text())
+    bodies = []
+    for block_num in sorted(blocks, key=int):
+        for trx in blocks[block_num]['transactions']:
+            for op in trx['operations']:
+                if op['type'] == 'comment_operation':
+                    bodies.append(op['value']['body'])
+    return bodies
+
+
+def _edit_chains(body):
+    """Sequences of body definitions applied to a post originally created with `body`."""
+    dmp = diff_match_patch()
+    v2 = body + '\n\nEdit: thanks @gtg for testing'
+    v3 = 'Much more ' + v2.replace('testing', 'reviewing')
+
+    def patch(old, new):
+        return dmp.patch_toText(dmp.patch_make(old, new))
+
+    return [
+        [patch(body, v2)],
+        [patch(body, v2), patch(v2, v3)],
+        ['completely new body', patch('completely new body', 'completely newer body')],
+        [patch(body, v2), 'plain replacement', patch(v2, v3)],
+        ['@@ -x +y @@\n'],
+        [patch(body, body.replace(body[:3], 'Z\x00Z'))],
+    ]
+
+
+def _python_engine(created_body, body_defs):
+    """Reference: sequential merging through Posts._merge_post_body and PostDataCache, as in massive sync."""
+    post_id = 1
+    PostDataCache.add_data(post_id, dict(title='', body=created_body, json='', is_root='true'), True)
+    for body_def in body_defs:
+        new_body = Posts._merge_post_body(id=post_id, new_body_def=body_def)  # pylint: disable=protected-access
+        PostDataCache.add_data(post_id, dict(title=None, body=new_body, json=None, is_root='false'), False)
+    body = PostDataCache._data[post_id]['body']  # pylint: disable=protected-access
+    return body.replace('\x00', ' ')
+
+
+@pytest.fixture(autouse=True)
+def _clean_post_data_cache():
+    PostDataCache._data.clear()  # pylint: disable=protected-access
+    PostDataCache._data_bytes = 0  # pylint: disable=protected-access
+    yield
+    PostDataCache._data.clear()  # pylint: disable=protected-access
+    PostDataCache._data_bytes = 0  # pylint: disable=protected-access
+
+
+def test_mock_data_has_comments():
+    assert _mock_comment_bodies()
+
+
+@pytest.mark.parametrize('body', _mock_comment_bodies())
+def test_engines_are_equivalent(body):
+    for body_defs in _edit_chains(body):
+        PostDataCache._data.clear()  # pylint: disable=protected-access
+        expected = _python_engine(body, body_defs)
+        assert apply_body_patches_sql(body, body_defs) == expected
+        assert apply_body_patches(body, body_defs)[-1].replace('\x00', ' ') == expected
+
+
+def test_sql_engine_without_stored_body():
+    patch = diff_match_patch().patch_toText(diff_match_patch().patch_make('a', 'b'))
+    assert apply_body_patches_sql(None, [patch]) == patch
+    assert apply_body_patches_sql(None, []) is None
@@ -0,0 +1,121 @@
+"""Tests for hive.db.chunked_task."""
+
+import threading
+import time
+
+import pytest
+
+from hive.db.chunked_task import ChunkedTask
+
+SQL = 'SELECT process_range(:first_id, :last_id)'
+
+
+class _FakeDb:
+    """Records queries of all connections and keeps committed checkpoints like _finalize_checkpoints would."""
+
+    def __init__(self, fail_range=None):
+        self.queries = []
+        self.ranges = []  # ranges committed by the task sql
+        self.checkpoints = {}  # (task, first_id) -> (run_block, last_id)
+        self.fail_range = fail_range
+        self.failed = threading.Event()
+        self._lock = threading.Lock()
+
+    def clone(self, name):
+        return _FakeConnection(self)
+
+
+class _FakeConnection:
+    def __init__(self, db):
+        self._db = db
+        self._range = None
+        self._checkpoint = None
+
+    def query_no_return(self, sql, **kwargs):
+        db = self._db
+        with db._lock:
+            db.queries.append((sql, kwargs))
+        if sql == SQL:
+            self._range = (kwargs['first_id'], kwargs['last_id'])
+            if self._range == db.fail_range:
+                raise RuntimeError('range failed')
+            if db.fail_range is not None:
+                # let the failing worker stop the task before this range is done
+                db.failed.wait(1)
+                time.sleep(0.1)
+        elif sql.startswith('INSERT INTO'):
+            self._checkpoint = ((kwargs['task'], kwargs['first_id']), (kwargs['run_block'], kwargs['last_id']))
+        elif sql == 'COMMIT':
+            with db._lock:
+                db.ranges.append(self._range)
+                db.checkpoints.__setitem__(*self._checkpoint)
+        elif sql == 'ROLLBACK':
+            db.failed.set()
+        elif sql.startswith('DELETE'):
+            with db._lock:
+                for key, (run_block, _) in list(db.checkpoints.items()):
+                    if key[0] == kwargs['task'] and ('run_block' not in kwargs or run_block != kwargs['run_block']):
+                        del db.checkpoints[key]
+
+    def query_all(self, sql, **kwargs):
+        return [
+            (first_id, last_id)
+            for (task, first_id), (run_block, last_id) in self._db.checkpoints.items()
+            if task == kwargs['task'] and run_block == kwargs['run_block']
+        ]
+
+    def close(self):
+        pass
+
+
+def test_pending_ranges_skip_checkpoints_of_same_run():
+    db = _FakeDb()
+    db.checkpoints = {('task', 1): (100, 10), ('task', 21): (100, 30), ('other', 11): (100, 20)}
+    task = ChunkedTask(db, 'task', SQL, 10, 2, 100)
+
+    assert task.pending_ranges(db.clone('task'), 1, 35) == [(11, 20), (31, 35)]
+    assert ('other', 11) in db.checkpoints
+
+
+def test_pending_ranges_drop_checkpoints_of_other_run():
+    db = _FakeDb()
+    db.checkpoints = {('task', 1): (90, 10), ('task', 11): (100, 20)}
+    task = ChunkedTask(db, 'task', SQL, 10, 2, 100)
+
+    assert task.pending_ranges(db.clone('task'), 1, 30) == [(1, 10), (21, 30)]
+    assert db.checkpoints == {('task', 11): (100, 20)}
+
+
+def test_run_processes_all_ranges_and_deletes_checkpoints():
+    db = _FakeDb()
+    ChunkedTask(db, 'task', SQL, 10, 3, 100).run(1, 45)
+
+    assert sorted(db.ranges) == [(1, 10), (11, 20), (21, 30), (31, 40), (41, 45)]
+    assert not db.checkpoints
+
+
+def test_run_stops_other_workers_after_failure_and_resumes_remaining_ranges():
+    db = _FakeDb(fail_range=(1, 10))
+    with pytest.raises(RuntimeError):
+        ChunkedTask(db, 'task', SQL, 10, 2, 100).run(1, 100)
+
+    assert (1, 10) not in db.ranges
+    assert len(db.ranges) <= 1  # the range other worker was processing when the first one failed
+    assert set(db.checkpoints) == {('task', first_id) for first_id, _ in db.ranges}
+    done = list(db.ranges)
+
+    db.fail_range = None
+    db.ranges = []
+    ChunkedTask(db, 'task', SQL, 10, 2, 100).run(1, 100)
+
+    assert sorted(db.ranges + done) == [(first_id, first_id + 9) for first_id in range(1, 100, 10)]
+    assert not db.checkpoints
+
+
+def test_run_with_checkpoints_of_interrupted_run_processes_only_remaining_ranges():
+    db = _FakeDb()
+    db.checkpoints = {('task', 1): (100, 10), ('task', 21): (100, 30)}
+    ChunkedTask(db, 'task', SQL, 10, 2, 100).run(1, 40)
+
+    assert sorted(db.ranges) == [(11, 20), (31, 40)]
+    assert not db.checkpoints
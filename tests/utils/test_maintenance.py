@@ -0,0 +1,71 @@
+"""Tests for hive.indexer.maintenance."""
+
+import threading
+
+from hive.indexer.maintenance import MaintenanceJob, MaintenanceWorker
+
+
+class _FakeDb:
+    def __init__(self):
+        self.queries = []
+        self.closed = False
+
+    def clone(self, name):
+        return self
+
+    def query_no_return(self, sql, **kwargs):
+        self.queries.append(sql)
+
+    def close(self):
+        self.closed = True
+
+
+def test_job_is_due_when_range_contains_multiple_of_interval():
+    job = MaintenanceJob('rank', 200, None)
+    assert job.is_due(200, 200)
+    assert job.is_due(199, 201)
+    assert not job.is_due(201, 399)
+    assert job.is_due(201, 400)
+
+
+def test_worker_runs_due_jobs_in_own_transactions():
+    done = threading.Event()
+    runs = []
+
+    def run(name):
+        def job(db):
+            runs.append(name)
+            if name == 'stats':
+                done.set()
+
+        return job
+
+    db = _FakeDb()
+    worker = MaintenanceWorker(
+        db, jobs=[MaintenanceJob('rank', 200, run('rank')), MaintenanceJob('stats', 1200, run('stats'))]
+    )
+    worker.start()
+    worker.blocks_processed(1199, 1199)
+    worker.blocks_processed(1200, 1200)
+    assert done.wait(5)
+    worker.stop()
+    assert runs == ['rank', 'stats']
+    assert db.queries.count('START TRANSACTION') == db.queries.count('COMMIT') == len(runs)
+    assert db.closed and not worker.is_running
+
+
+def test_failed_job_does_not_stop_worker():
+    done = threading.Event()
+
+    def broken(db):
+        raise ValueError('broken job')
+
+    db = _FakeDb()
+    worker = MaintenanceWorker(
+        db, jobs=[MaintenanceJob('broken', 10, broken), MaintenanceJob('rank', 20, lambda db: done.set())]
+    )
+    worker.start()
+    worker.blocks_processed(20, 20)
+    assert done.wait(5)
+    worker.stop()
+    assert 'ROLLBACK' in db.queries
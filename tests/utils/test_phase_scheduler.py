@@ -0,0 +1,161 @@
+"""Tests for hive.utils.phase_scheduler."""
+
+import threading
+from time import sleep
+
+import pytest
+
+from hive.utils.phase_scheduler import Phase, PhaseScheduler, current_phase
+
+
+class _Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.events = []
+        self.running = set()
+        self.overlaps = set()
+
+    def phase(self, name, seconds=0.02, result=None):
+        def run():
+            with self.lock:
+                self.overlaps.update(frozenset((name, other)) for other in self.running)
+                self.running.add(name)
+                self.events.append(('start', name))
+            sleep(seconds)
+            with self.lock:
+                self.running.discard(name)
+                self.events.append(('end', name))
+            return result
+
+        return run
+
+    def order(self, name, event):
+        return self.events.index((event, name))
+
+
+def test_dependencies_are_respected():
+    rec = _Recorder()
+    scheduler = PhaseScheduler(
+        [
+            Phase('load', rec.phase('load')),
+            Phase('posts', rec.phase('posts', result=[1, 2]), after=['load']),
+            Phase('votes', rec.phase('votes'), after=['posts']),
+        ]
+    )
+    results = scheduler.run()
+    assert results['posts'] == [1, 2]
+    assert rec.order('load', 'end') < rec.order('posts', 'start')
+    assert rec.order('posts', 'end') < rec.order('votes', 'start')
+    assert not rec.overlaps
+
+
+def test_independent_phases_overlap():
+    rec = _Recorder()
+    scheduler = PhaseScheduler(
+        [
+            Phase('load', rec.phase('load')),
+            Phase('reblogs', rec.phase('reblogs', 0.1), after=['load'], writes=['hive_reblogs']),
+            Phase('follows', rec.phase('follows', 0.1), after=['load'], writes=['hive_follows']),
+        ]
+    )
+    scheduler.run()
+    assert frozenset(('reblogs', 'follows')) in rec.overlaps
+    assert scheduler.elapsed < sum(scheduler.phase_times().values())
+
+
+def test_conflicting_writes_and_connections_are_serialized():
+    rec = _Recorder()
+    db = object()
+    scheduler = PhaseScheduler(
+        [
+            Phase('follows', rec.phase('follows', 0.05), writes=['hive_accounts', 'hive_follows']),
+            Phase('account_updates', rec.phase('account_updates', 0.05), writes=['hive_accounts']),
+            Phase('community_post', rec.phase('community_post', 0.05), db=db),
+            Phase('rshares_incr', rec.phase('rshares_incr', 0.05), db=db),
+        ]
+    )
+    scheduler.run()
+    assert frozenset(('follows', 'account_updates')) not in rec.overlaps
+    assert frozenset(('community_post', 'rshares_incr')) not in rec.overlaps
+    assert frozenset(('follows', 'community_post')) in rec.overlaps
+
+
+def test_disabled_phase_counts_as_finished():
+    rec = _Recorder()
+    scheduler = PhaseScheduler(
+        [
+            Phase('rshares_incr', rec.phase('rshares_incr'), enabled=False),
+            Phase('payouts', rec.phase('payouts'), after=['rshares_incr']),
+        ]
+    )
+    scheduler.run()
+    assert ('start', 'rshares_incr') not in rec.events
+    assert list(scheduler.phase_times()) == ['payouts']
+
+
+def test_failure_stops_scheduling_and_is_raised():
+    rec = _Recorder()
+
+    def fail():
+        raise ValueError('broken phase')
+
+    scheduler = PhaseScheduler(
+        [
+            Phase('load', fail),
+            Phase('slow', rec.phase('slow', 0.05)),
+            Phase('posts', rec.phase('posts'), after=['load']),
+        ]
+    )
+    with pytest.raises(ValueError, match='broken phase'):
+        scheduler.run()
+    assert ('end', 'slow') in rec.events
+    assert ('start', 'posts') not in rec.events
+
+
+def test_unknown_dependency_is_rejected():
+    with pytest.raises(AssertionError):
+        PhaseScheduler([Phase('posts', lambda: None, after=['load'])])
+
+
+def test_critical_path_follows_waits():
+    rec = _Recorder()
+    scheduler = PhaseScheduler(
+        [
+            Phase('load', rec.phase('load', 0.01)),
+            Phase('posts', rec.phase('posts', 0.05), after=['load'], writes=['hive_posts']),
+            Phase('follows', rec.phase('follows', 0.01), after=['load']),
+            Phase('votes', rec.phase('votes', 0.01), after=['posts']),
+            Phase('payouts', rec.phase('payouts', 0.01), after=['load'], writes=['hive_posts']),
+        ]
+    )
+    scheduler.run()
+    names = [phase.name for phase in scheduler.critical_path()]
+    assert names[0] == 'load'
+    assert names[1] == 'posts'
+    assert names[-1] in ('votes', 'payouts')
+    assert 'follows' not in names
+
+
+def test_progress_is_reported_by_running_phase():
+    reports = []
+
+    def chunked():
+        phase = current_phase()
+        for done in range(1, 5):
+            sleep(0.02)
+            phase.report_progress(done, 4)
+
+    scheduler = PhaseScheduler([Phase('rshares', chunked), Phase('feed', lambda: sleep(0.01))])
+    scheduler.run(report_interval=0.03, report=lambda s: reports.append(s.describe_progress()))
+    assert reports
+    assert any('rshares running' in report and '/4' in report for report in reports)
+    assert scheduler.phases[0].progress == (4, 4)
+    assert current_phase() is None
+
+
+def test_eta_of_phase():
+    phase = Phase('rshares', lambda: None)
+    phase.started = 10.0
+    assert phase.eta(20.0) is None
+    phase.report_progress(1, 4)
+    assert phase.eta(20.0) == pytest.approx(30.0)
@@ -0,0 +1,112 @@
+"""Tests for hive.indexer.post_data_cache."""
+
+import sys
+from collections import OrderedDict
+
+import pytest
+
+from hive.indexer.post_data_cache import PostDataCache
+
+MB = 1024 * 1024
+
+
+@pytest.fixture(autouse=True)
+def cache(monkeypatch):
+    """Fresh class state of the cache, with flush only clearing the batch data."""
+    monkeypatch.setattr(PostDataCache, '_data', {})
+    monkeypatch.setattr(PostDataCache, '_data_bytes', 0)
+    monkeypatch.setattr(PostDataCache, '_max_bytes', None)
+    monkeypatch.setattr(PostDataCache, '_flushed_bodies', OrderedDict())
+    monkeypatch.setattr(PostDataCache, '_flushed_bodies_bytes', 0)
+    monkeypatch.setattr(PostDataCache, '_flushed_bodies_max_bytes', 0)
+    monkeypatch.setattr(PostDataCache, '_prefetched_bodies', {})
+    monkeypatch.setattr(PostDataCache, '_lru_hits', 0)
+    monkeypatch.setattr(PostDataCache, '_prefetch_hits', 0)
+    monkeypatch.setattr(PostDataCache, '_misses', 0)
+    monkeypatch.setattr(PostDataCache, '_spills', 0)
+
+    flushed = []
+
+    def flush(print_query=False):
+        flushed.append(sorted(PostDataCache._data))
+        PostDataCache._remember_flushed_bodies()
+        PostDataCache._data.clear()
+        PostDataCache._data_bytes = 0
+
+    monkeypatch.setattr(PostDataCache, 'flush', flush)
+    return flushed
+
+
+def _post(body):
+    return {'title': None, 'body': body, 'json': None}
+
+
+def _flush_bodies(bodies):
+    for pid, body in bodies.items():
+        PostDataCache.add_data(pid, _post(body), is_new_post=True)
+    PostDataCache.flush()
+
+
+def test_flushed_bodies_are_evicted_oldest_first_above_limit():
+    PostDataCache.configure(0, 1)
+    body = 'x' * (400 * 1024)
+
+    _flush_bodies({1: body, 2: body})
+    assert list(PostDataCache._flushed_bodies) == [1, 2]
+
+    _flush_bodies({3: body})
+    assert list(PostDataCache._flushed_bodies) == [2, 3]
+    assert PostDataCache._flushed_bodies_bytes == 2 * sys.getsizeof(body)
+    assert PostDataCache._flushed_bodies_bytes <= PostDataCache._flushed_bodies_max_bytes
+
+
+def test_hit_promotes_flushed_body():
+    PostDataCache.configure(0, 1)
+    body = 'x' * (400 * 1024)
+    _flush_bodies({1: body, 2: body})
+
+    assert PostDataCache.get_post_body(1) is body
+    assert PostDataCache._lru_hits == 1
+    assert list(PostDataCache._flushed_bodies) == [2, 1]
+
+    _flush_bodies({3: body})
+    assert list(PostDataCache._flushed_bodies) == [1, 3]
+
+
+def test_prefetched_body_is_not_counted_as_miss():
+    PostDataCache._prefetched_bodies = {1: 'body'}
+
+    assert PostDataCache.get_post_body(1) == 'body'
+    assert PostDataCache._prefetch_hits == 1
+    assert PostDataCache._misses == 0
+
+
+def test_flushed_bodies_bytes_return_to_zero_after_eviction():
+    PostDataCache.configure(0, 1)
+    _flush_bodies({1: 'a' * 1000, 2: 'b' * 2000})
+    _flush_bodies({2: 'c' * 3000})
+    assert PostDataCache._flushed_bodies_bytes == sys.getsizeof('a' * 1000) + sys.getsizeof('c' * 3000)
+
+    PostDataCache.configure(0, 0)
+    assert not PostDataCache._flushed_bodies
+    assert PostDataCache._flushed_bodies_bytes == 0
+
+
+def test_cache_spills_above_max_mb(cache):
+    PostDataCache.configure(1, 0)
+    body = 'x' * (MB // 2)
+
+    PostDataCache.add_data(1, _post(body), is_new_post=True)
+    assert not cache and PostDataCache._spills == 0
+
+    PostDataCache.add_data(2, _post(body), is_new_post=True)
+    assert cache == [[1, 2]]
+    assert PostDataCache._spills == 1
+    assert not PostDataCache._data and PostDataCache._data_bytes == 0
+    assert not PostDataCache._flushed_bodies
+
+
+def test_cache_does_not_spill_without_max_mb(cache):
+    PostDataCache.configure(0, 0)
+    PostDataCache.add_data(1, _post('x' * 2 * MB), is_new_post=True)
+    assert not cache and PostDataCache._spills == 0
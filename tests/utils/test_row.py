@@ -89,3 +89,28 @@ def test_nested_list_in_data():
     r2 = Row(('alice', [1, 2, 3]), ('name', 'tags'))
     assert r == r2
     assert len({r, r2}) == 1
+
+
+def test_named_access():
+    r = Row(('alice', 1), ('name', 'id'))
+    assert r['name'] == 'alice'
+    assert r['id'] == 1
+    assert r[1] == 1
+    assert list(r) == ['alice', 1]
+    assert len(r) == 2
+
+
+def test_mapping_view():
+    r = Row(('alice', 1), ('name', 'id'))
+    assert r._mapping['id'] == 1
+    assert dict(r._mapping) == {'name': 'alice', 'id': 1}
+    assert list(r._mapping) == ['name', 'id']
+    assert {**r._mapping} == {'name': 'alice', 'id': 1}
+
+
+def test_rows_share_column_map_and_keep_data():
+    data = ('alice', 1)
+    r1 = Row(data, ('name', 'id'))
+    r2 = Row(('bob', 2), ['name', 'id'])
+    assert r1._columns is r2._columns
+    assert r1._data is data
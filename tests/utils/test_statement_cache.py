@@ -0,0 +1,37 @@
+"""Tests for statement preparation helpers of hive.db.adapter."""
+
+from hive.db.adapter import _convert_named_params, _parametrize_literals
+
+
+def test_convert_named_params():
+    assert _convert_named_params('SELECT :a, :b_2::int') == 'SELECT %(a)s, %(b_2)s::int'
+    assert _convert_named_params("SELECT '1'::TEXT") == "SELECT '1'::TEXT"
+
+
+def test_parametrize_function_call():
+    template, values = _parametrize_literals('SELECT hivemind_app.process_votes_from_staging(5000000)')
+    assert template == 'SELECT hivemind_app.process_votes_from_staging($1::INT)'
+    assert values == [5000000]
+
+
+def test_parametrize_same_template_for_different_blocks():
+    sql = 'SELECT * FROM hivemind_app.process_follows_for_blocks({}, {})'
+    first = _parametrize_literals(sql.format(1, 100))
+    second = _parametrize_literals(sql.format(101, 200))
+    assert first[0] == second[0] == 'SELECT * FROM hivemind_app.process_follows_for_blocks($1::INT, $2::INT)'
+    assert first[1] == [1, 100]
+    assert second[1] == [101, 200]
+
+
+def test_parametrize_keeps_other_arguments():
+    template, values = _parametrize_literals('SELECT f(NULL, -3, TRUE, 1.5, 3000000000);')
+    assert template == 'SELECT f(NULL, -$1::INT, TRUE, 1.5, $2::BIGINT)'
+    assert values == [3, 3000000000]
+
+
+def test_not_preparable():
+    assert _parametrize_literals("SELECT f('text')") is None
+    assert _parametrize_literals('SELECT f(:post_ids)') is None
+    assert _parametrize_literals('SELECT f(g(1))') is None
+    assert _parametrize_literals('SELECT a FROM t WHERE b = 1') is None
+    assert _parametrize_literals('START TRANSACTION') is None
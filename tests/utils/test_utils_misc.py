@@ -0,0 +1,12 @@
+# pylint: disable=missing-docstring
+from hive.utils.misc import id_ranges
+
+
+def test_id_ranges_cover_all_ids():
+    assert list(id_ranges(1, 10, 4)) == [(1, 4), (5, 8), (9, 10)]
+    assert list(id_ranges(0, 7, 4)) == [(0, 3), (4, 7)]
+
+
+def test_id_ranges_of_small_and_empty_sets():
+    assert list(id_ranges(5, 5, 100)) == [(5, 5)]
+    assert not list(id_ranges(6, 5, 100))
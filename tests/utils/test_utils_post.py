@@ -1,6 +1,9 @@
 # pylint: disable=missing-docstring,line-too-long
 
+from diff_match_patch import diff_match_patch
+
 from hive.utils.post import (
+    apply_body_patches,
     mentions,
 )
 
@@ -147,3 +150,22 @@ def test_mentions():
     assert not m('@longestokaccountx')
     assert m('@abc- @-foo @bar.') == {'abc', 'bar'}
     assert m('_[@foo](https://steemit.com/@foo)_') == {'foo'}
+
+
+def test_apply_body_patches():
+    dmp = diff_match_patch()
+    v1, v2, v3 = 'Hello world', 'Hello brave new world', 'Goodbye brave new world'
+    patch_1_2 = dmp.patch_toText(dmp.patch_make(v1, v2))
+    patch_2_3 = dmp.patch_toText(dmp.patch_make(v2, v3))
+
+    assert apply_body_patches(v1, [patch_1_2, patch_2_3]) == [v2, v3]
+    assert apply_body_patches(v1, [patch_1_2, v1, patch_1_2]) == [v2, v1, v2]
+    assert not apply_body_patches(v1, [])
+
+
+def test_apply_body_patches_invalid_patch():
+    # malformed patch header raises ValueError in patch_fromText, the definition replaces the body
+    assert apply_body_patches('old', ['@@ -x +y @@\n']) == ['@@ -x +y @@\n']
+    # patch applied on a missing body falls back to the definition as well
+    patch = diff_match_patch().patch_toText(diff_match_patch().patch_make('a', 'b'))
+    assert apply_body_patches(None, [patch]) == [patch]